@@ -1,7 +1,23 @@
 import pytest
 import json
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
 
+# (collection index, case) for every test run by this process.
 cases = []
+# Collection index of every test, before any sharding, so that results from
+# different workers can be merged back into a stable order.
+order = {}
+# Setup phase duration of every test whose call phase hasn't reported yet.
+setup_durations = {}
+
+# util.py appends a line to this file for every build and simulator run
+# (see util.record_metrics); it is read and reset around each test.
+METRICS_FILE = "GRADER_METRICS_FILE"
+metrics_path = pathlib.Path(tempfile.gettempdir()) / f"grader-metrics-{os.getpid()}.jsonl"
 
 def pytest_addoption(parser):
     parser.addoption(
@@ -10,6 +26,96 @@ def pytest_addoption(parser):
         default="results.json",
         help="Filename to store test results in Gradescope compatible JSON",
     )
+    parser.addoption(
+        "--shard",
+        action="store",
+        default=None,
+        help="Run only shard K of N (given as K/N) and write partial results; "
+             "merge them with `python conftest.py <results-file>`",
+    )
+    parser.addoption(
+        "--timing-summary",
+        action="store",
+        default=None,
+        help="Also write totals and the slowest tests, from the per-test timings, to this JSON file",
+    )
+
+def parts_dir(filename):
+    return pathlib.Path(filename + ".parts")
+
+def worker_id(config):
+    """Name of this process's partial results, or None if it runs alone."""
+    if hasattr(config, "workerinput"):
+        return config.workerinput["workerid"]
+    shard = config.getoption("--shard")
+    if shard is not None:
+        return "shard" + shard.replace("/", "of")
+    return None
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "points(n): maximum score of the test (default 1)")
+    os.environ[METRICS_FILE] = str(metrics_path)
+
+    # The controlling process starts from an empty set of partial results.
+    # Separately launched shards can't tell who runs first; merge() removes
+    # their parts, and ignores any left over from a run with another N.
+    if worker_id(config) is None:
+        parts = parts_dir(config.getoption("--results-file"))
+        if parts.is_dir():
+            for part in parts.glob("*.json"):
+                part.unlink()
+
+def pytest_collection_modifyitems(config, items):
+    for i, item in enumerate(items):
+        order[item.nodeid] = i
+
+    shard = config.getoption("--shard")
+    if shard is not None:
+        k, n = (int(x) for x in shard.split("/"))
+        if not 1 <= k <= n:
+            raise pytest.UsageError(f"--shard={shard}: expected K/N with 1 <= K <= N")
+        # Round robin, so that each shard gets a share of every test file.
+        selected = [item for i, item in enumerate(items) if i % n == k - 1]
+        deselected = [item for i, item in enumerate(items) if i % n != k - 1]
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+def points(item):
+    marker = item.get_closest_marker("points")
+    return marker.args[0] if marker is not None else 1
+
+def pytest_runtest_setup(item):
+    metrics_path.unlink(missing_ok=True)
+
+def timing(nodeid, duration):
+    """
+    Where the time of a test went: HDL builds, simulator runs (with the
+    simulator's peak RSS and simulated cycles), and the rest (cocotb result
+    handling and the test's own checks).
+    """
+    build = sim = 0.0
+    peak_rss = 0
+    cycles = None
+    if metrics_path.exists():
+        for line in metrics_path.read_text().splitlines():
+            metrics = json.loads(line)
+            if metrics["phase"] == "build":
+                build += metrics["seconds"]
+            elif metrics["phase"] == "sim":
+                sim += metrics["seconds"]
+                peak_rss = max(peak_rss, metrics["peak_rss_kb"])
+                if metrics["cycles"] is not None:
+                    cycles = (cycles or 0) + metrics["cycles"]
+    return {
+        "test": nodeid,
+        "total_s": round(duration, 3),
+        "build_s": round(build, 3),
+        "sim_s": round(sim, 3),
+        "check_s": round(max(duration - build - sim, 0.0), 3),
+        "peak_rss_kb": peak_rss or None,
+        "sim_cycles": cycles,
+        "sim_cycles_per_s": round(cycles / sim) if cycles and sim else None,
+    }
 
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):
@@ -19,21 +125,86 @@ def pytest_runtest_makereport(item, call):
     outcome = yield
     report = outcome.get_result()
 
-    if report.when == "call":
-        cases.append({
-            "score": 1 if report.outcome != "failed" else 0,
-            "max_score": 1,
+    if report.when == "setup" and report.outcome == "passed":
+        setup_durations[item.nodeid] = report.duration
+
+    # A test that fails or is skipped during setup never gets a call phase.
+    if report.when == "call" or (report.when == "setup" and report.outcome != "passed"):
+        max_score = points(item)
+        duration = setup_durations.pop(item.nodeid, 0.0) + report.duration
+        cases.append((order.get(item.nodeid, len(order)), {
+            "score": max_score if report.outcome != "failed" else 0,
+            "max_score": max_score,
             "status": report.outcome,
             "visibility": "visible",
-        })
+            "extra_data": {"timing": timing(item.nodeid, duration)},
+        }))
+
+def summarize(tests, slowest=10):
+    timings = [test["extra_data"]["timing"] for test in tests if "timing" in test.get("extra_data", {})]
+    return {
+        "tests": len(timings),
+        "totals": {key: round(sum(t[key] for t in timings), 3) for key in ("total_s", "build_s", "sim_s", "check_s")},
+        "peak_rss_kb": max((t["peak_rss_kb"] or 0 for t in timings), default=0) or None,
+        "slowest": sorted(timings, key=lambda t: t["total_s"], reverse=True)[:slowest],
+    }
+
+def merge(filename, summary=None):
+    """
+    Combine the partial results of all workers into one results file,
+    ordered as the tests were collected, and optionally summarize their
+    timings.
+    """
+    parts = parts_dir(filename)
+    loaded = {}
+    for part in sorted(parts.glob("*.json")):
+        with open(part) as f:
+            loaded[part] = json.load(f)
+
+    # Shard parts carry their N; the latest one written decides which run
+    # is being merged.
+    sharded = [part for part in loaded if "shards" in loaded[part]]
+    if sharded:
+        shards = loaded[max(sharded, key=lambda part: part.stat().st_mtime)]["shards"]
+        for part in sharded:
+            if loaded[part]["shards"] != shards:
+                print(f"{part}: ignoring a part of a {loaded[part]['shards']}-shard run "
+                      f"(merging a {shards}-shard run)", file=sys.stderr)
+                del loaded[part]
+
+    collected = [tuple(case) for part in loaded.values() for case in part["tests"]]
+    collected.sort(key=lambda case: case[0])
+
+    results = { "tests": [case for _, case in collected] }
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=4)
+
+    if summary is not None:
+        with open(summary, "w") as f:
+            json.dump(summarize(results["tests"]), f, indent=4)
+    shutil.rmtree(parts, ignore_errors=True)
 
 @pytest.hookimpl()
 def pytest_sessionfinish(session, exitstatus):
     """
-    Emit collected results as JSON at end of session.
+    Emit collected results as JSON at end of session. Each worker writes
+    its own part; the controlling process (or a plain run) merges them.
     """
 
     filename = session.config.getoption("--results-file")
-    results = { "tests": cases }
-    with open(filename, "w") as f:
-        json.dump(results, f, indent=4)
+    worker = worker_id(session.config) or f"main-{os.getpid()}"
+    parts = parts_dir(filename)
+    parts.mkdir(parents=True, exist_ok=True)
+    part = { "tests": cases }
+    shard = session.config.getoption("--shard")
+    if shard is not None:
+        part["shards"] = int(shard.split("/")[1])
+    with open(parts / f"{worker}.json", "w") as f:
+        json.dump(part, f)
+
+    metrics_path.unlink(missing_ok=True)
+    if worker_id(session.config) is None:
+        merge(filename, session.config.getoption("--timing-summary"))
+
+if __name__ == "__main__":
+    merge(sys.argv[1] if len(sys.argv) > 1 else "results.json", sys.argv[2] if len(sys.argv) > 2 else None)
@@ -1,55 +1,43 @@
-import subprocess
 import random
 from fixedint import UInt32
 
-QEMU = "qemu-riscv32"
+import util
+
 EXE = "./dot"
 NUM_TESTS = 50
 MAXN = 1024
 
-def run(a: list[int], b: list[int]) -> int:
+def format_input(a: list[int], b: list[int]) -> str:
     assert len(a) == len(b)
     a_s = " ".join(str(val) for val in a)
     b_s = " ".join(str(val) for val in b)
-    input_str = f"{len(a)}\n{a_s}\n{b_s}\n"
-    result = subprocess.run(
-        [QEMU, EXE],
-        input=input_str,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-
-    assert result.returncode == 0, f"Test execution failed with error code: {result.returncode}"
-    stderr = result.stderr.strip()
-    assert stderr == "", f"Test execution produced error output: {stderr}"
-
-    output = result.stdout.strip()
-    value = int(output)
-    return value
+    return f"{len(a)}\n{a_s}\n{b_s}\n"
+
+def run(a: list[int], b: list[int]) -> int:
+    return util.run(EXE, format_input(a, b))
+
+def check(cases: list[tuple[list[int], list[int]]]):
+    expected_results = [int(sum(UInt32(x) * UInt32(y) for x, y in zip(a, b))) for a, b in cases]
+    with util.run_batch(EXE, [format_input(a, b) for a, b in cases], expected=expected_results) as results:
+        for (a, b), expected, result in zip(cases, expected_results, results):
+            a_s = "[" + ", ".join(f"{val:08x}" for val in a) + "]"
+            b_s = "[" + ", ".join(f"{val:08x}" for val in b) + "]"
+            message = f"A: {a_s}\nB: {b_s}\n expected {expected:08x}, got {result:08x}"
+            assert result == expected, message
 
 # Run multiple tests - starting with small cases
 def test_random():
+    cases = []
     for _ in range(NUM_TESTS // 2):
         n = 5
         a = random.sample(range(0, 0xFFFFFFFF), n)
         b = random.sample(range(0, 0xFFFFFFFF), n)
-        expected = int(sum(UInt32(x) * UInt32(y) for x, y in zip(a, b)))
-        result = run(a, b)
-
-        a_s = "[" + ", ".join(f"{val:08x}" for val in a) + "]"
-        b_s = "[" + ", ".join(f"{val:08x}" for val in b) + "]"
-        message = f"A: {a_s}\nB: {b_s}\n expected {expected:08x}, got {result:08x}"
-        assert result == expected, message
+        cases.append((a, b))
 
     for _ in range(NUM_TESTS // 2):
         n = random.randint(1, MAXN)
         a = random.sample(range(0, 0xFFFFFFFF), n)
         b = random.sample(range(0, 0xFFFFFFFF), n)
-        expected = int(sum(UInt32(x) * UInt32(y) for x, y in zip(a, b)))
-        result = run(a, b)
+        cases.append((a, b))
 
-        a_s = "[" + ", ".join(f"{val:08x}" for val in a) + "]"
-        b_s = "[" + ", ".join(f"{val:08x}" for val in b) + "]"
-        message = f"A: {a_s}\nB: {b_s}\n expected {expected:08x}, got {result:08x}"
-        assert result == expected, message
+    check(cases)
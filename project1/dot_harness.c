@@ -9,15 +9,19 @@ uint32_t dot(const uint32_t *const A,
 
 int main(void) {
     size_t len;
-    scanf("%zu", &len);
-    if (len > MAXN) return 1;
-
     uint32_t A[MAXN], B[MAXN];
-    for (size_t i = 0; i < len; i++) scanf("%" PRIu32, &A[i]);
-    for (size_t i = 0; i < len; i++) scanf("%" PRIu32, &B[i]);
 
-    const uint32_t result = dot(A, B, len);
-    printf("%" PRIu32 "\n", result);
+    // Read test cases until end of input so that a batch of cases can be
+    // run in one process. Each result is printed on its own line.
+    while (scanf("%zu", &len) == 1) {
+        if (len > MAXN) return 1;
+
+        for (size_t i = 0; i < len; i++) scanf("%" PRIu32, &A[i]);
+        for (size_t i = 0; i < len; i++) scanf("%" PRIu32, &B[i]);
+
+        const uint32_t result = dot(A, B, len);
+        printf("%" PRIu32 "\n", result);
+    }
 
     return 0;
 }
@@ -1,34 +1,22 @@
-import subprocess
 import random
 from fixedint import UInt32
 
-QEMU = "qemu-riscv32"
+import util
+
 EXE = "./umul"
 NUM_TESTS = 50
 
-def run(input_values: tuple[int, int]) -> int:
-    input_str = " ".join(str(val) for val in input_values) + "\n"
-    result = subprocess.run(
-        [QEMU, EXE],
-        input=input_str,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-
-    assert result.returncode == 0, f"Test execution failed with error code: {result.returncode}"
-    stderr = result.stderr.strip()
-    assert stderr == "", f"Test execution produced error output: {stderr}"
+def format_input(input_values: tuple[int, int]) -> str:
+    return " ".join(str(val) for val in input_values) + "\n"
 
-    output = result.stdout.strip()
-    value = int(output)
-    return value
+def run(input_values: tuple[int, int]) -> int:
+    return util.run(EXE, format_input(input_values))
 
 # Run multiple tests
 def test_random():
-    for _ in range(NUM_TESTS):
-        x, y = random.sample(range(0, 0xFFFFFFFF), 2)
-        expected = int(UInt32(x) * UInt32(y))
-        result = run((x, y))
-        # print(f"testing: {x:08x} * {y:08x} = {expected:08x}, got {result:08x}")
-        assert result == expected, f"testing {x:08x} * {y:08x}: expected {expected:08x}, got {result:08x}"
+    cases = [random.sample(range(0, 0xFFFFFFFF), 2) for _ in range(NUM_TESTS)]
+    expected_results = [int(UInt32(x) * UInt32(y)) for x, y in cases]
+    with util.run_batch(EXE, [format_input(case) for case in cases], expected=expected_results) as results:
+        for (x, y), expected, result in zip(cases, expected_results, results):
+            # print(f"testing: {x:08x} * {y:08x} = {expected:08x}, got {result:08x}")
+            assert result == expected, f"testing {x:08x} * {y:08x}: expected {expected:08x}, got {result:08x}"
@@ -5,10 +5,13 @@ extern uint32_t umul(const uint32_t x, const uint32_t y);
 
 int main(void) {
     uint32_t x, y;
-    scanf("%" PRIu32 " %" PRIu32 "", &x, &y);
 
-    const uint32_t result = umul(x, y);
-    printf("%" PRIu32 "\n", result);
+    // Read test cases until end of input so that a batch of cases can be
+    // run in one process. Each result is printed on its own line.
+    while (scanf("%" PRIu32 " %" PRIu32 "", &x, &y) == 2) {
+        const uint32_t result = umul(x, y);
+        printf("%" PRIu32 "\n", result);
+    }
 
     return 0;
 }
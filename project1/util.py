@@ -0,0 +1,118 @@
+import contextlib
+import os
+import subprocess
+import warnings
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+QEMU = "qemu-riscv32"
+
+# Number of emulator processes to run at once, and the time limit for a
+# single test case (a batch of n cases gets n times as long).
+JOBS = int(os.getenv("QEMU_JOBS", os.cpu_count() or 1))
+TIMEOUT = float(os.getenv("QEMU_TIMEOUT", "10"))
+
+def run(exe: str, input_str: str, timeout: float = TIMEOUT) -> int:
+    try:
+        result = subprocess.run(
+            [QEMU, exe],
+            input=input_str,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        raise AssertionError(f"Test execution timed out after {timeout} seconds") from None
+
+    assert result.returncode == 0, f"Test execution failed with error code: {result.returncode}"
+    stderr = result.stderr.strip()
+    assert stderr == "", f"Test execution produced error output: {stderr}"
+
+    output = result.stdout.strip()
+    value = int(output)
+    return value
+
+def _run_chunk(exe: str, input_strs: list[str]) -> list[int] | None:
+    try:
+        result = subprocess.run(
+            [QEMU, exe],
+            input="".join(input_strs),
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=TIMEOUT * len(input_strs),
+        )
+    except subprocess.TimeoutExpired:
+        return None
+
+    outputs = result.stdout.split()
+    if result.returncode != 0 or result.stderr.strip() != "" or len(outputs) != len(input_strs):
+        return None
+    try:
+        return [int(output) for output in outputs]
+    except ValueError:
+        return None
+
+class BatchDisagreement(UserWarning):
+    """A case whose batched result differs from its result run alone."""
+
+def _results(pool: ThreadPoolExecutor, exe: str, input_strs: list[str], chunks: list[list[str]],
+             size: int, expected: list[int] | None) -> Iterator[int]:
+    futures = [pool.submit(_run_chunk, exe, chunk) for chunk in chunks]
+    for start, chunk, future in zip(range(0, len(input_strs), size), chunks, futures):
+        results = future.result()
+        if results is None:
+            reruns = [pool.submit(run, exe, input_str) for input_str in chunk]
+            yield from (rerun.result() for rerun in reruns)
+            continue
+        for i, result in enumerate(results):
+            if expected is not None and result != expected[start + i]:
+                alone = run(exe, chunk[i])
+                if alone != result:
+                    warnings.warn(BatchDisagreement(
+                        f"case {start + i}: {result} when batched, {alone} when run alone "
+                        f"(expected {expected[start + i]}); the routine may clobber state the harness loop relies on"))
+                result = alone
+            yield result
+
+@contextlib.contextmanager
+def run_batch(exe: str, input_strs: list[str], jobs: int = JOBS, expected: list[int] | None = None) -> Iterator[Iterator[int]]:
+    """
+    Run every test case; the context gives an iterator over the results,
+    in the order of `input_strs`:
+
+        with util.run_batch(EXE, inputs, expected=expected) as results:
+            for expected, result in zip(expected, results):
+                assert result == expected
+
+    The cases are split into one contiguous chunk per worker, and each
+    chunk goes through a single emulator process (the harnesses read cases
+    until end of input and print one result line per case). Up to `jobs`
+    emulator processes run at once. Leaving the context, e.g. on the first
+    failed assert, cancels the chunks and reruns that have not started.
+
+    If a chunk does not complete cleanly (crash, timeout, error output, or
+    a missing/garbled result), its cases are rerun each in their own
+    process, so that the failure is reported against the case that caused
+    it and in the same order as running the cases one by one.
+
+    Given the `expected` results, a case whose batched result differs is
+    also rerun on its own, and its result alone is the one yielded: a
+    routine that clobbers state the harness loop relies on (e.g. a
+    callee-saved register) may fail in a batch and pass alone, as it did
+    when every case ran in its own process. Such a case is still reported,
+    as a BatchDisagreement warning.
+    """
+    jobs = max(1, min(jobs, len(input_strs)))
+    size = max(1, -(-len(input_strs) // jobs))
+    chunks = [input_strs[i:i + size] for i in range(0, len(input_strs), size)]
+
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    results = _results(pool, exe, input_strs, chunks, size, expected)
+    try:
+        yield results
+    finally:
+        # Don't wait for (or start) work whose result nobody will look at.
+        results.close()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,283 @@
+"""
+RV32I instruction encoding and decoding on plain ints.
+
+Every format is described by where its fields and immediate bits sit in
+the instruction word (FIELDS, IMM_FIELDS), and encoding or decoding is a
+few shifts and masks over those tables. The same functions take NumPy
+integer arrays, so a whole batch of instructions or a whole trace is
+encoded or decoded at once:
+
+    rv.assemble("addi", rd=5, rs1=0, imm=-1)           # 0xfff00293
+    rv.encode(rv.B, 0b1100011, rs1=1, rs2=2, imm=-8)
+    rv.immediate(insts, rv.J)                          # array in, array out
+    rv.decode_array(trace["inst"])["imm"]
+
+assemble_program() turns the plain assembly that rvgen.py writes (base
+instructions, `x<n>` or ABI register names, labels) into words, without
+the RISC-V toolchain.
+
+project3/rv.py is a copy of this file, since each project is submitted on
+its own: edit project5/rv.py and copy it over (test_rv.py checks that the
+two match).
+"""
+
+import re
+from collections import namedtuple
+
+import numpy as np
+
+R, I, S, B, U, J = "R", "I", "S", "B", "U", "J"
+
+# Base opcode -> format.
+OPCODES = {
+    0b0110011: R,
+    0b0010011: I,  # addi, etc.
+    0b0000011: I,  # loads
+    0b1100111: I,  # jalr
+    0b1110011: I,  # ecall, ebreak
+    0b0100011: S,
+    0b1100011: B,
+    0b0110111: U,  # lui
+    0b0010111: U,  # auipc
+    0b1101111: J,
+}
+
+# Fields other than the immediate, as (shift, width), and the formats
+# that have them.
+FIELDS = {
+    "rd": (7, 5, (R, I, U, J)),
+    "funct3": (12, 3, (R, I, S, B)),
+    "rs1": (15, 5, (R, I, S, B)),
+    "rs2": (20, 5, (R, S, B)),
+    "funct7": (25, 7, (R,)),
+}
+
+# Immediate bits of each format, as (shift in the instruction, width,
+# shift in the immediate), and the width of the (sign-extended) immediate.
+IMM_FIELDS = {
+    R: [],
+    I: [(20, 12, 0)],
+    S: [(7, 5, 0), (25, 7, 5)],
+    B: [(8, 4, 1), (25, 6, 5), (7, 1, 11), (31, 1, 12)],
+    U: [(12, 20, 12)],
+    J: [(21, 10, 1), (20, 1, 11), (12, 8, 12), (31, 1, 20)],
+}
+IMM_BITS = {R: 0, I: 12, S: 12, B: 13, U: 32, J: 21}
+
+# mnemonic -> (format, opcode, funct3, funct7). For the immediate shifts,
+# funct7 goes to imm[11:5].
+INSTRUCTIONS = {
+    "add": (R, 0b0110011, 0b000, 0b0000000),
+    "sub": (R, 0b0110011, 0b000, 0b0100000),
+    "sll": (R, 0b0110011, 0b001, 0b0000000),
+    "slt": (R, 0b0110011, 0b010, 0b0000000),
+    "sltu": (R, 0b0110011, 0b011, 0b0000000),
+    "xor": (R, 0b0110011, 0b100, 0b0000000),
+    "srl": (R, 0b0110011, 0b101, 0b0000000),
+    "sra": (R, 0b0110011, 0b101, 0b0100000),
+    "or": (R, 0b0110011, 0b110, 0b0000000),
+    "and": (R, 0b0110011, 0b111, 0b0000000),
+    "addi": (I, 0b0010011, 0b000, 0),
+    "slti": (I, 0b0010011, 0b010, 0),
+    "sltiu": (I, 0b0010011, 0b011, 0),
+    "xori": (I, 0b0010011, 0b100, 0),
+    "ori": (I, 0b0010011, 0b110, 0),
+    "andi": (I, 0b0010011, 0b111, 0),
+    "slli": (I, 0b0010011, 0b001, 0b0000000),
+    "srli": (I, 0b0010011, 0b101, 0b0000000),
+    "srai": (I, 0b0010011, 0b101, 0b0100000),
+    "lb": (I, 0b0000011, 0b000, 0),
+    "lh": (I, 0b0000011, 0b001, 0),
+    "lw": (I, 0b0000011, 0b010, 0),
+    "lbu": (I, 0b0000011, 0b100, 0),
+    "lhu": (I, 0b0000011, 0b101, 0),
+    "jalr": (I, 0b1100111, 0b000, 0),
+    "ecall": (I, 0b1110011, 0b000, 0),
+    "ebreak": (I, 0b1110011, 0b000, 0),
+    "sb": (S, 0b0100011, 0b000, 0),
+    "sh": (S, 0b0100011, 0b001, 0),
+    "sw": (S, 0b0100011, 0b010, 0),
+    "beq": (B, 0b1100011, 0b000, 0),
+    "bne": (B, 0b1100011, 0b001, 0),
+    "blt": (B, 0b1100011, 0b100, 0),
+    "bge": (B, 0b1100011, 0b101, 0),
+    "bltu": (B, 0b1100011, 0b110, 0),
+    "bgeu": (B, 0b1100011, 0b111, 0),
+    "lui": (U, 0b0110111, 0, 0),
+    "auipc": (U, 0b0010111, 0, 0),
+    "jal": (J, 0b1101111, 0, 0),
+}
+SHIFTS_IMM = ("slli", "srli", "srai")
+
+ABI_NAMES = ["zero", "ra", "sp", "gp", "tp", "t0", "t1", "t2", "s0", "s1"] + [f"a{i}" for i in range(8)] \
+    + [f"s{i}" for i in range(2, 12)] + ["t3", "t4", "t5", "t6"]
+REGISTERS = {**{f"x{i}": i for i in range(32)}, **{name: i for i, name in enumerate(ABI_NAMES)}, "fp": 8}
+
+Fields = namedtuple("Fields", ["format", "opcode", "rd", "funct3", "rs1", "rs2", "funct7", "imm"])
+
+def sext(value, bits: int):
+    """Sign-extend the low `bits` bits of an int or an integer array."""
+    sign = 1 << (bits - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+def encode_imm(fmt: str, imm):
+    """The instruction bits holding `imm` in format `fmt`."""
+    bits = 0
+    for shift, width, lo in IMM_FIELDS[fmt]:
+        bits = bits | (((imm >> lo) & ((1 << width) - 1)) << shift)
+    return bits
+
+def immediate(inst, fmt: str):
+    """The sign-extended immediate of an instruction (or array of them) in format `fmt`."""
+    if fmt == R:
+        return inst & 0
+    imm = 0
+    for shift, width, lo in IMM_FIELDS[fmt]:
+        imm = imm | (((inst >> shift) & ((1 << width) - 1)) << lo)
+    return sext(imm, IMM_BITS[fmt])
+
+def _check_imm(fmt: str, imm: int) -> None:
+    bits = IMM_BITS[fmt]
+    if fmt == U:
+        ok = imm & 0xFFF == 0 and -(1 << 31) <= imm < (1 << 32)
+    else:
+        ok = -(1 << (bits - 1)) <= imm < (1 << (bits - 1))
+        if fmt in (B, J):
+            ok = ok and imm & 1 == 0
+    if not ok:
+        raise ValueError(f"immediate {imm} does not fit a {fmt}-type instruction")
+
+def encode(fmt: str, opcode, rd=0, funct3=0, rs1=0, rs2=0, funct7=0, imm=0):
+    """
+    Encode an instruction of format `fmt`. Any argument may be an integer
+    array; then the result is an array of instruction words (np.uint32).
+    Scalar immediates are checked for range and alignment.
+    """
+    if isinstance(imm, int) and fmt != R:
+        _check_imm(fmt, imm)
+    values = {"rd": rd, "funct3": funct3, "rs1": rs1, "rs2": rs2, "funct7": funct7}
+    inst = opcode & 0x7F
+    for name, (shift, width, formats) in FIELDS.items():
+        if fmt in formats:
+            inst = inst | ((values[name] & ((1 << width) - 1)) << shift)
+    inst = inst | encode_imm(fmt, imm)
+    if isinstance(inst, np.ndarray):
+        return inst.astype(np.uint32)
+    return inst & 0xFFFFFFFF
+
+def assemble(mnemonic: str, rd: int = 0, rs1: int = 0, rs2: int = 0, imm: int = 0) -> int:
+    """Encode one instruction by mnemonic, e.g. assemble("sw", rs1=8, rs2=5, imm=4)."""
+    fmt, opcode, funct3, funct7 = INSTRUCTIONS[mnemonic]
+    if mnemonic in SHIFTS_IMM:
+        if not 0 <= imm < 32:
+            raise ValueError(f"shift amount {imm} out of range")
+        imm |= funct7 << 5
+    elif mnemonic in ("ecall", "ebreak"):
+        return encode(fmt, opcode, imm=int(mnemonic == "ebreak"))
+    return encode(fmt, opcode, rd, funct3, rs1, rs2, funct7, imm)
+
+def decode(inst: int) -> Fields:
+    """Split an instruction word into its fields. Unknown opcodes decode with format None."""
+    opcode = inst & 0x7F
+    fmt = OPCODES.get(opcode)
+    return Fields(
+        fmt, opcode,
+        (inst >> 7) & 0x1F, (inst >> 12) & 0x7, (inst >> 15) & 0x1F, (inst >> 20) & 0x1F, inst >> 25,
+        immediate(inst, fmt) if fmt is not None else 0,
+    )
+
+def decode_array(insts) -> dict[str, np.ndarray]:
+    """
+    decode() for an array of instruction words: a dict of int64 arrays, one
+    per field, plus "format" as an array of format letters ("" if unknown).
+    """
+    inst = np.asarray(insts).astype(np.int64)
+    opcode = inst & 0x7F
+    fmt = np.full(inst.shape, "", dtype="<U1")
+    imm = np.zeros_like(inst)
+    for op, f in OPCODES.items():
+        sel = opcode == op
+        fmt[sel] = f
+        imm[sel] = immediate(inst[sel], f)
+    return {
+        "format": fmt,
+        "opcode": opcode,
+        "rd": (inst >> 7) & 0x1F,
+        "funct3": (inst >> 12) & 0x7,
+        "rs1": (inst >> 15) & 0x1F,
+        "rs2": (inst >> 20) & 0x1F,
+        "funct7": inst >> 25,
+        "imm": imm,
+    }
+
+MEMORY_OPERAND = re.compile(r"^(.*)\((\w+)\)$")
+
+def _register(token: str) -> int:
+    try:
+        return REGISTERS[token]
+    except KeyError:
+        raise ValueError(f"unknown register {token!r}") from None
+
+def assemble_program(source: str) -> list[int]:
+    """
+    Assemble a program of base RV32I instructions (plus nop, mv, j and
+    ret) starting at address 0. Branch and jump targets are labels or
+    numeric offsets. Directives and comments are ignored.
+    """
+    statements = []
+    labels = {}
+    for number, line in enumerate(source.splitlines(), start=1):
+        line = line.split("#", 1)[0].strip()
+        while (m := re.match(r"^(\w+):\s*", line)) is not None:
+            labels[m.group(1)] = 4 * len(statements)
+            line = line[m.end():]
+        if line and not line.startswith("."):
+            mnemonic, _, rest = line.partition(" ")
+            operands = [op.strip() for op in rest.split(",")] if rest.strip() else []
+            statements.append((number, mnemonic, operands))
+
+    def value(token: str, pc: int) -> int:
+        return labels[token] - pc if token in labels else int(token, 0)
+
+    words = []
+    for number, mnemonic, ops in statements:
+        pc = 4 * len(words)
+        try:
+            if mnemonic == "nop":
+                mnemonic, ops = "addi", ["x0", "x0", "0"]
+            elif mnemonic == "mv":
+                mnemonic, ops = "addi", [ops[0], ops[1], "0"]
+            elif mnemonic == "j":
+                mnemonic, ops = "jal", ["x0", ops[0]]
+            elif mnemonic == "ret":
+                mnemonic, ops = "jalr", ["x0", "0(ra)"]
+            if mnemonic not in INSTRUCTIONS:
+                raise ValueError(f"unsupported instruction {mnemonic!r}")
+
+            fmt, opcode = INSTRUCTIONS[mnemonic][:2]
+            if mnemonic in ("ecall", "ebreak"):
+                words.append(assemble(mnemonic))
+            elif fmt == R:
+                rd, rs1, rs2 = map(_register, ops)
+                words.append(assemble(mnemonic, rd, rs1, rs2))
+            elif fmt == S or (opcode in (0b0000011, 0b1100111) and MEMORY_OPERAND.match(ops[1])):
+                offset, base = MEMORY_OPERAND.match(ops[1]).groups()
+                reg, base, offset = _register(ops[0]), _register(base), int(offset or "0", 0)
+                if fmt == S:
+                    words.append(assemble(mnemonic, rs1=base, rs2=reg, imm=offset))
+                else:
+                    words.append(assemble(mnemonic, rd=reg, rs1=base, imm=offset))
+            elif fmt == I:
+                rd, rs1 = map(_register, ops[:2])
+                words.append(assemble(mnemonic, rd, rs1, imm=int(ops[2], 0)))
+            elif fmt == B:
+                rs1, rs2 = map(_register, ops[:2])
+                words.append(assemble(mnemonic, rs1=rs1, rs2=rs2, imm=value(ops[2], pc)))
+            elif fmt == U:
+                words.append(assemble(mnemonic, _register(ops[0]), imm=int(ops[1], 0) << 12))
+            else:
+                rd, target = (ops[0], ops[1]) if len(ops) == 2 else ("ra", ops[0])
+                words.append(assemble(mnemonic, _register(rd), imm=value(target, pc)))
+        except (ValueError, IndexError, KeyError) as e:
+            raise ValueError(f"line {number}: {mnemonic} {', '.join(ops)}: {e}") from None
+    return words
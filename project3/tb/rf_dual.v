@@ -0,0 +1,46 @@
+`default_nettype none
+
+// Toplevel for the fast register file tests (test_rf.py). Drives both
+// variants of the register file with the same inputs and packs their four
+// read ports into one bus, so that the testbench checks both with a single
+// read per cycle:
+//   o_rdata[ 31: 0]  rs1, BYPASS_EN = 0
+//   o_rdata[ 63:32]  rs2, BYPASS_EN = 0
+//   o_rdata[ 95:64]  rs1, BYPASS_EN = 1
+//   o_rdata[127:96]  rs2, BYPASS_EN = 1
+module rf_dual (
+    input  wire         i_clk,
+    input  wire         i_rst,
+    input  wire [  4:0] i_rs1_raddr,
+    input  wire [  4:0] i_rs2_raddr,
+    input  wire         i_rd_wen,
+    input  wire [  4:0] i_rd_waddr,
+    input  wire [ 31:0] i_rd_wdata,
+    output wire [127:0] o_rdata
+);
+    rf #(.BYPASS_EN(0)) nobypass (
+        .i_clk(i_clk),
+        .i_rst(i_rst),
+        .i_rs1_raddr(i_rs1_raddr),
+        .o_rs1_rdata(o_rdata[31:0]),
+        .i_rs2_raddr(i_rs2_raddr),
+        .o_rs2_rdata(o_rdata[63:32]),
+        .i_rd_wen(i_rd_wen),
+        .i_rd_waddr(i_rd_waddr),
+        .i_rd_wdata(i_rd_wdata)
+    );
+
+    rf #(.BYPASS_EN(1)) bypass (
+        .i_clk(i_clk),
+        .i_rst(i_rst),
+        .i_rs1_raddr(i_rs1_raddr),
+        .o_rs1_rdata(o_rdata[95:64]),
+        .i_rs2_raddr(i_rs2_raddr),
+        .o_rs2_rdata(o_rdata[127:96]),
+        .i_rd_wen(i_rd_wen),
+        .i_rd_waddr(i_rd_waddr),
+        .i_rd_wdata(i_rd_wdata)
+    );
+endmodule
+
+`default_nettype wire
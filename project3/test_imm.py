@@ -1,20 +1,15 @@
+import os
 import cocotb
 import pathlib
 from cocotb.triggers import Timer
-from fixedint import FixedInt, Int32, MutableInt32
+from fixedint import Int32
+import numpy as np
 import random
 import pytest
 
+import rv
 import util
 
-Int12 = FixedInt(12, signed=True, mutable=False)
-Int13 = FixedInt(13, signed=True, mutable=False)
-Int20 = FixedInt(20, signed=True, mutable=False)
-Int21 = FixedInt(21, signed=True, mutable=False)
-UInt3 = FixedInt(3, signed=False, mutable=False)
-UInt5 = FixedInt(5, signed=False, mutable=False)
-UInt7 = FixedInt(7, signed=False, mutable=False)
-
 # Format mapping from opcode to one-hot index
 OPCODE_TO_FORMAT = {
     # 0b0110011: 0,  # R-type
@@ -28,64 +23,87 @@ OPCODE_TO_FORMAT = {
     0b1101111: 5,  # J-type (jal)
 }
 
+# Format one-hot index -> rv.py format
+BIT_TO_FORMAT = {1: rv.I, 2: rv.S, 3: rv.B, 4: rv.U, 5: rv.J}
+
 NUM_TESTS = 500
 
+# Set IMM_VERBOSE=1 to log every vector as it is applied, and
+# IMM_EXHAUSTIVE=1 to also drive every immediate bit pattern of every format
+# (about 2.1 million instruction words, with the other instruction bits
+# drawn from IMM_SEED) through the decoder.
+VERBOSE = os.getenv("IMM_VERBOSE", "0") != "0"
+EXHAUSTIVE = os.getenv("IMM_EXHAUSTIVE", "0") != "0"
+
 def reg():
-    return UInt5(random.randint(0, 31))
+    return random.randint(0, 31)
 
-def assemble(opcode: int, imm: int):
+def assemble(opcode: int, imm: int) -> int:
     bit = OPCODE_TO_FORMAT[opcode]
     assert bit != 0
+    return rv.encode(rv.OPCODES[opcode], opcode, rd=reg(), rs1=reg(), rs2=reg(), imm=imm)
+
+def exhaustive_vectors(fmt: str, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Every immediate of a format, each in an instruction word whose other
+    bits are random. Returns the words and the expected immediates.
+    """
+    fields = rv.IMM_FIELDS[fmt]
+    bits = sum(width for _, width, _ in fields)
+    lo = min(lo for _, _, lo in fields)
+    imm = rv.sext(np.arange(1 << bits, dtype=np.int64) << lo, rv.IMM_BITS[fmt])
+    noise = rng.integers(0, 1 << 32, size=imm.size, dtype=np.int64) & ~rv.encode_imm(fmt, -1)
+    return noise | rv.encode_imm(fmt, imm), imm
+
+def coverage(fmt: str, insts, imms) -> str:
+    """Which immediate bits, on the way in and out, were seen both as 0 and 1."""
+    field = rv.encode_imm(fmt, -1)
+    reachable = rv.immediate(field, fmt) & 0xFFFFFFFF
+    insts = np.asarray(insts, dtype=np.int64) & field
+    imms = np.asarray(imms, dtype=np.int64) & 0xFFFFFFFF
+
+    def toggled(values, mask):
+        ones = int(np.bitwise_or.reduce(values, initial=0))
+        zeros = int(np.bitwise_or.reduce(~values & mask, initial=0))
+        return (ones & zeros).bit_count()
+
+    patterns = len(np.unique(insts))
+    signs = len(np.unique(imms >> 31))
+    return (
+        f"{fmt}-type: {len(insts)} vectors, {patterns}/{1 << field.bit_count()} immediate bit patterns, "
+        f"{toggled(insts, field)}/{field.bit_count()} instruction bits and "
+        f"{toggled(imms, reachable)}/{reachable.bit_count()} immediate bits toggled, {signs}/2 signs"
+    )
 
-    inst = MutableInt32()
-    inst[0:7] = UInt7(opcode)
-
-    match bit:
-        # I-type
-        case 1:
-            inst[20:32] = Int12(imm)
-            inst[15:20] = reg()
-            inst[12:15] = UInt3(0)
-            inst[ 7:12] = reg()
-        # S-type
-        case 2:
-            inst[25:32] = Int12(imm)[5:12]
-            inst[20:25] = reg()
-            inst[15:20] = reg()
-            inst[12:15] = UInt3(0)
-            inst[ 7:12] = Int12(imm)[0:5]
-        # B-type
-        case 3:
-            assert (imm & 1) == 0
-            inst[   31] = Int13(imm)[12]
-            inst[25:31] = Int13(imm)[5:11]
-            inst[20:25] = reg()
-            inst[15:20] = reg()
-            inst[12:15] = UInt3(0)
-            inst[ 8:12] = Int13(imm)[1:5]
-            inst[    7] = Int13(imm)[11]
-        # U-type
-        case 4:
-            assert (imm & 0xFFF) == 0
-            inst[12:32] = Int32(imm)[12:32]
-            inst[ 7:12] = reg()
-        # J-type
-        case 5:
-            assert (imm & 1) == 0
-            inst[   31] = Int21(imm)[20]
-            inst[21:31] = Int21(imm)[1:11]
-            inst[   20] = Int21(imm)[11]
-            inst[12:20] = Int21(imm)[12:20]
-            inst[ 7:12] = reg()
-
-    return inst
+async def check(dut, bit: int, insts: list[int], expected: list[int]) -> None:
+    """Drive instruction words of one format and compare the immediates."""
+    i_inst, o_immediate = dut.i_inst, dut.o_immediate
+    dut.i_format.value = 1 << bit
+    step = Timer(1, units="ns")
+    for i, (inst, imm) in enumerate(zip(insts, expected)):
+        i_inst.value = inst
+        await step
+
+        actual = o_immediate.value.integer
+        if VERBOSE:
+            dut._log.info(f"Test {i}: Inst={inst:032b}, Format={bit}, Expected Imm={imm:#010x}, Got Imm={actual:#010x}")
+        if actual != imm:
+            expected_imm, actual_imm = int(Int32(imm)), int(Int32(actual))
+            raise AssertionError(
+                f"[{i}] Immediate mismatch:\n"
+                f"  Inst:      {inst:032b}\n"
+                f"  Format:    {bit}\n"
+                f"  Expected:  {expected_imm} ({imm:08x})\n"
+                f"  Got:       {actual_imm} ({actual:08x})"
+            )
 
 @cocotb.test
 async def immediate_decoder_random(dut):
     opcodes = list(OPCODE_TO_FORMAT.keys())
 
     # Randomly sample supported opcodes
-    for i, opcode in enumerate(random.choices(opcodes, k=NUM_TESTS)):
+    vectors = {bit: ([], []) for bit in BIT_TO_FORMAT}
+    for opcode in random.choices(opcodes, k=NUM_TESTS):
         bit = OPCODE_TO_FORMAT[opcode]
         assert bit != 0
 
@@ -106,25 +124,20 @@ async def immediate_decoder_random(dut):
             case _:
                 assert False
 
-        inst = assemble(opcode, imm)
-
-        # Drive DUT
-        dut.i_inst.value = int(inst)
-        dut.i_format.value = 1 << bit
-        await Timer(1, units="ns")
-
-        actual = int(Int32(dut.o_immediate.value.integer))
-        expected = imm
+        vectors[bit][0].append(assemble(opcode, imm))
+        vectors[bit][1].append(imm & 0xFFFFFFFF)
 
-        print(f"Test {i}: Inst={inst:032b}, Format={bit}, Expected Imm={expected} ({hex(expected)}), Got Imm={actual} ({hex(actual)})")
+    for bit, (insts, imms) in vectors.items():
+        await check(dut, bit, insts, imms)
+        dut._log.info(coverage(BIT_TO_FORMAT[bit], insts, imms))
 
-        assert actual == expected, (
-            f"[{i}] Immediate mismatch:\n"
-            f"  Inst:      {inst:032b}\n"
-            f"  Format:    {bit}\n"
-            f"  Expected:  {expected} ({expected:08x})\n"
-            f"  Got:       {actual} ({actual:08x})"
-        )
+@cocotb.test(skip=not EXHAUSTIVE)
+async def immediate_decoder_exhaustive(dut):
+    rng = np.random.default_rng(int(os.getenv("IMM_SEED", "0")))
+    for bit, fmt in BIT_TO_FORMAT.items():
+        insts, imms = exhaustive_vectors(fmt, rng)
+        await check(dut, bit, insts.tolist(), (imms & 0xFFFFFFFF).tolist())
+        dut._log.info(coverage(fmt, insts, imms))
 
 @pytest.mark.name("Immediate decoder: randomized")
 @pytest.mark.points(15)
@@ -136,5 +149,5 @@ def test_immediate_decoder(record_property):
     runner.test(
         hdl_toplevel="imm",
         test_module="test_imm",
-        testcase=f"immediate_decoder_random",
+        testcase=["immediate_decoder_random"] + (["immediate_decoder_exhaustive"] if EXHAUSTIVE else []),
     )
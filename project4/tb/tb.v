@@ -1,3 +1,9 @@
+// Define HART_NETLIST to simulate a synthesized netlist (dut.vg) in place
+// of the RTL; see hartsim.py --netlist.
+`ifdef HART_NETLIST
+`timescale 1ns / 1ps
+`endif
+
 module hart_tb ();
     // Synchronous active-high reset.
     reg         clk, rst;
@@ -18,9 +24,14 @@ module hart_tb ();
     wire [31:0] rd_wdata;
     wire [31:0] pc, next_pc;
 
+`ifdef HART_NETLIST
+    // Netlists have no parameters left.
+    hart dut (
+`else
     hart #(
         .RESET_ADDR (32'h0)
     ) dut (
+`endif
         .i_clk        (clk),
         .i_rst        (rst),
         .o_imem_raddr (imem_raddr),
@@ -77,50 +88,132 @@ module hart_tb ();
     end
 
     integer cycles;
+    integer trace_fd;
+    reg [8*256-1:0] trace_file;
+    reg [8*256-1:0] program;
+    integer max_cycles;
+    reg [8*8-1:0] waves, waves_scope;
+    integer waves_start, waves_stop, waves_depth, dumping;
     initial begin
         clk = 0;
 
-        // Load the test program into memory at address 0.
+        // Waveforms are off unless asked for:
+        //   +waves=vcd|fst           dump to hart.vcd or hart.fst (for FST, also
+        //                            run vvp with -fst)
+        //   +waves_scope=all|hart|tb every signal (default), the hart and
+        //                            all of its submodules, or only the
+        //                            testbench signals
+        //   +waves_depth=D           for all and hart, only D levels of
+        //                            hierarchy (default 0: all of them)
+        //   +waves_start=N, +waves_stop=M
+        //                            only dump cycles N through M
+        if (!$value$plusargs("waves=%s", waves))
+            waves = "none";
+        if (!$value$plusargs("waves_scope=%s", waves_scope))
+            waves_scope = "all";
+        if (!$value$plusargs("waves_depth=%d", waves_depth))
+            waves_depth = 0;
+        if (!$value$plusargs("waves_start=%d", waves_start))
+            waves_start = 0;
+        if (!$value$plusargs("waves_stop=%d", waves_stop))
+            waves_stop = -1;
+`ifdef HART_NO_WAVES
+        // Built without tracing support (e.g. Verilator without --trace).
+        dumping = 0;
+`else
+        dumping = waves == "vcd" || waves == "fst";
+        if (dumping) begin
+            if (waves == "fst")
+                $dumpfile("hart.fst");
+            else
+                $dumpfile("hart.vcd");
+            if (waves_scope == "tb")
+                $dumpvars(1, hart_tb);
+            else if (waves_scope == "hart")
+                $dumpvars(waves_depth, hart_tb.dut);
+            else
+                $dumpvars(waves_depth, hart_tb);
+            if (waves_start > 0)
+                $dumpoff;
+        end
+`endif
+
+        // Load the test program into memory at address 0. Pass
+        // +program=<file> to load another image than program.mem.
+        if (!$value$plusargs("program=%s", program))
+            program = "program.mem";
         $display("Loading program.");
-        $readmemh("program.mem", imem);
+        $readmemh(program, imem);
 
         // Reset the dut.
         $display("Resetting hart.");
         @(negedge clk); rst = 1;
         @(negedge clk); rst = 0;
 
+        // With +trace_bin=<file>, write the retire trace in the binary format
+        // read by project5/tracebin.py instead of printing it: a header
+        // (magic "RVTR", version, words per record, trace format) followed by
+        // one record of little-endian words per retired instruction.
+        trace_fd = 0;
+        if ($value$plusargs("trace_bin=%s", trace_file)) begin
+            trace_fd = $fopen(trace_file, "wb");
+            $fwrite(trace_fd, "%u%u%u%u", 32'h52545652, 32'd1, 32'd11, 32'd4);
+        end
+
+        // +max_cycles=N stops a hart that never halts (default: no limit).
+        if (!$value$plusargs("max_cycles=%d", max_cycles))
+            max_cycles = 0;
+
         $display("Cycle  PC        Inst     rs1            rs2            [rd, load, store]");
         cycles = 0;
-        while (!halt) begin
+        while (!halt && (max_cycles == 0 || cycles < max_cycles)) begin
             @(posedge clk);
             cycles = cycles + 1;
+`ifndef HART_NO_WAVES
+            if (dumping && cycles == waves_start)
+                $dumpon;
+            if (dumping && cycles == waves_stop + 1)
+                $dumpoff;
+`endif
 
             if (valid) begin
-                // Base information for all instructions.
-                if (imem_rdata[3:0] == 4'b0111 || imem_rdata[6:0] == 7'b111_0011)
-                    $write("%05d [%08h] %08h r[xx]=xxxxxxxx r[xx]=xxxxxxxx", cycles, pc, inst);
-                else if (imem_rdata[6:0] == 7'b001_0011 || imem_rdata[6:0] == 7'b000_0011 || 
-                         imem_rdata[6:0] == 7'b110_1111 || imem_rdata[6:0] == 7'b110_0111)
-                    $write("%05d [%08h] %08h r[%d]=%08h r[xx]=xxxxxxxx", cycles, pc, inst, rs1_raddr, rs1_rdata);
-                else
-                    $write("%05d [%08h] %08h r[%d]=%08h r[%d]=%08h", cycles, pc, inst, rs1_raddr, rs1_rdata, rs2_raddr, rs2_rdata);
-                // Only display write information for instructions that write.
-                if (rd_waddr != 5'd0)
-                    $write(" w[%d]=%08h", rd_waddr, rd_wdata);
-                // Only display memory information for load/store instructions.
-                if (dmem_ren)
-                    $write(" l[%08h,%04b]=%08h", dmem_addr, dmem_mask, dmem_rdata);
-                if (dmem_wen)
-                    $write(" s[%08h,%04b]=%08h", dmem_addr, dmem_mask, dmem_wdata);
-                // Display trap information if a trap occurred.
-                if (trap)
-                    $write(" TRAP");
-                $display();
+                if (trace_fd) begin
+                    $fwrite(trace_fd, "%u%u%u%u%u%u%u%u%u%u%u", cycles, pc, inst, next_pc,
+                            rs1_rdata, rs2_rdata, rd_wdata, dmem_addr, dmem_rdata, dmem_wdata,
+                            {9'b0, halt, trap, dmem_wen, dmem_ren, dmem_mask, rd_waddr, rs2_raddr, rs1_raddr});
+                end else begin
+                    // Base information for all instructions.
+                    if (imem_rdata[3:0] == 4'b0111 || imem_rdata[6:0] == 7'b111_0011)
+                        $write("%05d [%08h] %08h r[xx]=xxxxxxxx r[xx]=xxxxxxxx", cycles, pc, inst);
+                    else if (imem_rdata[6:0] == 7'b001_0011 || imem_rdata[6:0] == 7'b000_0011 || 
+                             imem_rdata[6:0] == 7'b110_1111 || imem_rdata[6:0] == 7'b110_0111)
+                        $write("%05d [%08h] %08h r[%d]=%08h r[xx]=xxxxxxxx", cycles, pc, inst, rs1_raddr, rs1_rdata);
+                    else
+                        $write("%05d [%08h] %08h r[%d]=%08h r[%d]=%08h", cycles, pc, inst, rs1_raddr, rs1_rdata, rs2_raddr, rs2_rdata);
+                    // Only display write information for instructions that write.
+                    if (rd_waddr != 5'd0)
+                        $write(" w[%d]=%08h", rd_waddr, rd_wdata);
+                    // Only display memory information for load/store instructions.
+                    if (dmem_ren)
+                        $write(" l[%08h,%04b]=%08h", dmem_addr, dmem_mask, dmem_rdata);
+                    if (dmem_wen)
+                        $write(" s[%08h,%04b]=%08h", dmem_addr, dmem_mask, dmem_wdata);
+                    // Display trap information if a trap occurred.
+                    if (trap)
+                        $write(" TRAP");
+                    $display();
+                end
             end
         end
 
+        if (trace_fd)
+            $fclose(trace_fd);
+        if (!halt)
+            $display("Cycle limit of %0d reached.", max_cycles);
         $display("Program halted after %d cycles.", cycles);
+`ifndef HART_NETLIST
         $display("r[a0]=%08h (%d)", dut.rf.mem[10], dut.rf.mem[10]);
+`endif
         $finish;
     end
 
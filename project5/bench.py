@@ -0,0 +1,158 @@
+"""
+Benchmark the hart on realistic kernels and track its CPI across RTL changes.
+
+The kernels in tests/bench are small self-checking programs (a0 = 1 on
+success, 0xdead on failure), each dominated by one kind of pipeline
+behaviour:
+- dot: project1's dot product, a call to the shift-and-add umul per pair;
+- matmul: a 6x6 matrix multiply on umul, with strided column loads;
+- memcpy: an unrolled word copy and an unaligned byte copy;
+- sort: insertion sort, with a data-dependent exit from the inner loop;
+- fsm: a branchy state machine over random bits;
+- chase: pointer chasing around a linked list (back-to-back load-use).
+They are assembled with rv.py and run like regress.py does (a single build,
+with every retire trace checked against the reference ISS), and their
+cycles, instructions and CPI are appended to a history file, one JSON line
+per run, keyed by a hash of the design sources.
+
+Each run is compared with the latest recorded run of a *different* design,
+so that a pipeline change is judged against the design before it, however
+often the new one is rerun. A kernel whose CPI grew by more than
+--threshold percent is flagged, and the exit status is then nonzero:
+
+    python bench.py
+    python bench.py --sim verilator --threshold 1
+    python bench.py --project ../project4 --no-record
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import corpus
+import hartsim
+import regress
+import rv
+
+BENCH_DIR = pathlib.Path(__file__).parent / "tests" / "bench"
+HISTORY = "bench_history.jsonl"
+THRESHOLD = 2.0
+
+def design_hash(project: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    for f in hartsim.sources(project):
+        h.update(f.name.encode() + b"\0" + f.read_bytes() + b"\0")
+    return h.hexdigest()[:16]
+
+def revision(project: pathlib.Path) -> str | None:
+    result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=project,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return result.stdout.strip() or None
+
+def assemble(kernel: pathlib.Path, work: pathlib.Path) -> pathlib.Path:
+    image = b"".join(word.to_bytes(4, "little") for word in rv.assemble_program(kernel.read_text()))
+    mem = work / f"{kernel.stem}.mem"
+    mem.write_text(corpus.to_mem(image.ljust(4 * 256, b"\0")))
+    return mem
+
+def load_history(path: pathlib.Path) -> list[dict]:
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+def baseline(history: list[dict], design: str, sim: str) -> dict | None:
+    """The latest run of another design on the same simulator."""
+    for entry in reversed(history):
+        if entry["design"] != design and entry["sim"] == sim:
+            return entry
+    return None
+
+def compare(results: dict, base: dict | None) -> dict[str, float | None]:
+    """The CPI change of each kernel in percent (None if it has no baseline)."""
+    changes = {}
+    for name, r in results.items():
+        old = base["results"].get(name) if base is not None else None
+        if old is None or not old["cpi"] or not r["cpi"]:
+            changes[name] = None
+        else:
+            changes[name] = 100 * (r["cpi"] / old["cpi"] - 1)
+    return changes
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark kernels and track CPI across design changes.")
+    parser.add_argument("kernels", nargs="*", help="kernel names (default: all of tests/bench)")
+    parser.add_argument("--project", type=pathlib.Path, default=pathlib.Path(__file__).parent,
+                        help="project directory with rtl/ and tb/tb.v (default: project5)")
+    parser.add_argument("--sim", choices=hartsim.SIMS, default=hartsim.SIM)
+    parser.add_argument("--history", type=pathlib.Path, help=f"history file (default: <project>/{HISTORY})")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="CPI increase, in percent, that counts as a regression")
+    parser.add_argument("--no-record", action="store_true", help="compare only; don't append this run to the history")
+    parser.add_argument("--work-dir", type=pathlib.Path, default=pathlib.Path("bench"))
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    project = args.project.resolve()
+    history_path = args.history or project / HISTORY
+    fmt = "project4" if project.name == "project4" else "project5"
+    kernels = sorted(BENCH_DIR.glob("*.s"))
+    if args.kernels:
+        kernels = [BENCH_DIR / f"{name}.s" for name in args.kernels]
+
+    work = args.work_dir.resolve()
+    work.mkdir(parents=True, exist_ok=True)
+    programs = [assemble(k, work) for k in kernels]
+    sim = hartsim.build(project, args.sim)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(regress.run_program, p, sim, work, fmt, None, regress.TIMEOUT) for p in programs]
+        runs = [f.result() for f in futures]
+
+    design = design_hash(project)
+    results = {pathlib.Path(r["program"]).stem: {k: r[k] for k in ("status", "cycles", "instructions", "cpi")} for r in runs}
+    history = load_history(history_path)
+    base = baseline(history, design, args.sim)
+    changes = compare(results, base)
+
+    if base is not None:
+        print(f"baseline: design {base['design']} ({base['revision'] or 'unknown revision'}, {base['date']})")
+    else:
+        print("baseline: none (no other design in the history)")
+    print(f"{'kernel':<10} {'status':<12} {'cycles':>8} {'insts':>8} {'CPI':>6} {'base':>6} {'change':>8}")
+    regressions = []
+    for name, r in results.items():
+        old = base["results"].get(name) if base is not None else None
+        cpi = f"{r['cpi']:.3f}" if r["cpi"] else "-"
+        old_cpi = f"{old['cpi']:.3f}" if old and old["cpi"] else "-"
+        change = f"{changes[name]:+.1f}%" if changes[name] is not None else "-"
+        flag = ""
+        if changes[name] is not None and changes[name] > args.threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<10} {r['status']:<12} {r['cycles'] or '-':>8} {r['instructions'] or '-':>8} {cpi:>6} {old_cpi:>6} {change:>8}{flag}")
+    failed = [r for r in runs if r["status"] != "pass"]
+    for r in failed:
+        print(f"\n{pathlib.Path(r['program']).stem}: {r['status']}\n{r['detail']}")
+
+    # Only complete, passing runs are worth comparing against later.
+    if not args.no_record and not failed:
+        entry = {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "design": design,
+            "revision": revision(project),
+            "sim": args.sim,
+            "results": results,
+        }
+        with open(history_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    if regressions:
+        print(f"\nCPI regressed by more than {args.threshold}% on: {', '.join(regressions)}")
+    return 1 if failed or regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
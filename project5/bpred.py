@@ -0,0 +1,213 @@
+"""
+Trace-driven branch predictor simulator.
+
+Replays the control transfers of one or more programs through a set of
+predictor configurations and reports, for each, the conditional branch
+misprediction rate, the cycles lost to control hazards and the CPI that
+would result. Programs are given as program.mem images (run on the
+reference ISS), text retire traces, or binary traces (.rvtr). The
+configurations are simulated in parallel on a process pool.
+
+    python bpred.py tb/program.mem
+    python bpred.py traces/*.rvtr --config gshare:entries=1024,history=10,btb=64
+
+Pipeline model, matching the current hart: branches and jumps resolve in
+EX, and redirecting fetch from there flushes IF/ID and ID/EX (PENALTY
+cycles). Without a prediction, i.e. with static not-taken, every taken
+branch and every jump pays this.
+- The other direction predictors are assumed to redirect fetch from ID
+  (where the target of a branch or `jal` is known) when they predict taken,
+  which costs REDIRECT_PENALTY cycles.
+- A BTB hit with the right target redirects from IF at no cost. It is the
+  only way to predict a `jalr`.
+- A wrong direction costs the full PENALTY.
+"""
+
+import argparse
+import pathlib
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import iss
+import rv
+import tracebin
+
+PENALTY = 2
+REDIRECT_PENALTY = 1
+
+BRANCH, JAL, JALR = 0, 1, 2
+DIRECTIONS = ("static-nt", "btfn", "bimodal", "gshare")
+
+Config = namedtuple("Config", ["direction", "entries", "history", "btb"], defaults=[0, 0, 0])
+Result = namedtuple("Result", ["instructions", "branches", "mispredicts", "jumps", "target_misses", "lost"])
+
+def config_name(config: Config) -> str:
+    name = config.direction
+    if config.direction in ("bimodal", "gshare"):
+        name += f":entries={config.entries}"
+    if config.direction == "gshare":
+        name += f",history={config.history}"
+    if config.btb:
+        name += ("," if ":" in name else ":") + f"btb={config.btb}"
+    return name
+
+def parse_config(spec: str) -> Config:
+    """Parse a configuration such as `gshare:entries=1024,history=10,btb=64`."""
+    direction, _, params = spec.partition(":")
+    if direction not in DIRECTIONS:
+        raise ValueError(f"unknown predictor {direction!r} (expected one of {', '.join(DIRECTIONS)})")
+    kwargs = {}
+    for param in filter(None, params.split(",")):
+        key, _, value = param.partition("=")
+        if key not in ("entries", "history", "btb"):
+            raise ValueError(f"unknown predictor parameter {key!r}")
+        kwargs[key] = int(value)
+    config = Config(direction, **kwargs)
+    for size in (config.entries, config.btb):
+        if size & (size - 1):
+            raise ValueError(f"{spec}: table sizes must be powers of two")
+    if config.direction in ("bimodal", "gshare") and not config.entries:
+        raise ValueError(f"{spec}: {config.direction} needs entries=")
+    return config
+
+def default_configs() -> list[Config]:
+    configs = []
+    for btb in (0, 16, 64):
+        configs += [Config("static-nt", btb=btb), Config("btfn", btb=btb)]
+        configs += [Config("bimodal", entries, btb=btb) for entries in (16, 64, 256, 1024, 4096)]
+        configs += [Config("gshare", entries, history, btb=btb)
+                    for entries in (256, 1024, 4096) for history in (4, 8, 12)
+                    if (1 << history) <= entries]
+    return configs
+
+# Control transfers of a trace, as columns: pc, kind, taken, target, backward.
+Events = namedtuple("Events", ["instructions", "pc", "kind", "taken", "target", "backward"])
+
+def branch_events(trace: np.ndarray) -> Events:
+    """Extract the branches and jumps from a tracebin array."""
+    pc = trace["pc"].astype(np.int64)
+    inst = trace["inst"].astype(np.int64)
+    next_pc = np.empty_like(pc)
+    next_pc[:-1] = pc[1:]
+    next_pc[-1:] = trace["next_pc"][-1:]
+
+    opcode = inst & 0x7F
+    sel = np.isin(opcode, (0b1100011, 0b1101111, 0b1100111))
+    pc, inst, opcode, next_pc = pc[sel], inst[sel], opcode[sel], next_pc[sel]
+
+    kind = np.where(opcode == 0b1100011, BRANCH, np.where(opcode == 0b1101111, JAL, JALR))
+    imm = rv.immediate(inst, rv.B)
+    taken = (next_pc != pc + 4) | (kind != BRANCH)
+    target = np.where(taken, next_pc, (pc + imm) & 0xFFFFFFFF)
+    backward = (inst >> 31) & 1
+
+    return Events(len(trace), pc.tolist(), kind.tolist(), taken.tolist(), target.tolist(), backward.tolist())
+
+def load_trace(path: pathlib.Path, max_instructions: int = 1_000_000) -> np.ndarray:
+    if path.suffix == ".mem":
+        return tracebin.from_retire(iss.ISS.from_mem(path).run(max_instructions))
+    if path.suffix == ".rvtr":
+        return tracebin.read(path)
+    with open(path) as f:
+        return tracebin.from_text(f)
+
+def simulate(config: Config, events: Events, penalty: int = PENALTY, redirect_penalty: int = REDIRECT_PENALTY) -> Result:
+    direction = config.direction
+    mask = config.entries - 1
+    history_mask = (1 << config.history) - 1
+    counters = [1] * config.entries  # 2-bit, weakly not taken
+    history = 0
+    btb = config.btb
+    btb_tags = [-1] * btb
+    btb_targets = [0] * btb
+    redirect = redirect_penalty if direction != "static-nt" else penalty
+
+    branches = mispredicts = jumps = target_misses = lost = 0
+    for pc, kind, taken, target, backward in zip(events.pc, events.kind, events.taken, events.target, events.backward):
+        hit = False
+        if btb:
+            slot = (pc >> 2) & (btb - 1)
+            if btb_tags[slot] == pc:
+                hit = btb_targets[slot] == target
+                target_misses += not hit
+
+        if kind == BRANCH:
+            branches += 1
+            if direction == "static-nt":
+                predict = False
+            elif direction == "btfn":
+                predict = backward
+            else:
+                index = ((pc >> 2) ^ history) & mask if direction == "gshare" else (pc >> 2) & mask
+                counter = counters[index]
+                predict = counter >= 2
+                counters[index] = min(counter + 1, 3) if taken else max(counter - 1, 0)
+                history = ((history << 1) | taken) & history_mask
+
+            if predict != taken:
+                mispredicts += 1
+                lost += penalty
+            elif taken and not hit:
+                lost += redirect
+        else:
+            jumps += 1
+            if not hit:
+                lost += redirect if kind == JAL else penalty
+
+        if btb and taken:
+            btb_tags[slot] = pc
+            btb_targets[slot] = target
+
+    return Result(events.instructions, branches, mispredicts, jumps, target_misses, lost)
+
+_events = []
+
+def _init(events):
+    global _events
+    _events = events
+
+def _simulate(task):
+    config, program, penalty, redirect_penalty = task
+    return simulate(config, _events[program], penalty, redirect_penalty)
+
+def sweep(configs: list[Config], events: list[Events], jobs: int | None = None,
+          penalty: int = PENALTY, redirect_penalty: int = REDIRECT_PENALTY) -> list[Result]:
+    """Simulate every configuration on every program; results summed over programs."""
+    tasks = [(config, program, penalty, redirect_penalty) for config in configs for program in range(len(events))]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init, initargs=(events,)) as pool:
+        results = list(pool.map(_simulate, tasks, chunksize=max(1, len(tasks) // (4 * (jobs or 8)))))
+
+    totals = []
+    for i in range(len(configs)):
+        per_program = results[i * len(events):(i + 1) * len(events)]
+        totals.append(Result(*(sum(column) for column in zip(*per_program))))
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate branch predictor configurations on retire traces.")
+    parser.add_argument("traces", type=pathlib.Path, nargs="+", help="program.mem images, text traces or .rvtr traces")
+    parser.add_argument("--config", action="append", type=parse_config,
+                        help="predictor to evaluate, e.g. bimodal:entries=256,btb=16 (default: a sweep)")
+    parser.add_argument("--penalty", type=int, default=PENALTY, help="cycles lost to a flush from EX")
+    parser.add_argument("--redirect-penalty", type=int, default=REDIRECT_PENALTY, help="cycles lost to a redirect from ID")
+    parser.add_argument("--base-cpi", type=float, default=1.0, help="CPI without control hazards")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--max-instructions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    configs = args.config or default_configs()
+    events = [branch_events(load_trace(path, args.max_instructions)) for path in args.traces]
+    results = sweep(configs, events, args.jobs, args.penalty, args.redirect_penalty)
+
+    print(f"{'predictor':<40} {'branches':>9} {'mispred':>8} {'jumps':>7} {'lost':>8} {'CPI':>7}")
+    for config, r in sorted(zip(configs, results), key=lambda e: (e[1].lost, config_name(e[0]))):
+        rate = r.mispredicts / r.branches if r.branches else 0.0
+        cpi = args.base_cpi + r.lost / max(r.instructions, 1)
+        print(f"{config_name(config):<40} {r.branches:>9} {rate:>8.2%} {r.jumps:>7} {r.lost:>8} {cpi:>7.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
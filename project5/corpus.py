@@ -0,0 +1,139 @@
+"""
+Assemble the asm test corpus into one program image per test.
+
+Every `.asm` in the given directories is assembled into `<name>.mem` next
+to it, in the `$readmemh` format of `tb/program.mem`. Run the testbench
+on one with `vvp hart_sim +program=../tests/asm/01add.mem`. Outputs are
+cached by a hash of the source and the toolchain flags, so only new or
+changed programs are assembled, and all of them go through a single
+toolchain invocation: the RISC-V binutils on PATH if there are any,
+otherwise one container of the course tools image.
+
+    python corpus.py tests/asm ../project4/tests/asm
+"""
+
+import argparse
+import hashlib
+import os
+import pathlib
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+
+IMAGE = "coderkalyan/ece552-tools:latest"
+AS = "riscv64-unknown-elf-as"
+OBJCOPY = "riscv64-unknown-elf-objcopy"
+AS_FLAGS = "-march=rv32i -mabi=ilp32"
+OBJCOPY_FLAGS = "-O binary -j .text --pad-to=0x400"
+
+CACHE = pathlib.Path(os.getenv("CORPUS_CACHE", pathlib.Path.home() / ".cache" / "ece552-corpus"))
+
+def source_hash(asm: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    h.update(f"{AS_FLAGS}\0{OBJCOPY_FLAGS}\0".encode())
+    h.update(asm.read_bytes())
+    return h.hexdigest()
+
+def to_mem(image: bytes) -> str:
+    """Format a binary image like `xxd -g 1 -c 4 -p | sed 's/../& /g'`."""
+    lines = []
+    for i in range(0, len(image), 4):
+        lines.append("".join(f"{b:02x} " for b in image[i:i + 4]) + "\n")
+    return "".join(lines)
+
+def _script(names: list[str]) -> str:
+    # Assemble every program in one shell, in parallel, leaving <name>.bin
+    # or <name>.err behind for each.
+    each = (
+        f"{AS} {AS_FLAGS} \"$0.asm\" -o \"$0.o\" 2> \"$0.err\" && "
+        f"{OBJCOPY} {OBJCOPY_FLAGS} \"$0.o\" \"$0.bin\" 2>> \"$0.err\" && rm \"$0.err\""
+    )
+    return f"printf '%s\\n' {' '.join(names)} | xargs -P \"$(nproc)\" -n 1 sh -c {shlex.quote(each)}"
+
+def assemble(sources: dict[str, pathlib.Path]) -> dict[str, bytes | str]:
+    """
+    Assemble {key: asm path} in one toolchain invocation. Returns the
+    binary image for each key, or the assembler's error output.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        for key, asm in sources.items():
+            shutil.copyfile(asm, tmp / f"{key}.asm")
+        script = _script(list(sources))
+
+        if shutil.which(AS) and shutil.which(OBJCOPY):
+            cmd = ["bash", "-c", script]
+        else:
+            cmd = ["docker", "run", "--rm", "--platform=linux/amd64", "-v", f"{tmp}:/src", "-w", "/src",
+                   "--user", f"{os.getuid()}:{os.getgid()}", IMAGE, "bash", "-c", script]
+        subprocess.run(cmd, cwd=tmp, check=False)
+
+        results = {}
+        for key in sources:
+            binary, err = tmp / f"{key}.bin", tmp / f"{key}.err"
+            if binary.exists() and not err.exists():
+                results[key] = binary.read_bytes()
+            else:
+                results[key] = err.read_text() if err.exists() else "assembler did not run"
+        return results
+
+def build(asm_files: list[pathlib.Path], force: bool = False) -> dict[pathlib.Path, str | None]:
+    """
+    Bring `<name>.mem` up to date for every asm file. Returns the error
+    output for each program that failed to assemble, or None.
+    """
+    CACHE.mkdir(parents=True, exist_ok=True)
+    hashes = {asm: source_hash(asm) for asm in asm_files}
+    # Files with the same content share a hash: assemble one of them and
+    # give the result to all.
+    missing = {}
+    for asm, h in hashes.items():
+        if force or not (CACHE / f"{h}.mem").exists():
+            missing.setdefault(h, []).append(asm)
+
+    errors = {}
+    if missing:
+        for h, result in assemble({h: paths[0] for h, paths in missing.items()}).items():
+            if isinstance(result, bytes):
+                tmp = CACHE / f"{h}.mem.{os.getpid()}"
+                tmp.write_text(to_mem(result))
+                os.replace(tmp, CACHE / f"{h}.mem")
+            else:
+                for asm in missing[h]:
+                    errors[asm] = result.replace(f"{h}.asm", asm.name)
+
+    for asm, h in hashes.items():
+        if asm in errors:
+            continue
+        mem = asm.with_suffix(".mem")
+        cached = (CACHE / f"{h}.mem").read_text()
+        if not mem.exists() or mem.read_text() != cached:
+            mem.write_text(cached)
+    return {asm: errors.get(asm) for asm in asm_files}
+
+def find(paths: list[pathlib.Path]) -> list[pathlib.Path]:
+    files = []
+    for path in paths:
+        files += sorted(path.glob("*.asm")) if path.is_dir() else [path]
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description="Assemble asm tests into per-program .mem images, with caching.")
+    parser.add_argument("paths", type=pathlib.Path, nargs="*", default=[pathlib.Path(__file__).parent / "tests" / "asm"],
+                        help="asm files or directories of them (default: tests/asm)")
+    parser.add_argument("--force", action="store_true", help="ignore the cache")
+    args = parser.parse_args()
+
+    results = build(find(args.paths), args.force)
+    failed = 0
+    for asm, error in results.items():
+        if error is not None:
+            failed += 1
+            print(f"{asm}: failed to assemble\n{error}", file=sys.stderr)
+    print(f"{len(results) - failed} programs up to date, {failed} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
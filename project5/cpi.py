@@ -0,0 +1,193 @@
+"""
+CPI stack for the pipelined hart.
+
+CPIAnalyzer runs alongside a cocotb hart test (see test_hart.py) and samples
+the hazard unit, the pipeline flushes and the retire interface every cycle.
+Every cycle either retires an instruction or is an empty retire slot. Each
+bubble that the hazard unit puts into the pipeline is queued with its cause
+and the instruction responsible for it: for a stall, the instruction
+waiting in ID; for a flush, the taken branch or jump in EX. Bubbles come
+out at retire in the order they went in, so each empty retire slot takes
+the oldest cause in the queue. A slot with nothing queued is pipeline fill
+or drain ("empty").
+
+The signals are looked up by hierarchical path from the cocotb toplevel.
+The defaults match tb/hart_harness.v and the reference hart; a design
+that names them differently can override them with the `signals` argument
+or the HART_CPI_SIGNALS environment variable ("name=path,name=path").
+"""
+
+import json
+import os
+from collections import Counter, deque
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+import retire_monitor
+
+SIGNALS = {
+    # Low while IF/ID holds its instruction (a stall).
+    "if_id_write": "dut.HazardUnit.o_if_id_write",
+    "if_id_flush": "dut.HazardUnit.o_if_id_flush",
+    "id_ex_flush": "dut.HazardUnit.o_id_ex_flush",
+    # The instruction in EX is a load (a stall is then a load-use stall).
+    "ex_mem_read": "dut.ID_EX.o_mem_read",
+    # The control transfer in EX is a jump rather than a taken branch.
+    "ex_jump": "dut.HazardUnit.i_ex_jump",
+    "id_pc": "dut.IF_ID.o_pc",
+    "ex_pc": "dut.ID_EX.o_pc",
+}
+
+CAUSES = ("load-use", "data hazard", "branch", "jump", "empty")
+
+OPCODES = {
+    0b0110011: "alu",
+    0b0010011: "alu-imm",
+    0b0000011: "load",
+    0b0100011: "store",
+    0b1100011: "branch",
+    0b1101111: "jal",
+    0b1100111: "jalr",
+    0b0110111: "lui",
+    0b0010111: "auipc",
+    0b1110011: "system",
+}
+
+def inst_type(inst: int) -> str:
+    return OPCODES.get(inst & 0x7F, "other")
+
+def resolve(dut, path: str):
+    handle = dut
+    for name in path.split("."):
+        try:
+            handle = getattr(handle, name)
+        except AttributeError:
+            raise AttributeError(f"CPI analyzer: no signal {path!r} (set HART_CPI_SIGNALS to override)") from None
+    return handle
+
+def _int(handle) -> int:
+    try:
+        return handle.value.integer
+    except ValueError:
+        return 0
+
+class CPIAnalyzer:
+    def __init__(self, dut, clk, bus, signals: dict[str, str] | None = None):
+        self.clk = clk
+        self.bus = bus
+        paths = dict(SIGNALS)
+        for item in filter(None, os.getenv("HART_CPI_SIGNALS", "").split(",")):
+            name, path = item.split("=", 1)
+            paths[name.strip()] = path.strip()
+        paths.update(signals or {})
+        self.handles = {name: resolve(dut, path) for name, path in paths.items()}
+
+        self.cycles = 0
+        self.retired = 0
+        self.bubbles = Counter()
+        # pc -> [instruction, retired count, Counter of bubbles by cause]
+        self.pcs = {}
+        self.pending = deque()
+
+    def start(self):
+        return cocotb.start_soon(self._run())
+
+    def _pc(self, pc: int, inst: int | None = None) -> list:
+        entry = self.pcs.get(pc)
+        if entry is None:
+            entry = self.pcs[pc] = [inst, 0, Counter()]
+        elif inst is not None:
+            entry[0] = inst
+        return entry
+
+    async def _run(self):
+        edge = RisingEdge(self.clk)
+        h = self.handles
+        while True:
+            await edge
+            self.cycles += 1
+
+            if_id_flush = _int(h["if_id_flush"])
+            id_ex_flush = _int(h["id_ex_flush"])
+            if if_id_flush:
+                cause = "jump" if _int(h["ex_jump"]) else "branch"
+                bubble = (cause, _int(h["ex_pc"]))
+                self.pending.append(bubble)
+                if id_ex_flush:
+                    self.pending.append(bubble)
+            elif id_ex_flush and not _int(h["if_id_write"]):
+                cause = "load-use" if _int(h["ex_mem_read"]) else "data hazard"
+                self.pending.append((cause, _int(h["id_pc"])))
+
+            try:
+                v = self.bus.value.integer
+            except ValueError:
+                v = 0
+            if v >> retire_monitor.VALID_BIT:
+                self.retired += 1
+                self._pc(v & 0xFFFFFFFF, (v >> 32) & 0xFFFFFFFF)[1] += 1
+                if (v >> retire_monitor.HALT_BIT) & 1:
+                    return
+            elif self.pending:
+                cause, pc = self.pending.popleft()
+                self.bubbles[cause] += 1
+                self._pc(pc)[2][cause] += 1
+            else:
+                self.bubbles["empty"] += 1
+
+    def stack(self) -> dict:
+        """The CPI stack for the whole program, by instruction type and by PC."""
+        n = max(self.retired, 1)
+        types = {}
+        for pc, (inst, count, bubbles) in self.pcs.items():
+            t = types.setdefault(inst_type(inst) if inst is not None else "other", [0, Counter()])
+            t[0] += count
+            t[1].update(bubbles)
+
+        return {
+            "cycles": self.cycles,
+            "retired": self.retired,
+            "cpi": self.cycles / n,
+            "stack": {"base": self.retired / n, **{c: self.bubbles[c] / n for c in CAUSES}},
+            "types": {
+                name: {"retired": count, **{c: bubbles[c] for c in CAUSES if bubbles[c]}}
+                for name, (count, bubbles) in sorted(types.items())
+            },
+            "pcs": {
+                f"{pc:08x}": {
+                    "inst": None if inst is None else f"{inst:08x}",
+                    "retired": count,
+                    **{c: bubbles[c] for c in CAUSES if bubbles[c]},
+                }
+                for pc, (inst, count, bubbles) in sorted(self.pcs.items())
+            },
+        }
+
+    def report(self, top: int = 10) -> str:
+        s = self.stack()
+        lines = [
+            f"Cycles: {s['cycles']}  Instructions retired: {s['retired']}  CPI: {s['cpi']:.3f}",
+            "CPI stack:",
+        ]
+        for cause, cpi in s["stack"].items():
+            lines.append(f"  {cause:<12} {cpi:6.3f}")
+
+        lines.append("Lost cycles by instruction type:")
+        lines.append(f"  {'type':<8} {'retired':>8} " + " ".join(f"{c:>12}" for c in CAUSES[:-1]))
+        for name, t in s["types"].items():
+            lines.append(f"  {name:<8} {t['retired']:>8} " + " ".join(f"{t.get(c, 0):>12}" for c in CAUSES[:-1]))
+
+        lost = sorted(self.pcs.items(), key=lambda e: -sum(e[1][2].values()))
+        lines.append(f"Top {top} PCs by lost cycles:")
+        for pc, (inst, count, bubbles) in lost[:top]:
+            if not bubbles:
+                break
+            causes = ", ".join(f"{c}={n}" for c, n in bubbles.most_common())
+            inst = "xxxxxxxx" if inst is None else f"{inst:08x}"
+            lines.append(f"  [{pc:08x}] {inst} retired={count} {causes}")
+        return "\n".join(lines)
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.stack(), f, indent=4)
@@ -0,0 +1,189 @@
+"""
+Build the hart testbench (tb/tb.v + rtl/) once and run it on any program.
+
+Two simulators are supported:
+- icarus compiles to a vvp script that is interpreted at run time;
+- verilator compiles tb.v into a native executable (`--binary --timing`),
+  which is much faster on long programs.
+Builds are cached by a hash of the sources and options, so each
+submission is compiled once. The testbench takes the program image as
+`+program=<file>`, so the same build runs every program:
+
+    python hartsim.py --sim verilator build
+    python hartsim.py --sim verilator run tests/asm/01add.mem
+
+Verilator is a two-state simulator, and VERILATOR_FLAGS make every value
+that icarus would print as x (e.g. loads from uninitialized data memory)
+0. retire_trace.py reads x digits in icarus traces as 0 too, so both
+simulators pass and fail the same programs. Waveforms need a build with
+--waves.
+
+--netlist simulates a synthesized netlist (e.g. dut.vg) in place of rtl/,
+through the same testbench, so gate-level runs print the same retire
+traces and work with regress.py. Instead of the whole 30,000-line
+rtl/saed32nm.v, only the cells the netlist instantiates (and the UDPs they
+use) are compiled: the library is split into one file per definition once,
+in CELL_CACHE, and the subset for a netlist is cached next to it.
+
+    python hartsim.py --netlist ../project4/dut.vg --project ../project4 run tb/program.mem
+"""
+
+import argparse
+import hashlib
+import os
+import pathlib
+import re
+import shutil
+import subprocess
+import sys
+
+# Not part of the RTL simulation: the standard cell library (post-synthesis
+# only).
+EXCLUDE = {"saed32nm.v"}
+
+SIMS = ("icarus", "verilator")
+SIM = os.getenv("SIM", "icarus")
+BUILD_CACHE = pathlib.Path(os.getenv("SIM_BUILD_CACHE", "sim_build"))
+CELL_CACHE = pathlib.Path(os.getenv("CELL_CACHE", pathlib.Path.home() / ".cache" / "ece552-cells"))
+CELL_LIBRARY = "saed32nm.v"
+
+DEFINITION = re.compile(r"^(?:module|primitive)\s+(\w+)", re.M)
+STATEMENT = re.compile(r"^\s*([A-Za-z_]\w*)\s", re.M)
+
+VERILATOR_FLAGS = ["--binary", "--timing", "-O3", "-Wno-fatal", "-Wno-lint", "-Wno-style",
+                   "--x-initial", "0", "--x-assign", "0"]
+
+def split_library(library: pathlib.Path) -> pathlib.Path:
+    """
+    Split a cell library into one file per module or primitive, each with
+    the compiler directives in front of it. Cached by the library's hash;
+    returns the directory.
+    """
+    text = library.read_text()
+    cache = CELL_CACHE / hashlib.sha256(text.encode()).hexdigest()[:16]
+    if cache.exists():
+        return cache
+
+    tmp = cache.with_name(cache.name + f".{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    (tmp / "netlists").mkdir(parents=True)
+    chunk = []
+    for line in text.splitlines(keepends=True):
+        chunk.append(line)
+        if line.startswith(("endmodule", "endprimitive")):
+            chunk = "".join(chunk)
+            (tmp / f"{DEFINITION.search(chunk).group(1)}.v").write_text(chunk)
+            chunk = []
+    try:
+        os.rename(tmp, cache)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return cache
+
+def cells(netlist: pathlib.Path, library: pathlib.Path) -> pathlib.Path:
+    """One file with the library cells a netlist instantiates, and the primitives they use."""
+    split = split_library(library)
+    available = {f.stem for f in split.glob("*.v")}
+    needed = set()
+    todo = set(STATEMENT.findall(netlist.read_text())) & available
+    while todo:
+        name = todo.pop()
+        needed.add(name)
+        todo |= (set(STATEMENT.findall((split / f"{name}.v").read_text())) & available) - needed
+
+    names = sorted(needed)
+    subset = split / "netlists" / f"{hashlib.sha256(' '.join(names).encode()).hexdigest()[:16]}.v"
+    if not subset.exists():
+        tmp = subset.with_name(subset.name + f".{os.getpid()}")
+        tmp.write_text("".join((split / f"{name}.v").read_text() for name in names))
+        os.replace(tmp, subset)
+    return subset
+
+def sources(project: pathlib.Path, netlist: pathlib.Path | None = None) -> list[pathlib.Path]:
+    """
+    tb.v and the RTL. A file none of whose modules the other sources
+    instantiate (e.g. the unfinished branch_predict.v stub) is left out,
+    so it is compiled as soon as the hart uses it.
+    """
+    if netlist is not None:
+        return [project / "tb" / "tb.v", netlist, cells(netlist, project / "rtl" / CELL_LIBRARY)]
+    files = [project / "tb" / "tb.v"] + sorted(f for f in (project / "rtl").glob("*.v") if f.name not in EXCLUDE)
+    texts = {f: f.read_text() for f in files}
+    used = {f: set(STATEMENT.findall(text)) for f, text in texts.items()}
+    return [files[0]] + [f for f in files[1:]
+                         if any(set(DEFINITION.findall(texts[f])) & used[g] for g in files if g != f)]
+
+def build_hash(files: list[pathlib.Path], sim: str, waves: bool) -> str:
+    h = hashlib.sha256()
+    h.update(f"{sim}\0{waves}\0{' '.join(VERILATOR_FLAGS)}\0".encode())
+    for f in files:
+        h.update(f.name.encode() + b"\0" + f.read_bytes() + b"\0")
+    return h.hexdigest()
+
+def build(project: pathlib.Path, sim: str = SIM, waves: bool = False, jobs: int | None = None,
+          netlist: pathlib.Path | None = None) -> pathlib.Path:
+    """Compile the testbench, or reuse a cached build. Returns the simulation executable."""
+    files = sources(project, netlist)
+    defines = ["HART_NETLIST"] if netlist is not None else []
+    build_dir = (BUILD_CACHE / f"hart_tb-{sim}-{build_hash(files, sim, waves)[:16]}").resolve()
+    exe = build_dir / "hart_sim"
+    if exe.exists():
+        return exe
+
+    tmp = build_dir.with_name(build_dir.name + f".{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    if sim == "icarus":
+        cmd = ["iverilog", "-g2012", "-o", str(tmp / "hart_sim"), "-s", "hart_tb", *(f"-D{d}" for d in defines), *map(str, files)]
+    elif sim == "verilator":
+        cmd = ["verilator", *VERILATOR_FLAGS, "-j", str(jobs or os.cpu_count() or 1),
+               "--top-module", "hart_tb", "--Mdir", str(tmp / "obj_dir"), "-o", str(tmp / "hart_sim")]
+        cmd += ["--trace-fst"] if waves else ["+define+HART_NO_WAVES"]
+        cmd += [f"+define+{d}" for d in defines]
+        cmd += list(map(str, files))
+    else:
+        raise ValueError(f"SIM={sim}: expected one of {', '.join(SIMS)}")
+
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if result.returncode != 0:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise RuntimeError(f"{cmd[0]} failed:\n{result.stdout}")
+    shutil.rmtree(tmp / "obj_dir", ignore_errors=True)
+
+    # Another process may have finished the same build first; either copy
+    # is fine.
+    try:
+        os.rename(tmp, build_dir)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return exe
+
+def command(exe: pathlib.Path, program: pathlib.Path | None = None, plusargs: list[str] | None = None) -> list[str]:
+    """The command line that runs a build from build() on a program."""
+    args = ([f"+program={program}"] if program is not None else []) + list(plusargs or [])
+    if exe.parent.name.startswith("hart_tb-icarus-"):
+        return ["vvp", "-n", str(exe), *args]
+    return [str(exe), *args]
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the hart testbench once and run programs on it.")
+    parser.add_argument("--sim", choices=SIMS, default=SIM)
+    parser.add_argument("--project", type=pathlib.Path, default=pathlib.Path(__file__).parent,
+                        help="project directory with rtl/ and tb/tb.v (default: project5)")
+    parser.add_argument("--waves", action="store_true", help="verilator: build with FST tracing for +waves=fst")
+    parser.add_argument("--netlist", type=pathlib.Path, help="simulate this synthesized netlist instead of rtl/")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="compile and print the executable's path")
+    p = commands.add_parser("run", help="run a program (in the current directory)")
+    p.add_argument("program", type=pathlib.Path)
+    p.add_argument("plusargs", nargs="*", help="extra plusargs, e.g. +max_cycles=100000")
+    args = parser.parse_args()
+
+    exe = build(args.project.resolve(), args.sim, args.waves, netlist=args.netlist and args.netlist.resolve())
+    if args.command == "build":
+        print(exe)
+        return 0
+    return subprocess.run(command(exe, args.program.resolve(), args.plusargs)).returncode
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+"""
+Reference instruction set simulator (ISS) for the WISC-F25 (RV32I) hart.
+
+Runs a `program.mem` image the same way the testbench does (separate
+instruction and data memories, execution starts at address 0 and stops at
+`ebreak`) and produces one retire record per instruction with the same
+fields as the hart's `o_retire_*` interface. This is the golden model for
+the retire traces printed by `tb/tb.v`:
+
+    python iss.py tb/program.mem                  # project5 trace format
+    python iss.py tb/program.mem --format project4
+    python iss.py tb/program.mem -o traces/01add.trace
+
+Each instruction is decoded once, the first time its pc is fetched, into
+a handler closure with its register indices and immediate bound in. The
+hot loop is then just a table lookup and a call per instruction.
+"""
+
+import argparse
+import gc
+import pathlib
+import sys
+from collections import namedtuple
+
+import rv
+
+MASK = 0xFFFFFFFF
+HALT = 0x00100073  # ebreak
+
+# Retire record, in the order of the hart's o_retire_* ports. Fields that
+# are don't-care for an instruction (e.g. dmem_* for an add) are zero.
+Retire = namedtuple("Retire", [
+    "pc", "inst", "trap", "halt",
+    "rs1_raddr", "rs1_rdata", "rs2_raddr", "rs2_rdata",
+    "rd_waddr", "rd_wdata",
+    "dmem_addr", "dmem_ren", "dmem_wen", "dmem_mask", "dmem_rdata", "dmem_wdata",
+    "next_pc",
+])
+
+# Handler kinds in the decode table.
+(K_OP, K_OPIMM, K_LOAD, K_STORE, K_BRANCH, K_JAL, K_JALR,
+ K_LUI, K_AUIPC, K_HALT, K_TRAP) = range(11)
+
+def _sra(a: int, b: int) -> int:
+    return ((a - ((a & 0x80000000) << 1)) >> (b & 0x1F)) & MASK
+
+# funct3 (plus funct7 bit 5 as bit 3) -> operation on unsigned 32-bit ints.
+ALU = {
+    0b0000: lambda a, b: (a + b) & MASK,                                    # add
+    0b1000: lambda a, b: (a - b) & MASK,                                    # sub
+    0b0001: lambda a, b: (a << (b & 0x1F)) & MASK,                          # sll
+    0b0010: lambda a, b: int((a ^ 0x80000000) < (b ^ 0x80000000)),          # slt
+    0b0011: lambda a, b: int(a < b),                                        # sltu
+    0b0100: lambda a, b: a ^ b,                                             # xor
+    0b0101: lambda a, b: a >> (b & 0x1F),                                   # srl
+    0b1101: _sra,                                                           # sra
+    0b0110: lambda a, b: a | b,                                             # or
+    0b0111: lambda a, b: a & b,                                             # and
+}
+
+BRANCH = {
+    0b000: lambda a, b: a == b,                                             # beq
+    0b001: lambda a, b: a != b,                                             # bne
+    0b100: lambda a, b: (a ^ 0x80000000) < (b ^ 0x80000000),                # blt
+    0b101: lambda a, b: (a ^ 0x80000000) >= (b ^ 0x80000000),               # bge
+    0b110: lambda a, b: a < b,                                              # bltu
+    0b111: lambda a, b: a >= b,                                             # bgeu
+}
+
+# funct3 -> (access size, sign extend)
+LOADS = {0b000: (1, True), 0b001: (2, True), 0b010: (4, False), 0b100: (1, False), 0b101: (2, False)}
+STORES = {0b000: 1, 0b001: 2, 0b010: 4}
+
+def sext(value: int, bits: int) -> int:
+    sign = 1 << (bits - 1)
+    return ((value & (sign - 1)) - (value & sign)) & MASK
+
+def decode(inst: int) -> tuple:
+    """
+    Decode an instruction word into a (kind, rd, rs1, rs2, imm, fn) entry
+    of the decode table. Immediates are stored as unsigned 32-bit values.
+    """
+    opcode = inst & 0x7F
+    rd = (inst >> 7) & 0x1F
+    funct3 = (inst >> 12) & 0x7
+    rs1 = (inst >> 15) & 0x1F
+    rs2 = (inst >> 20) & 0x1F
+    funct7 = inst >> 25
+    imm_i = rv.immediate(inst, rv.I) & MASK
+
+    trap = (K_TRAP, 0, 0, 0, 0, None)
+    if opcode == 0b0110011:
+        if funct7 not in (0, 0b0100000) or (funct7 and funct3 not in (0b000, 0b101)):
+            return trap
+        return (K_OP, rd, rs1, rs2, 0, ALU[funct3 | (funct7 >> 2)])
+    if opcode == 0b0010011:
+        if funct3 == 0b001 and funct7 != 0:
+            return trap
+        if funct3 == 0b101:
+            if funct7 not in (0, 0b0100000):
+                return trap
+            return (K_OPIMM, rd, rs1, 0, rs2, ALU[funct3 | (funct7 >> 2)])
+        return (K_OPIMM, rd, rs1, 0, imm_i, ALU[funct3])
+    if opcode == 0b0000011:
+        if funct3 not in LOADS:
+            return trap
+        return (K_LOAD, rd, rs1, 0, imm_i, LOADS[funct3])
+    if opcode == 0b0100011:
+        if funct3 not in STORES:
+            return trap
+        imm = rv.immediate(inst, rv.S) & MASK
+        return (K_STORE, 0, rs1, rs2, imm, STORES[funct3])
+    if opcode == 0b1100011:
+        if funct3 not in BRANCH:
+            return trap
+        imm = rv.immediate(inst, rv.B) & MASK
+        return (K_BRANCH, 0, rs1, rs2, imm, BRANCH[funct3])
+    if opcode == 0b1101111:
+        imm = rv.immediate(inst, rv.J) & MASK
+        # jal has no rs1, but the hart still reads (and project4's tb.v
+        # prints) the register named by inst[19:15].
+        return (K_JAL, rd, rs1, 0, imm, None)
+    if opcode == 0b1100111:
+        if funct3 != 0:
+            return trap
+        return (K_JALR, rd, rs1, 0, imm_i, None)
+    if opcode == 0b0110111:
+        return (K_LUI, rd, 0, 0, inst & 0xFFFFF000, None)
+    if opcode == 0b0010111:
+        return (K_AUIPC, rd, 0, 0, inst & 0xFFFFF000, None)
+    if inst == HALT:
+        return (K_HALT, 0, 0, 0, 0, None)
+    return trap
+
+def load_mem(path: pathlib.Path) -> bytearray:
+    """
+    Load a `$readmemh` byte image (as written by the asm Makefile) into a
+    bytearray starting at address 0.
+    """
+    image = bytearray()
+    addr = 0
+    for line in pathlib.Path(path).read_text().splitlines():
+        line = line.split("//", 1)[0]
+        for token in line.split():
+            if token.startswith("@"):
+                addr = int(token[1:], 16)
+                continue
+            if addr >= len(image):
+                image.extend(bytes(addr + 1 - len(image)))
+            image[addr] = int(token, 16)
+            addr += 1
+    return image
+
+# Byte-lane mask (dmem_mask) -> bit mask of the lanes within a word.
+LANES = [sum(0xFF << (8 * i) for i in range(4) if mask >> i & 1) for mask in range(16)]
+
+class Memory:
+    """
+    Sparse little-endian data memory, stored as a dict of aligned 32-bit
+    words. Words that were never written read as zero.
+    """
+
+    def __init__(self):
+        self.words: dict[int, int] = {}
+
+    def read_word(self, addr: int) -> int:
+        return self.words.get(addr & ~3, 0)
+
+    def write_word(self, addr: int, data: int, mask: int) -> None:
+        lanes = LANES[mask]
+        addr &= ~3
+        self.words[addr] = (self.words.get(addr, 0) & ~lanes) | (data & lanes)
+
+    def load(self, addr: int, data: bytes) -> None:
+        for i, byte in enumerate(data):
+            self.write_word(addr + i, byte << (8 * ((addr + i) & 3)), 1 << ((addr + i) & 3))
+
+class ISS:
+    def __init__(self, program: bytes, reset_addr: int = 0):
+        self.imem = bytes(program)
+        self.dmem = Memory()
+        # x[32] is a scratch slot that instructions with rd=x0 write to, so
+        # that handlers never have to special case x0.
+        self.x = [0] * 33
+        self.pc = reset_addr
+        self.halted = False
+        self.trapped = False
+        self.retired = 0
+        self._handlers: dict[int, object] = {}
+        self._record = None
+
+    @classmethod
+    def from_mem(cls, path: pathlib.Path, **kwargs) -> "ISS":
+        return cls(load_mem(path), **kwargs)
+
+    @property
+    def regs(self) -> list[int]:
+        return self.x[:32]
+
+    def fetch(self, pc: int) -> int:
+        return int.from_bytes(self.imem[pc:pc + 4].ljust(4, b"\0"), "little")
+
+    def run(self, max_instructions: int = 1_000_000, trace: bool = True) -> list[tuple]:
+        """
+        Execute until `ebreak`, a trap, or `max_instructions` instructions
+        have retired. Returns the retire records (as plain tuples in
+        `Retire` field order) if `trace` is set, otherwise an empty list.
+
+        A trapping instruction is retired with `trap` set and no side
+        effects, and ends the run.
+        """
+        records = []
+        record = records.append if trace else None
+        if record is not self._record:
+            # Handlers close over the record callback; recompile lazily.
+            self._handlers.clear()
+            self._record = record
+
+        handlers = self._handlers
+        pc = self.pc
+        retired = max_instructions
+        if self.halted or self.trapped:
+            return records
+
+        # The records are millions of small tuples that can't form cycles;
+        # letting the collector scan the growing list costs more than
+        # building them.
+        collect = gc.isenabled()
+        gc.disable()
+        try:
+            for count in range(1, max_instructions + 1):
+                handler = handlers.get(pc)
+                if handler is None:
+                    handler = handlers[pc] = self._compile(pc, self.fetch(pc))
+                pc = handler(pc)
+                if pc is None:
+                    retired = count
+                    break
+            else:
+                self.pc = pc
+        finally:
+            if collect:
+                gc.enable()
+
+        self.retired += retired
+        return records
+
+    def _stop(self, pc: int, trap: bool) -> None:
+        self.pc = pc
+        if trap:
+            self.trapped = True
+        else:
+            self.halted = True
+
+    def _compile(self, pc: int, inst: int):
+        """
+        Build the handler for the instruction at `pc`: a closure that
+        executes it, records the retire fields, and returns the next pc (or
+        None once the program halts or traps).
+        """
+        kind, rd, rs1, rs2, imm, fn = decode(inst)
+        x = self.x
+        words = self.dmem.words
+        record = self._record
+        wd = rd if rd else 32
+        stop = self._stop
+        # Everything that depends only on the pc is bound in here, so that
+        # the handlers (called with their own pc) only do the dynamic work.
+        nxt = (pc + 4) & MASK
+        keep = MASK if rd else 0
+
+        def trap(pc, rs1=0, a=0, rs2=0, b=0):
+            if record:
+                record((pc, inst, 1, 0, rs1, a, rs2, b, 0, 0, 0, 0, 0, 0, 0, 0, pc))
+            stop(pc, True)
+
+        if kind == K_OPIMM:
+            def handler(pc):
+                a = x[rs1]
+                x[wd] = value = fn(a, imm)
+                if record:
+                    record((pc, inst, 0, 0, rs1, a, 0, 0, rd, value & keep, 0, 0, 0, 0, 0, 0, nxt))
+                return nxt
+        elif kind == K_OP:
+            def handler(pc):
+                a = x[rs1]
+                b = x[rs2]
+                x[wd] = value = fn(a, b)
+                if record:
+                    record((pc, inst, 0, 0, rs1, a, rs2, b, rd, value & keep, 0, 0, 0, 0, 0, 0, nxt))
+                return nxt
+        elif kind == K_BRANCH:
+            taken_pc = (pc + imm) & MASK
+            def handler(pc):
+                a = x[rs1]
+                b = x[rs2]
+                next_pc = nxt
+                if fn(a, b):
+                    next_pc = taken_pc
+                    if next_pc & 3:
+                        return trap(pc, rs1, a, rs2, b)
+                if record:
+                    record((pc, inst, 0, 0, rs1, a, rs2, b, 0, 0, 0, 0, 0, 0, 0, 0, next_pc))
+                return next_pc
+        elif kind == K_LOAD:
+            size, signed = fn
+            width = 8 * size
+            def handler(pc):
+                a = x[rs1]
+                addr = (a + imm) & MASK
+                if addr & (size - 1):
+                    return trap(pc, rs1, a)
+                word = words.get(addr & ~3, 0)
+                value = (word >> (8 * (addr & 3))) & ((1 << width) - 1)
+                if signed:
+                    value = sext(value, width)
+                x[wd] = value
+                if record:
+                    mask = ((1 << size) - 1) << (addr & 3)
+                    record((pc, inst, 0, 0, rs1, a, 0, 0, rd, value & keep, addr & ~3, 1, 0, mask, word, 0, nxt))
+                return nxt
+        elif kind == K_STORE:
+            size = fn
+            def handler(pc):
+                a = x[rs1]
+                b = x[rs2]
+                addr = (a + imm) & MASK
+                if addr & (size - 1):
+                    return trap(pc, rs1, a, rs2, b)
+                mask = ((1 << size) - 1) << (addr & 3)
+                data = (b << (8 * (addr & 3))) & MASK
+                lanes = LANES[mask]
+                words[addr & ~3] = (words.get(addr & ~3, 0) & ~lanes) | (data & lanes)
+                if record:
+                    record((pc, inst, 0, 0, rs1, a, rs2, b, 0, 0, addr & ~3, 0, 1, mask, 0, data, nxt))
+                return nxt
+        elif kind == K_LUI or kind == K_AUIPC:
+            value = imm if kind == K_LUI else (pc + imm) & MASK
+            def handler(pc):
+                x[wd] = value
+                if record:
+                    record((pc, inst, 0, 0, 0, 0, 0, 0, rd, value & keep, 0, 0, 0, 0, 0, 0, nxt))
+                return nxt
+        elif kind == K_JAL:
+            target = (pc + imm) & MASK
+            def handler(pc):
+                a = x[rs1]
+                if target & 3:
+                    return trap(pc, rs1, a)
+                x[wd] = nxt
+                if record:
+                    record((pc, inst, 0, 0, rs1, a, 0, 0, rd, nxt & keep, 0, 0, 0, 0, 0, 0, target))
+                return target
+        elif kind == K_JALR:
+            def handler(pc):
+                a = x[rs1]
+                target = (a + imm) & 0xFFFFFFFE
+                if target & 3:
+                    return trap(pc, rs1, a)
+                x[wd] = nxt
+                if record:
+                    record((pc, inst, 0, 0, rs1, a, 0, 0, rd, nxt & keep, 0, 0, 0, 0, 0, 0, target))
+                return target
+        elif kind == K_HALT:
+            def handler(pc):
+                if record:
+                    record((pc, inst, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, pc))
+                return stop(pc, False)
+        else:
+            def handler(pc):
+                return trap(pc)
+
+        return handler
+
+def format_retire(r: tuple, fmt: str = "project5", cycle: int = 0) -> str:
+    """
+    Format a retire record exactly like the `$write` calls in `tb/tb.v`.
+    The project4 testbench additionally prefixes each line with the cycle
+    number; the single-cycle hart retires one instruction per cycle, so
+    this is the 1-based index of the instruction.
+    """
+    pc, inst = r[0], r[1]
+    opcode = inst & 0x7F
+    if fmt == "project4":
+        line = f"{cycle:05d} "
+        no_rs = (inst & 0xF) == 0b0111 or opcode == 0b1110011
+        rs1_only = opcode in (0b0010011, 0b0000011, 0b1101111, 0b1100111)
+    else:
+        line = ""
+        no_rs = (inst & 0xF) == 0b0111 or opcode in (0b1110011, 0b1101111)
+        rs1_only = opcode in (0b0010011, 0b0000011, 0b1100111)
+
+    if no_rs:
+        line += f"[{pc:08x}] {inst:08x} r[xx]=xxxxxxxx r[xx]=xxxxxxxx"
+    elif rs1_only:
+        line += f"[{pc:08x}] {inst:08x} r[{r[4]:2d}]={r[5]:08x} r[xx]=xxxxxxxx"
+    else:
+        line += f"[{pc:08x}] {inst:08x} r[{r[4]:2d}]={r[5]:08x} r[{r[6]:2d}]={r[7]:08x}"
+    if r[8] != 0:
+        line += f" w[{r[8]:2d}]={r[9]:08x}"
+    if r[11]:
+        line += f" l[{r[10]:08x},{r[13]:04b}]={r[14]:08x}"
+    if r[12]:
+        line += f" s[{r[10]:08x},{r[13]:04b}]={r[15]:08x}"
+    if r[2]:
+        line += " TRAP"
+    return line
+
+def main():
+    parser = argparse.ArgumentParser(description="WISC-F25 reference ISS: print the golden retire trace of a program.")
+    parser.add_argument("program", type=pathlib.Path, help="program image in $readmemh format (e.g. tb/program.mem)")
+    parser.add_argument("-o", "--output", type=pathlib.Path, help="write the trace here instead of stdout")
+    parser.add_argument("--format", choices=("project4", "project5"), default="project5", help="testbench trace format to match")
+    parser.add_argument("--max-instructions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    iss = ISS.from_mem(args.program)
+    records = iss.run(args.max_instructions)
+    out = open(args.output, "w") if args.output else sys.stdout
+    with out:
+        for cycle, r in enumerate(records, start=1):
+            out.write(format_retire(r, args.format, cycle) + "\n")
+
+    if not iss.halted:
+        reason = "trapped" if iss.trapped else f"did not halt within {args.max_instructions} instructions"
+        print(f"Program {reason} (pc={iss.pc:08x}).", file=sys.stderr)
+    print(f"r[a0]={iss.regs[10]:08x} ({iss.regs[10]})", file=sys.stderr)
+    return 0 if iss.halted else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
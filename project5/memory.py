@@ -0,0 +1,188 @@
+"""
+Sparse memory model for the cocotb hart tests.
+
+tb/hart_harness.v gives the hart 1 KiB instruction and data arrays, like
+tb.v. With +external_memory it serves both ports from its inputs instead,
+and MemoryModel drives them from two SparseMemory instances: the whole
+32-bit address space, allocated in PAGE_SIZE pages on first write, with
+unwritten bytes reading as zero (like iss.Memory). Reads are synchronous
+and writes honour the byte mask, as in the harness's arrays.
+
+Programs load straight from the assembler's output (a `$readmemh` .mem, an
+objcopy .bin, rv.py source, or a list of words), and data arrays of any
+size load with one call:
+
+    model = MemoryModel(dut.i_clk, dut.o_mem, dut.i_imem_rdata, dut.i_dmem_rdata)
+    model.imem.load_program(PROGRAM)
+    model.dmem.write(0x10000, np.arange(1 << 16, dtype=np.uint32))
+    model.start()
+
+At halt, snapshot() returns the written pages as NumPy arrays of words, and
+diff() compares two snapshots (e.g. against snapshot_words() of the
+reference ISS's data memory) in one vectorized pass per page.
+"""
+
+import pathlib
+
+import cocotb
+import numpy as np
+from cocotb.triggers import RisingEdge
+
+import iss
+import rv
+
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+PAGE_WORDS = PAGE_SIZE // 4
+
+_XZ = str.maketrans("xXzZuUwW-", "000000000")
+
+class SparseMemory:
+    def __init__(self):
+        self.pages: dict[int, bytearray] = {}
+
+    def _page(self, number: int) -> bytearray:
+        page = self.pages.get(number)
+        if page is None:
+            page = self.pages[number] = bytearray(PAGE_SIZE)
+        return page
+
+    def read_word(self, addr: int) -> int:
+        page = self.pages.get(addr >> PAGE_BITS)
+        if page is None:
+            return 0
+        offset = addr & PAGE_MASK & ~3
+        return int.from_bytes(page[offset:offset + 4], "little")
+
+    def write_word(self, addr: int, data: int, mask: int) -> None:
+        page = self._page(addr >> PAGE_BITS)
+        offset = addr & PAGE_MASK & ~3
+        if mask == 0b1111:
+            page[offset:offset + 4] = data.to_bytes(4, "little")
+            return
+        for i in range(4):
+            if mask >> i & 1:
+                page[offset + i] = data >> (8 * i) & 0xFF
+
+    def write(self, addr: int, data) -> None:
+        """
+        Store bytes, or a NumPy array in little-endian order, at `addr`,
+        a page at a time.
+        """
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data, dtype=data.dtype.newbyteorder("<")).tobytes()
+        view = memoryview(data).cast("B")
+        while view:
+            offset = addr & PAGE_MASK
+            n = min(PAGE_SIZE - offset, len(view))
+            self._page(addr >> PAGE_BITS)[offset:offset + n] = view[:n]
+            addr, view = addr + n, view[n:]
+
+    def read(self, addr: int, length: int) -> bytes:
+        out = bytearray(length)
+        done = 0
+        while done < length:
+            offset = addr & PAGE_MASK
+            n = min(PAGE_SIZE - offset, length - done)
+            page = self.pages.get(addr >> PAGE_BITS)
+            if page is not None:
+                out[done:done + n] = page[offset:offset + n]
+            addr, done = addr + n, done + n
+        return bytes(out)
+
+    def load_program(self, program, addr: int = 0) -> None:
+        """
+        Load a program image: a `.mem` ($readmemh bytes, as written by the
+        asm Makefile and corpus.py), a raw `.bin`, an `.s` that rv.py can
+        assemble, or a sequence of instruction words.
+        """
+        if isinstance(program, (str, pathlib.Path)):
+            path = pathlib.Path(program)
+            if path.suffix == ".mem":
+                image = bytes(iss.load_mem(path))
+            elif path.suffix == ".s":
+                image = np.array(rv.assemble_program(path.read_text()), dtype="<u4").tobytes()
+            else:
+                image = path.read_bytes()
+        else:
+            image = np.asarray(program, dtype="<u4").tobytes()
+        self.write(addr, image)
+
+    def words(self, addr: int, count: int) -> np.ndarray:
+        return np.frombuffer(self.read(addr, 4 * count), dtype="<u4")
+
+    def snapshot(self) -> dict[int, np.ndarray]:
+        """A copy of every allocated page, keyed by base address, as words."""
+        return {number << PAGE_BITS: np.frombuffer(bytes(page), dtype="<u4") for number, page in self.pages.items()}
+
+def snapshot_words(words: dict[int, int]) -> dict[int, np.ndarray]:
+    """A snapshot() of a word dictionary such as iss.Memory.words."""
+    if not words:
+        return {}
+    addrs = np.fromiter(words.keys(), dtype=np.uint64, count=len(words))
+    values = np.fromiter(words.values(), dtype=np.uint32, count=len(words))
+    numbers = addrs >> PAGE_BITS
+    snapshot = {}
+    for number in np.unique(numbers):
+        page = np.zeros(PAGE_WORDS, dtype="<u4")
+        selected = numbers == number
+        page[(addrs[selected] & PAGE_MASK) >> 2] = values[selected]
+        snapshot[int(number) << PAGE_BITS] = page
+    return snapshot
+
+def diff(actual: dict[int, np.ndarray], expected: dict[int, np.ndarray], limit: int = 10) -> tuple[int, list[tuple[int, int, int]]]:
+    """
+    Compare two snapshots, treating missing pages as zero. Returns the
+    number of differing words and the first `limit` of them as
+    (address, actual, expected).
+    """
+    zero = np.zeros(PAGE_WORDS, dtype="<u4")
+    count = 0
+    first = []
+    for base in sorted(actual.keys() | expected.keys()):
+        a, e = actual.get(base, zero), expected.get(base, zero)
+        index, = np.nonzero(a != e)
+        count += len(index)
+        for i in index[:limit - len(first)]:
+            first.append((base + 4 * int(i), int(a[i]), int(e[i])))
+    return count, first
+
+class MemoryModel:
+    """
+    Serves hart_harness's o_mem requests from `imem` and `dmem`. The
+    request bus is read once per clock, and reads see the memory before
+    that edge's write, like the harness's arrays.
+    """
+    def __init__(self, clk, bus, imem_rdata, dmem_rdata,
+                 imem: SparseMemory | None = None, dmem: SparseMemory | None = None):
+        self.clk = clk
+        self.bus = bus
+        self.imem_rdata = imem_rdata
+        self.dmem_rdata = dmem_rdata
+        self.imem = imem if imem is not None else SparseMemory()
+        self.dmem = dmem if dmem is not None else SparseMemory()
+
+    def start(self):
+        return cocotb.start_soon(self._run())
+
+    async def _run(self):
+        edge = RisingEdge(self.clk)
+        bus = self.bus
+        imem, dmem = self.imem, self.dmem
+        imem_rdata, dmem_rdata = self.imem_rdata, self.dmem_rdata
+
+        while True:
+            await edge
+            value = bus.value
+            try:
+                v = value.integer
+            except ValueError:
+                # Requests are unresolved while the hart is in reset.
+                v = int(value.binstr.translate(_XZ), 2)
+
+            imem_rdata.value = imem.read_word(v & 0xFFFFFFFF)
+            addr = v >> 32 & 0xFFFFFFFF
+            dmem_rdata.value = dmem.read_word(addr) if v >> 101 & 1 else 0
+            if v >> 100 & 1:
+                dmem.write_word(addr, v >> 64 & 0xFFFFFFFF, v >> 96 & 0xF)
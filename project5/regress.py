@@ -0,0 +1,150 @@
+"""
+Run the hart on a whole corpus of programs in parallel.
+
+The hart and tb/tb.v are compiled once, with icarus or Verilator (see
+hartsim.py). Then every program runs on a
+process pool, in its own directory with its own program.mem, and its
+retire trace is checked against the reference ISS as it is printed
+(retire_trace.run_and_compare). A run stops at the first mismatch, at its
+cycle limit, or at its wall-clock timeout. The results come back as one
+table.
+
+    python regress.py tests/asm
+    python regress.py tests/asm/*.mem --jobs 8 --json results.json
+    python regress.py --project ../project4 ../project4/tests/asm
+    python regress.py --project ../project4 --netlist ../project4/dut.vg ../project4/tests/asm
+
+.asm files are assembled first (see corpus.py). A program's cycle limit
+is CYCLES_PER_INSTRUCTION times the instruction count of its ISS run, plus
+a margin, unless --max-cycles is given.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import re
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import corpus
+import hartsim
+import iss
+import retire_trace
+
+CYCLES_PER_INSTRUCTION = 10
+CYCLE_MARGIN = 1000
+TIMEOUT = float(os.getenv("REGRESS_TIMEOUT", "300"))
+
+HALTED = re.compile(r"Program halted after\s+(\d+) cycles")
+RETIRED = re.compile(r"Total instructions retired:\s+(\d+)")
+
+def run_program(program: pathlib.Path, sim: pathlib.Path, work: pathlib.Path, fmt: str,
+                max_cycles: int | None, timeout: float) -> dict:
+    golden = iss.ISS.from_mem(program)
+    records = golden.run()
+    if max_cycles is None:
+        max_cycles = len(records) * CYCLES_PER_INSTRUCTION + CYCLE_MARGIN
+
+    # Programs from different directories may share a stem.
+    run_dir = work / f"{program.stem}-{hashlib.sha256(str(program).encode()).hexdigest()[:8]}"
+    shutil.rmtree(run_dir, ignore_errors=True)
+    run_dir.mkdir(parents=True)
+    shutil.copyfile(program, run_dir / "program.mem")
+
+    expected = (retire_trace.parse_line(iss.format_retire(r, fmt, cycle)) for cycle, r in enumerate(records, start=1))
+    mismatch, output = retire_trace.run_and_compare(
+        hartsim.command(sim, plusargs=[f"+max_cycles={max_cycles}"]), expected, cwd=run_dir, timeout=timeout,
+    )
+
+    result = {
+        "program": str(program),
+        "status": "pass",
+        "cycles": None,
+        "instructions": None,
+        "cpi": None,
+        "detail": "",
+    }
+    text = "\n".join(output)
+    if (m := HALTED.search(text)) is not None:
+        result["cycles"] = int(m.group(1))
+    if (m := RETIRED.search(text)) is not None:
+        result["instructions"] = int(m.group(1))
+    elif mismatch is None:
+        # project4's testbench doesn't count; a matching trace retired
+        # exactly the golden instructions.
+        result["instructions"] = len(records)
+    if result["cycles"] and result["instructions"]:
+        result["cpi"] = result["cycles"] / result["instructions"]
+
+    if "Cycle limit of" in text:
+        result["status"] = "cycle limit"
+        result["detail"] = f"no halt within {max_cycles} cycles"
+    elif mismatch is not None:
+        result["status"] = "timeout" if mismatch.field.startswith("timed out") else "mismatch"
+        result["detail"] = retire_trace.report(mismatch)
+    elif not golden.halted:
+        result["status"] = "no golden"
+        result["detail"] = "the program does not halt on the reference ISS"
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the hart on every program of a corpus in parallel.")
+    parser.add_argument("programs", type=pathlib.Path, nargs="*",
+                        default=[pathlib.Path(__file__).parent / "tests" / "asm"],
+                        help=".mem or .asm files, or directories of them (default: tests/asm)")
+    parser.add_argument("--project", type=pathlib.Path, default=pathlib.Path(__file__).parent,
+                        help="project directory with rtl/ and tb/tb.v (default: project5)")
+    parser.add_argument("--sim", choices=hartsim.SIMS, default=hartsim.SIM)
+    parser.add_argument("--netlist", type=pathlib.Path, help="run a synthesized netlist (e.g. dut.vg) instead of rtl/")
+    parser.add_argument("--work-dir", type=pathlib.Path, default=pathlib.Path("regress"))
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--max-cycles", type=int, help="cycle limit for every program")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="wall-clock limit per program, in seconds")
+    parser.add_argument("--json", type=pathlib.Path, help="also write the results here")
+    args = parser.parse_args()
+
+    fmt = "project4" if (args.project.resolve().name == "project4") else "project5"
+
+    programs = []
+    for path in args.programs:
+        if path.is_dir():
+            asm = sorted(path.glob("*.asm"))
+            mem = [p for p in sorted(path.glob("*.mem")) if p.with_suffix(".asm") not in asm]
+            programs += asm + mem
+        else:
+            programs.append(path)
+    asm = [p for p in programs if p.suffix == ".asm"]
+    if asm:
+        for path, error in corpus.build(asm).items():
+            if error is not None:
+                print(f"{path}: failed to assemble\n{error}", file=sys.stderr)
+                programs.remove(path)
+    programs = list(dict.fromkeys(p.with_suffix(".mem").resolve() for p in programs))
+
+    sim = hartsim.build(args.project.resolve(), args.sim, netlist=args.netlist and args.netlist.resolve())
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(run_program, p, sim, args.work_dir.resolve(), fmt, args.max_cycles, args.timeout)
+                   for p in programs]
+        results = [f.result() for f in futures]
+
+    names = {r["program"]: os.path.relpath(r["program"]) for r in results}
+    width = max([20] + [len(name) for name in names.values()])
+    print(f"{'program':<{width}} {'status':<12} {'cycles':>8} {'insts':>8} {'CPI':>6}")
+    for r in results:
+        cpi = f"{r['cpi']:.3f}" if r["cpi"] else "-"
+        print(f"{names[r['program']]:<{width}} {r['status']:<12} {r['cycles'] or '-':>8} {r['instructions'] or '-':>8} {cpi:>6}")
+    failed = [r for r in results if r["status"] != "pass"]
+    for r in failed:
+        print(f"\n{names[r['program']]}: {r['status']}\n{r['detail']}")
+    print(f"\n{len(results) - len(failed)}/{len(results)} passed")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+cocotb monitor for the hart retire interface.
+
+`tb/hart_harness.v` packs every `o_retire_*` signal into one 320-bit bus.
+RetireMonitor reads that bus once per clock (a single simulator access
+instead of one per signal), appends each retired instruction to a
+preallocated buffer laid out as tracebin.RECORD, and hands full batches to
+a callback as a NumPy structured array. GoldenChecker is a callback that
+compares the batches against a golden trace, vectorized.
+"""
+
+import cocotb
+import numpy as np
+from cocotb.triggers import Event, RisingEdge
+
+import retire_trace
+import tracebin
+
+BATCH_SIZE = 4096
+
+VALID_BIT = 319
+HALT_BIT = 288 + tracebin.FLAGS["halt"][0]
+# Everything but `valid`: the bus bits that go into a record after the cycle.
+PAYLOAD = (1 << VALID_BIT) - 1
+
+_XZ = str.maketrans("xXzZuUwW-", "000000000")
+
+class RetireMonitor:
+    def __init__(self, clk, bus, callback, batch_size: int = BATCH_SIZE):
+        self.clk = clk
+        self.bus = bus
+        self.callback = callback
+        self.batch_size = batch_size
+        self.buffer = bytearray(batch_size * tracebin.RECORD.itemsize)
+        self.records = np.frombuffer(self.buffer, dtype=tracebin.RECORD)
+        self.count = 0
+        self.cycles = 0
+        self.retired = 0
+        self.halted = Event()
+
+    def start(self):
+        return cocotb.start_soon(self._run())
+
+    def flush(self) -> None:
+        """
+        Hand the buffered records to the callback. The batch is a view of
+        the monitor's buffer and is only valid during the callback.
+        """
+        if self.count:
+            batch, self.count = self.records[:self.count], 0
+            self.callback(batch)
+
+    async def _run(self):
+        edge = RisingEdge(self.clk)
+        bus = self.bus
+        buffer = self.buffer
+        size = tracebin.RECORD.itemsize
+
+        while True:
+            await edge
+            self.cycles += 1
+
+            value = bus.value
+            try:
+                v = value.integer
+            except ValueError:
+                # Unresolved bits (e.g. before the pipeline fills) read as 0.
+                v = int(value.binstr.translate(_XZ), 2)
+            if not v >> VALID_BIT:
+                continue
+
+            offset = self.count * size
+            buffer[offset:offset + 4] = self.cycles.to_bytes(4, "little")
+            buffer[offset + 4:offset + size] = (v & PAYLOAD).to_bytes(size - 4, "little")
+            self.count += 1
+            self.retired += 1
+
+            if self.count == self.batch_size:
+                self.flush()
+            if (v >> HALT_BIT) & 1:
+                self.flush()
+                self.halted.set()
+                return
+
+class GoldenChecker:
+    """
+    Batch callback that checks the retired instructions against a golden
+    binary trace (e.g. tracebin.from_retire of a reference ISS run), and
+    raises AssertionError with the retire_trace report at the first mismatch.
+    """
+    def __init__(self, golden: np.ndarray, fmt: str = "project5"):
+        self.golden = golden
+        self.fmt = fmt
+        self.checked = 0
+
+    def __call__(self, batch: np.ndarray) -> None:
+        expected = self.golden[self.checked:self.checked + len(batch)]
+        mismatch = tracebin.compare(batch, expected, self.fmt)
+        if mismatch is not None:
+            raise AssertionError(retire_trace.report(mismatch._replace(index=mismatch.index + self.checked)))
+        self.checked += len(batch)
+
+    def finish(self) -> None:
+        """Check that the whole golden trace was retired."""
+        if self.checked < len(self.golden):
+            expected, = tracebin.to_text(self.golden[self.checked:self.checked + 1], self.fmt)
+            mismatch = retire_trace.Mismatch(self.checked, None, int(self.golden["pc"][self.checked]),
+                                             int(self.golden["inst"][self.checked]), "trace ended early", expected, None)
+            raise AssertionError(retire_trace.report(mismatch))
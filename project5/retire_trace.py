@@ -0,0 +1,236 @@
+"""
+Parse and compare the retire traces printed by `tb/tb.v`.
+
+The comparison is streaming: the simulator output is consumed line by line
+next to the golden trace (a saved trace file or the reference ISS), and the
+simulation is killed at the first divergence. A pipelined hart that goes
+off the rails then costs a few cycles instead of running to the limit.
+
+    python retire_trace.py --program tb/program.mem -- vvp hart_sim
+    python retire_trace.py --golden traces/01add.trace --actual out.trace
+
+Both the project5 trace format and the project4 format (which prefixes
+every line with the cycle number) are accepted.
+
+x and z digits read as 0, so that icarus and Verilator (which prints the
+same values as 0; see hartsim.py) pass and fail the same programs. The
+binary trace (tb.v's %u) and the cocotb monitor read them the same way.
+A hart that relies on uninitialized state therefore passes only where the
+reference ISS, whose registers and memory start at zero, agrees.
+"""
+
+import argparse
+import pathlib
+import re
+import subprocess
+import sys
+import threading
+from collections import namedtuple
+from collections.abc import Iterable, Iterator
+
+import iss
+
+# One retired instruction as printed by the testbench. Register and memory
+# fields are None when the line does not show them (r[xx]).
+#   rs1, rs2: (raddr, rdata)
+#   rd:       (waddr, wdata)
+#   load:     (addr, mask, rdata)
+#   store:    (addr, mask, wdata)
+TraceLine = namedtuple("TraceLine", ["cycle", "pc", "inst", "rs1", "rs2", "rd", "load", "store", "trap", "text"])
+
+Mismatch = namedtuple("Mismatch", ["index", "cycle", "pc", "inst", "field", "expected", "actual"])
+
+_V = r"([0-9a-fA-FxXzZ]{8})"
+_R = r"([ \dxXzZ]{1,2})"
+LINE = re.compile(
+    r"^(?:(\d+) )?"
+    rf"\[{_V}\] {_V}"
+    rf" r\[{_R}\]={_V} r\[{_R}\]={_V}"
+    rf"(?: w\[{_R}\]={_V})?"
+    rf"(?: l\[{_V},([01xXzZ]{{4}})\]={_V})?"
+    rf"(?: s\[{_V},([01xXzZ]{{4}})\]={_V})?"
+    r"( TRAP)?\s*$"
+)
+
+_XZ = str.maketrans("xXzZ", "0000")
+
+def _int(s: str, base: int = 16) -> int:
+    return int(s.translate(_XZ), base)
+
+def parse_line(line: str) -> TraceLine | None:
+    """Parse one line of simulator output; returns None for non-trace lines."""
+    m = LINE.match(line)
+    if m is None:
+        return None
+    (cycle, pc, inst, rs1, rs1_data, rs2, rs2_data, rd, rd_data,
+     l_addr, l_mask, l_data, s_addr, s_mask, s_data, trap) = m.groups()
+
+    def reg(addr, data):
+        if addr.strip() in ("xx", ""):
+            return None
+        return (_int(addr.strip(), 10), _int(data))
+
+    return TraceLine(
+        cycle=int(cycle) if cycle else None,
+        pc=_int(pc),
+        inst=_int(inst),
+        rs1=reg(rs1, rs1_data),
+        rs2=reg(rs2, rs2_data),
+        rd=reg(rd, rd_data) if rd is not None else None,
+        load=(_int(l_addr), _int(l_mask, 2), _int(l_data)) if l_addr else None,
+        store=(_int(s_addr), _int(s_mask, 2), _int(s_data)) if s_addr else None,
+        trap=trap is not None,
+        text=line.rstrip("\n"),
+    )
+
+def read_trace(lines: Iterable[str]) -> Iterator[TraceLine]:
+    """Yield the trace records in simulator output, skipping everything else."""
+    for line in lines:
+        record = parse_line(line)
+        if record is not None:
+            yield record
+
+def iss_trace(program: pathlib.Path, max_instructions: int = 1_000_000, fmt: str = "project5") -> Iterator[TraceLine]:
+    """Golden trace records for a program.mem image, from the reference ISS."""
+    model = iss.ISS.from_mem(program)
+    for cycle, r in enumerate(model.run(max_instructions), start=1):
+        yield parse_line(iss.format_retire(r, fmt, cycle))
+
+def _masked(value: int, mask: int) -> int:
+    return value & iss.LANES[mask]
+
+def diff(expected: TraceLine, actual: TraceLine) -> tuple[str, object, object] | None:
+    """
+    Compare two records and return the first differing (field, expected,
+    actual), or None if they match. Memory data is only compared on the
+    byte lanes enabled by the mask; the other lanes are don't-care.
+    """
+    checks = [
+        ("pc", expected.pc, actual.pc),
+        ("inst", expected.inst, actual.inst),
+        ("trap", expected.trap, actual.trap),
+        ("rs1", expected.rs1, actual.rs1),
+        ("rs2", expected.rs2, actual.rs2),
+        ("rd write", expected.rd, actual.rd),
+    ]
+    for name, e, a in (("dmem load", expected.load, actual.load), ("dmem store", expected.store, actual.store)):
+        if e is not None and a is not None:
+            e = (e[0], e[1], _masked(e[2], e[1]))
+            a = (a[0], a[1], _masked(a[2], a[1]))
+        checks.append((name, e, a))
+
+    for name, e, a in checks:
+        if e != a:
+            return name, e, a
+    return None
+
+def compare(actual: Iterable[TraceLine], golden: Iterable[TraceLine]) -> Mismatch | None:
+    """
+    Walk both traces in lockstep and return the first mismatch, or None if
+    they are identical. Stops consuming `actual` as soon as it diverges.
+    """
+    golden = iter(golden)
+    count = 0
+    for a in actual:
+        e = next(golden, None)
+        if e is None:
+            return Mismatch(count, a.cycle, a.pc, a.inst, "retired after end of golden trace", None, a.text)
+        d = diff(e, a)
+        if d is not None:
+            return Mismatch(count, a.cycle, a.pc, a.inst, *d)
+        count += 1
+
+    e = next(golden, None)
+    if e is not None:
+        return Mismatch(count, None, e.pc, e.inst, "trace ended early", e.text, None)
+    return None
+
+def _fmt(value) -> str:
+    if isinstance(value, tuple):
+        return "(" + ", ".join(f"{v:#x}" for v in value) + ")"
+    if isinstance(value, int) and not isinstance(value, bool):
+        return f"{value:#010x}"
+    return str(value)
+
+def report(m: Mismatch) -> str:
+    where = f"instruction {m.index}"
+    if m.cycle is not None:
+        where += f" (cycle {m.cycle})"
+    pc = "xxxxxxxx" if m.pc is None else f"{m.pc:08x}"
+    inst = "xxxxxxxx" if m.inst is None else f"{m.inst:08x}"
+    return (
+        f"Retire trace mismatch at {where}, pc={pc} inst={inst}: {m.field}\n"
+        f"  expected: {_fmt(m.expected)}\n"
+        f"  actual:   {_fmt(m.actual)}"
+    )
+
+def run_and_compare(cmd: list[str], golden: Iterable[TraceLine], cwd: pathlib.Path | None = None,
+                    timeout: float | None = None) -> tuple[Mismatch | None, list[str]]:
+    """
+    Run the simulator and compare its trace against `golden` as it is
+    printed. The simulator is killed at the first mismatch, or after
+    `timeout` seconds. Returns the mismatch (or None) and the simulator's
+    non-trace output lines.
+    """
+    other = []
+    with subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True, bufsize=1) as proc:
+        timed_out = threading.Event()
+
+        def expire():
+            timed_out.set()
+            proc.kill()
+
+        watchdog = threading.Timer(timeout, expire) if timeout else None
+        if watchdog:
+            watchdog.start()
+
+        def records():
+            for line in proc.stdout:
+                record = parse_line(line)
+                if record is None:
+                    other.append(line.rstrip("\n"))
+                else:
+                    yield record
+
+        try:
+            mismatch = compare(records(), golden)
+        finally:
+            if watchdog:
+                watchdog.cancel()
+            proc.kill()
+
+    if mismatch is not None and mismatch.field == "trace ended early" and timed_out.is_set():
+        mismatch = mismatch._replace(field=f"timed out after {timeout} seconds")
+    return mismatch, other
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a hart retire trace against a golden trace.")
+    golden = parser.add_mutually_exclusive_group(required=True)
+    golden.add_argument("--golden", type=pathlib.Path, help="golden trace file")
+    golden.add_argument("--program", type=pathlib.Path, help="program.mem to run on the reference ISS")
+    parser.add_argument("--format", choices=("project4", "project5"), default="project5")
+    parser.add_argument("--actual", type=pathlib.Path, help="trace file to check (default: run the command)")
+    parser.add_argument("cmd", nargs="*", help="simulator command, e.g. -- vvp hart_sim")
+    args = parser.parse_args()
+
+    if args.golden:
+        expected = read_trace(open(args.golden))
+    else:
+        expected = iss_trace(args.program, fmt=args.format)
+
+    if args.actual:
+        mismatch = compare(read_trace(open(args.actual)), expected)
+    elif args.cmd:
+        mismatch, _ = run_and_compare(args.cmd, expected)
+    else:
+        parser.error("give either --actual or a simulator command")
+
+    if mismatch is None:
+        print("Retire trace matches.")
+        return 0
+    print(report(mismatch))
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
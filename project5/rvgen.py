@@ -0,0 +1,258 @@
+"""
+Constrained-random RV32I programs that stress the hart's hazard handling.
+
+Unlike the hand-written tests, which check their own results, these
+programs compute garbage as fast as possible and are checked against the
+reference ISS (see regress.py). They are built from segments that each
+target one pipeline hazard:
+- dependency chains: ALU ops that read the result of the one before
+  (RAW at distance 1, sometimes 2);
+- load-use: a load whose result feeds the very next instruction (an ALU
+  op, a store, or a branch);
+- branch after write: a branch on a register written by the instruction
+  just before it, skipping a few instructions forward;
+- loops entered through a `jal` or a `jalr` into the middle of the body,
+  with a trip count chosen to reach the target dynamic instruction count;
+- calls: `jal ra` to a function that reads `ra` straight away and returns
+  with `jalr`.
+Straight-line blocks fill the rest. Every program starts by pointing s0
+at an initialized data buffer and ends in `ebreak`. Each is written as
+`rand<seed>.s` and, assembled with rv.py (no toolchain needed), as
+`rand<seed>.mem`:
+
+    python rvgen.py --count 1000 --length 2000 -o tests/random
+    python regress.py tests/random
+
+The instruction memory holds IMEM_WORDS instructions, which bounds the
+static size of a program; longer runs come from the loops. Registers ra,
+s0 and s1 (the loop counter) are reserved, and loads only touch the
+DATA_WORDS words of the buffer that the prologue stores to (tb.v leaves
+the data memory uninitialized).
+"""
+
+import argparse
+import contextlib
+import math
+import pathlib
+import random
+import sys
+
+import corpus
+import rv
+
+IMEM_WORDS = 256
+DATA_BASE = 0x200
+DATA_WORDS = 8
+MAX_TRIPS = 1000
+
+LINK, BASE, COUNTER = 1, 8, 9
+POOL = [r for r in range(2, 32) if r not in (BASE, COUNTER)]
+
+OPS = ["add", "sub", "sll", "slt", "sltu", "xor", "srl", "sra", "or", "and"]
+OPS_IMM = ["addi", "slti", "sltiu", "xori", "ori", "andi"]
+SHIFTS_IMM = ["slli", "srli", "srai"]
+BRANCHES = ["beq", "bne", "blt", "bge", "bltu", "bgeu"]
+LOADS = {"lb": 1, "lh": 2, "lw": 4, "lbu": 1, "lhu": 2}
+STORES = {"sb": 1, "sh": 2, "sw": 4}
+
+# The largest segment, in instructions: a loop of two nested-free bodies
+# plus its header and latch, with room for a call's function.
+MAX_SEGMENT = 48
+
+class Generator:
+    def __init__(self, seed: int, length: int, words: int = IMEM_WORDS):
+        self.rng = random.Random(seed)
+        self.length = length
+        self.limit = words
+        self.lines: list[str] = []
+        self.functions: list[str] = []
+        self.words = 0
+        self.dynamic = 0
+        self.labels = 0
+        self.last = None
+
+    def emit(self, inst: str) -> None:
+        self.lines.append(f"  {inst}")
+        self.words += 1
+        self.dynamic += 1
+
+    def label(self, prefix: str) -> str:
+        self.labels += 1
+        return f"{prefix}{self.labels}"
+
+    @contextlib.contextmanager
+    def buffer(self):
+        """Collect the lines emitted inside the block instead of appending them."""
+        lines, self.lines = self.lines, []
+        try:
+            yield self.lines
+        finally:
+            self.lines = lines
+
+    def src(self) -> int:
+        # Mostly the last result, to keep the forwarding paths busy.
+        r = self.rng.random()
+        if self.last is not None and r < 0.6:
+            return self.last
+        if r < 0.65:
+            return 0
+        return self.rng.choice(POOL)
+
+    def dst(self) -> int:
+        self.last = self.rng.choice(POOL)
+        return self.last
+
+    def alu(self) -> None:
+        kind = self.rng.random()
+        if kind < 0.45:
+            rs1, rs2 = self.src(), self.src()
+            self.emit(f"{self.rng.choice(OPS)} x{self.dst()}, x{rs1}, x{rs2}")
+        elif kind < 0.8:
+            rs1 = self.src()
+            self.emit(f"{self.rng.choice(OPS_IMM)} x{self.dst()}, x{rs1}, {self.rng.randint(-2048, 2047)}")
+        elif kind < 0.95:
+            rs1 = self.src()
+            self.emit(f"{self.rng.choice(SHIFTS_IMM)} x{self.dst()}, x{rs1}, {self.rng.randint(0, 31)}")
+        else:
+            self.emit(f"{self.rng.choice(['lui', 'auipc'])} x{self.dst()}, {self.rng.randint(0, 0xFFFFF)}")
+
+    def offset(self, size: int) -> int:
+        return self.rng.randrange(0, DATA_WORDS * 4, size)
+
+    def chain(self) -> None:
+        for _ in range(self.rng.randint(2, 6)):
+            self.alu()
+
+    def load_use(self) -> None:
+        if self.rng.random() < 0.5:
+            op, size = self.rng.choice(list(STORES.items()))
+            self.emit(f"{op} x{self.src()}, {self.offset(size)}(x{BASE})")
+        op, size = self.rng.choice(list(LOADS.items()))
+        self.emit(f"{op} x{self.dst()}, {self.offset(size)}(x{BASE})")
+        use = self.rng.random()
+        if use < 0.6:
+            self.alu()
+        elif use < 0.8:
+            op, size = self.rng.choice(list(STORES.items()))
+            self.emit(f"{op} x{self.last}, {self.offset(size)}(x{BASE})")
+        else:
+            self.branch()
+
+    def branch(self) -> None:
+        """A forward branch on the last result, over 1-3 instructions."""
+        skip = self.label("skip")
+        rs1, rs2 = self.last if self.last is not None else self.src(), self.src()
+        if self.rng.random() < 0.5:
+            rs1, rs2 = rs2, rs1
+        self.emit(f"{self.rng.choice(BRANCHES)} x{rs1}, x{rs2}, {skip}")
+        for _ in range(self.rng.randint(1, 3)):
+            self.alu()
+        self.lines.append(f"{skip}:")
+
+    def branch_after_write(self) -> None:
+        self.alu()
+        self.branch()
+
+    def call(self) -> None:
+        function = self.label("function")
+        self.emit(f"jal x{LINK}, {function}")
+        with self.buffer() as body:
+            self.lines.append(f"{function}:")
+            self.last = LINK
+            self.chain()
+            self.emit(f"jalr x0, 0(x{LINK})")
+        self.functions += body
+
+    def body(self) -> None:
+        for _ in range(self.rng.randint(1, 2)):
+            self.rng.choice([self.chain, self.load_use, self.branch_after_write, self.call])()
+
+    def loop(self) -> None:
+        """
+        A counted loop, entered in the middle of its body:
+
+                addi  s1, x0, <trips>
+                jal   x0, entry          # or addi t, x0, entry; jalr x0, 0(t)
+            top:
+                <body>
+            entry:
+                <body>
+                addi  s1, s1, -1
+                bne   s1, x0, top
+        """
+        top, entry = self.label("loop"), self.label("entry")
+        dynamic = self.dynamic
+        with self.buffer() as head:
+            self.body()
+        head_dynamic = self.dynamic - dynamic
+        with self.buffer() as tail:
+            self.body()
+        tail_dynamic = self.dynamic - dynamic - head_dynamic + 2
+        trips = max(1, min(MAX_TRIPS, math.ceil((self.length - dynamic) / (head_dynamic + tail_dynamic))))
+
+        self.emit(f"addi x{COUNTER}, x0, {trips}")
+        if self.rng.random() < 0.5:
+            # The entry address is known, since every line of the main
+            # code is one instruction and it starts at 0.
+            target = self.dst()
+            entry_pc = 4 * (self.instructions(self.lines) + 2 + self.instructions(head))
+            self.emit(f"addi x{target}, x0, {entry_pc}")
+            self.emit(f"jalr x0, 0(x{target})")
+        else:
+            self.emit(f"jal x0, {entry}")
+        self.lines += [f"{top}:"] + head + [f"{entry}:"] + tail
+        self.emit(f"addi x{COUNTER}, x{COUNTER}, -1")
+        self.emit(f"bne x{COUNTER}, x0, {top}")
+        self.dynamic = self.dynamic - head_dynamic - tail_dynamic + trips * tail_dynamic + (trips - 1) * head_dynamic
+
+    @staticmethod
+    def instructions(lines: list[str]) -> int:
+        return sum(not line.endswith(":") for line in lines)
+
+    def prologue(self) -> None:
+        self.emit(f"addi x{BASE}, x0, {DATA_BASE}")
+        for r in self.rng.sample(POOL, 6):
+            self.emit(f"lui x{r}, {self.rng.randint(0, 0xFFFFF)}")
+            self.emit(f"addi x{r}, x{r}, {self.rng.randint(-2048, 2047)}")
+            self.last = r
+        for i in range(DATA_WORDS):
+            self.emit(f"sw x{self.src()}, {4 * i}(x{BASE})")
+
+    def generate(self) -> str:
+        self.prologue()
+        segments = [self.chain, self.load_use, self.branch_after_write, self.call, self.loop]
+        while self.dynamic < self.length and self.words + MAX_SEGMENT + 1 <= self.limit:
+            # Favour loops once straight-line code can no longer fill the
+            # target in the room that is left.
+            behind = self.length - self.dynamic > 2 * (self.limit - self.words)
+            self.rng.choices(segments, [3, 3, 3, 1, 6 if behind else 1])[0]()
+        # Whatever room is left for straight-line code.
+        while self.dynamic < self.length and self.words + 2 <= self.limit:
+            self.alu()
+        self.emit("ebreak")
+        return "\n".join([".text", "main:"] + self.lines + self.functions) + "\n"
+
+def generate(seed: int, length: int = 1000) -> str:
+    """The assembly of one program, reproducible from its seed."""
+    return Generator(seed, length).generate()
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate random hazard-heavy RV32I programs.")
+    parser.add_argument("-o", "--output", type=pathlib.Path, default=pathlib.Path("tests") / "random")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--length", type=int, default=1000, help="target dynamic instruction count (roughly; taken forward branches skip some)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first program")
+    args = parser.parse_args()
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    for seed in range(args.seed, args.seed + args.count):
+        source = generate(seed, args.length)
+        image = b"".join(word.to_bytes(4, "little") for word in rv.assemble_program(source))
+        path = args.output / f"rand{seed:06d}"
+        path.with_suffix(".s").write_text(source)
+        path.with_suffix(".mem").write_text(corpus.to_mem(image.ljust(4 * IMEM_WORDS, b"\0")))
+    print(f"wrote {args.count} programs to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
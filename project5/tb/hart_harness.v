@@ -0,0 +1,122 @@
+`default_nettype none
+
+// Toplevel for the cocotb hart tests (test_hart.py). Instantiates the hart
+// with the same memories as tb.v and packs the whole retire interface into
+// one bus, so that the testbench can sample it with a single read per cycle.
+//
+// The bus is laid out as the last ten words of a project5/tracebin.py record
+// (pc in the low word, flags in the high word), with `valid` in bit 31 of
+// the flags word.
+//
+// With +external_memory, the hart's memory reads come from i_imem_rdata and
+// i_dmem_rdata instead of the 1 KiB arrays below, and o_mem carries its
+// memory requests (project5/memory.py serves them from a sparse model):
+// {dmem_ren, dmem_wen, dmem_mask, dmem_wdata, dmem_addr, imem_raddr}.
+module hart_harness (
+    input  wire         i_clk,
+    input  wire         i_rst,
+    output wire [319:0] o_retire,
+    input  wire [ 31:0] i_imem_rdata,
+    input  wire [ 31:0] i_dmem_rdata,
+    output wire [101:0] o_mem
+);
+    reg  [31:0] imem_rdata, dmem_rdata;
+    reg         external_memory;
+    wire [31:0] imem_raddr, dmem_addr;
+    wire        dmem_ren, dmem_wen;
+    wire [31:0] dmem_wdata;
+    wire [ 3:0] dmem_mask;
+
+    wire        valid, trap, halt;
+    wire [31:0] inst;
+    wire [ 4:0] rs1_raddr, rs2_raddr;
+    wire [31:0] rs1_rdata, rs2_rdata;
+    wire [ 4:0] rd_waddr;
+    wire [31:0] rd_wdata;
+    wire [31:0] pc, next_pc;
+    wire [31:0] retire_dmem_addr;
+    wire        retire_dmem_ren, retire_dmem_wen;
+    wire [ 3:0] retire_dmem_mask;
+    wire [31:0] retire_dmem_rdata;
+    wire [31:0] retire_dmem_wdata;
+
+    hart #(
+        .RESET_ADDR (32'h0)
+    ) dut (
+        .i_clk        (i_clk),
+        .i_rst        (i_rst),
+        .o_imem_raddr (imem_raddr),
+        .i_imem_rdata (external_memory ? i_imem_rdata : imem_rdata),
+        .o_dmem_addr  (dmem_addr),
+        .o_dmem_ren   (dmem_ren),
+        .o_dmem_wen   (dmem_wen),
+        .o_dmem_wdata (dmem_wdata),
+        .o_dmem_mask  (dmem_mask),
+        .i_dmem_rdata (external_memory ? i_dmem_rdata : dmem_rdata),
+        .o_retire_valid     (valid),
+        .o_retire_inst      (inst),
+        .o_retire_trap      (trap),
+        .o_retire_halt      (halt),
+        .o_retire_rs1_raddr (rs1_raddr),
+        .o_retire_rs1_rdata (rs1_rdata),
+        .o_retire_rs2_raddr (rs2_raddr),
+        .o_retire_rs2_rdata (rs2_rdata),
+        .o_retire_rd_waddr  (rd_waddr),
+        .o_retire_rd_wdata  (rd_wdata),
+        .o_retire_dmem_addr (retire_dmem_addr),
+        .o_retire_dmem_ren  (retire_dmem_ren),
+        .o_retire_dmem_wen  (retire_dmem_wen),
+        .o_retire_dmem_mask (retire_dmem_mask),
+        .o_retire_dmem_wdata(retire_dmem_wdata),
+        .o_retire_dmem_rdata(retire_dmem_rdata),
+        .o_retire_pc        (pc),
+        .o_retire_next_pc   (next_pc)
+    );
+
+    assign o_retire = {
+        valid, 8'b0, halt, trap, retire_dmem_wen, retire_dmem_ren, retire_dmem_mask, rd_waddr, rs2_raddr, rs1_raddr,
+        retire_dmem_wdata, retire_dmem_rdata, retire_dmem_addr,
+        rd_wdata, rs2_rdata, rs1_rdata, next_pc, inst, pc
+    };
+
+    assign o_mem = {dmem_ren, dmem_wen, dmem_mask, dmem_wdata, dmem_addr, imem_raddr};
+
+    // Separate instruction and data memory banks, as in tb.v. The program
+    // image is given with +program=<file> (default program.mem).
+    reg [7:0] imem [0:1023];
+    reg [7:0] dmem [0:1023];
+
+    reg [8*256-1:0] program;
+    initial begin
+        external_memory = $test$plusargs("external_memory");
+        if (!external_memory) begin
+            if (!$value$plusargs("program=%s", program))
+                program = "program.mem";
+            $readmemh(program, imem);
+        end
+    end
+
+    always @(posedge i_clk) begin
+        imem_rdata <= {imem[imem_raddr + 3], imem[imem_raddr + 2], imem[imem_raddr + 1], imem[imem_raddr + 0]};
+    end
+
+    always @(posedge i_clk) begin
+        if (dmem_ren)
+            dmem_rdata <= {dmem[dmem_addr + 3], dmem[dmem_addr + 2], dmem[dmem_addr + 1], dmem[dmem_addr + 0]};
+        else
+            dmem_rdata <= 32'h0;
+    end
+
+    always @(posedge i_clk) begin
+        if (dmem_wen & dmem_mask[0])
+            dmem[dmem_addr + 0] <= dmem_wdata[ 7: 0];
+        if (dmem_wen & dmem_mask[1])
+            dmem[dmem_addr + 1] <= dmem_wdata[15: 8];
+        if (dmem_wen & dmem_mask[2])
+            dmem[dmem_addr + 2] <= dmem_wdata[23:16];
+        if (dmem_wen & dmem_mask[3])
+            dmem[dmem_addr + 3] <= dmem_wdata[31:24];
+    end
+endmodule
+
+`default_nettype wire
@@ -0,0 +1,51 @@
+import pytest
+
+import bpred
+import iss
+import rv
+import tracebin
+
+# A loop branch taken four times and then not taken, and one jal.
+PROGRAM = """
+    addi x5, x0, 5
+loop:
+    addi x5, x5, -1
+    bne x5, x0, loop
+    jal x0, end
+end:
+    ebreak
+"""
+
+def events() -> bpred.Events:
+    image = b"".join(word.to_bytes(4, "little") for word in rv.assemble_program(PROGRAM))
+    return bpred.branch_events(tracebin.from_retire(iss.ISS(image).run()))
+
+def test_branch_events():
+    e = events()
+    assert e.instructions == 13
+    assert e.pc == [8] * 5 + [12]
+    assert e.kind == [bpred.BRANCH] * 5 + [bpred.JAL]
+    assert e.taken == [True] * 4 + [False, True]
+    # A not-taken branch's target is still where it would have gone.
+    assert e.target == [4] * 5 + [16]
+    assert e.backward == [1] * 5 + [0]
+
+# Hand-computed with PENALTY = 2 and REDIRECT_PENALTY = 1.
+@pytest.mark.parametrize("spec, mispredicts, lost", [
+    ("static-nt", 4, 4 * 2 + 2),
+    ("btfn", 1, 2 + 4 * 1 + 1),
+    ("bimodal:entries=4", 2, 2 * 2 + 3 * 1 + 1),
+    ("btfn:btb=4", 1, 1 + 2 + 1),
+])
+def test_simulate(spec, mispredicts, lost):
+    result = bpred.simulate(bpred.parse_config(spec), events())
+    assert result == bpred.Result(13, 5, mispredicts, 1, 0, lost)
+
+@pytest.mark.parametrize("spec", ["static-nt", "btfn:btb=16", "bimodal:entries=64", "gshare:entries=1024,history=10,btb=64"])
+def test_config_names(spec):
+    assert bpred.config_name(bpred.parse_config(spec)) == spec
+
+@pytest.mark.parametrize("spec", ["tage", "bimodal", "bimodal:entries=48", "gshare:entries=64,depth=2"])
+def test_bad_configs(spec):
+    with pytest.raises(ValueError):
+        bpred.parse_config(spec)
@@ -0,0 +1,29 @@
+import corpus
+
+def fake_assemble(image: bytes | None):
+    """An assemble() that returns `image` (or an error) for every source."""
+    def assemble(sources):
+        return {key: image if image is not None else f"{key}.asm:1: Error: bad\n" for key in sources}
+    return assemble
+
+def same_program(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        paths.append(tmp_path / name / f"{name}.asm")
+        paths[-1].write_text("addi x1, x0, 1\n")
+    return paths
+
+def test_identical_sources_all_built(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus, "CACHE", tmp_path / "cache")
+    monkeypatch.setattr(corpus, "assemble", fake_assemble(b"\x93\x00\x10\x00"))
+    paths = same_program(tmp_path)
+    assert corpus.build(paths) == {path: None for path in paths}
+    for path in paths:
+        assert path.with_suffix(".mem").read_text() == "93 00 10 00 \n"
+
+def test_identical_sources_all_fail(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus, "CACHE", tmp_path / "cache")
+    monkeypatch.setattr(corpus, "assemble", fake_assemble(None))
+    paths = same_program(tmp_path)
+    assert corpus.build(paths) == {path: f"{path.name}:1: Error: bad\n" for path in paths}
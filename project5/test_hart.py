@@ -0,0 +1,101 @@
+import os
+import pathlib
+
+import cocotb
+import pytest
+from cocotb.clock import Clock
+from cocotb.triggers import ClockCycles, First, RisingEdge
+
+import cpi
+import hartsim
+import iss
+import memory
+import tracebin
+import util
+from retire_monitor import GoldenChecker, RetireMonitor
+
+PROJ_PATH = pathlib.Path(__file__).resolve().parent
+
+PROGRAM = pathlib.Path(os.getenv("HART_PROGRAM", PROJ_PATH / "tb" / "program.mem")).resolve()
+MAX_CYCLES = int(os.getenv("HART_MAX_CYCLES", "100000"))
+# Set to a file name to also collect a CPI stack (see cpi.py) and write it
+# there as JSON.
+CPI_REPORT = os.getenv("HART_CPI_REPORT")
+# Set HART_MEMORY=sparse to serve the hart's memories from memory.py instead
+# of the harness's 1 KiB arrays: programs can then be any size (and .s or
+# .bin as well as .mem), HART_DATA=<file>[@<addr>] preloads a binary into
+# data memory, and the data memory at halt is compared with the ISS's.
+SPARSE = os.getenv("HART_MEMORY", "arrays") == "sparse"
+DATA = os.getenv("HART_DATA")
+
+def data_image() -> tuple[int, bytes] | None:
+    if not DATA:
+        return None
+    path, _, addr = DATA.partition("@")
+    return int(addr or "0", 0), pathlib.Path(path).read_bytes()
+
+@cocotb.test()
+async def hart_program(dut):
+    if SPARSE:
+        mem = memory.MemoryModel(dut.i_clk, dut.o_mem, dut.i_imem_rdata, dut.i_dmem_rdata)
+        mem.imem.load_program(PROGRAM)
+        end = (max(mem.imem.pages, default=0) + 1) << memory.PAGE_BITS
+        model = iss.ISS(mem.imem.read(0, end))
+        if (data := data_image()) is not None:
+            mem.dmem.write(*data)
+            model.dmem.load(*data)
+        mem.start()
+    else:
+        model = iss.ISS.from_mem(PROGRAM)
+    checker = GoldenChecker(tracebin.from_retire(model.run(MAX_CYCLES)))
+
+    cocotb.start_soon(Clock(dut.i_clk, 10, units="ns").start())
+    dut.i_rst.value = 1
+    await RisingEdge(dut.i_clk)
+    await RisingEdge(dut.i_clk)
+    dut.i_rst.value = 0
+
+    monitor = RetireMonitor(dut.i_clk, dut.o_retire, checker)
+    monitor.start()
+    if CPI_REPORT:
+        analyzer = cpi.CPIAnalyzer(dut, dut.i_clk, dut.o_retire)
+        analysis = analyzer.start()
+    await First(monitor.halted.wait(), ClockCycles(dut.i_clk, MAX_CYCLES))
+
+    # A hart that went wrong and then hung should report its first
+    # mismatching retire, not the timeout.
+    monitor.flush()
+    assert monitor.halted.is_set(), f"Hart did not halt within {MAX_CYCLES} cycles ({monitor.retired} instructions retired)"
+    checker.finish()
+    dut._log.info(f"{monitor.retired} instructions retired in {monitor.cycles} cycles")
+    if SPARSE:
+        count, first = memory.diff(mem.dmem.snapshot(), memory.snapshot_words(model.dmem.words))
+        assert count == 0, f"Data memory differs from the ISS at halt in {count} words:\n" + "\n".join(
+            f"  {addr:#010x}: {actual:#010x}, expected {expected:#010x}" for addr, actual, expected in first)
+    if CPI_REPORT:
+        await analysis
+        dut._log.info("\n" + analyzer.report())
+        analyzer.write(CPI_REPORT)
+
+@pytest.mark.points(10)
+def test_hart():
+    env = {"HART_PROGRAM": str(PROGRAM), "HART_MAX_CYCLES": str(MAX_CYCLES)}
+    if CPI_REPORT:
+        env["HART_CPI_REPORT"] = str(pathlib.Path(CPI_REPORT).resolve())
+    plusargs = [f"+program={PROGRAM}"]
+    if SPARSE:
+        env["HART_MEMORY"] = "sparse"
+        plusargs.append("+external_memory")
+        if DATA:
+            path, _, addr = DATA.partition("@")
+            env["HART_DATA"] = str(pathlib.Path(path).resolve()) + (f"@{addr}" if addr else "")
+    # The same RTL as hartsim.py builds (no cell library), without tb.v.
+    runner = util.get_runner(PROJ_PATH / "rtl", "hart_harness", [PROJ_PATH / "tb" / "hart_harness.v"],
+                             design=hartsim.sources(PROJ_PATH)[1:])
+    runner.test(
+        hdl_toplevel="hart_harness",
+        test_module="test_hart",
+        testcase="hart_program",
+        plusargs=plusargs,
+        extra_env=env,
+    )
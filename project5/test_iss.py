@@ -0,0 +1,85 @@
+import iss
+import rv
+
+# A loop closed by a backward jal: its offset is negative, so inst[19:15]
+# (which project4's tb.v prints as jal's rs1) is 31.
+LOOP = """
+    addi x31, x0, -1
+    addi x5, x0, 2
+loop:
+    addi x6, x6, 1
+    beq x6, x5, done
+    jal x1, loop
+done:
+    ebreak
+"""
+
+# Hand-computed from the `$write` calls in project4's tb/tb.v.
+LOOP_PROJECT4 = """\
+00001 [00000000] fff00f93 r[ 0]=00000000 r[xx]=xxxxxxxx w[31]=ffffffff
+00002 [00000004] 00200293 r[ 0]=00000000 r[xx]=xxxxxxxx w[ 5]=00000002
+00003 [00000008] 00130313 r[ 6]=00000000 r[xx]=xxxxxxxx w[ 6]=00000001
+00004 [0000000c] 00530463 r[ 6]=00000001 r[ 5]=00000002
+00005 [00000010] ff9ff0ef r[31]=ffffffff r[xx]=xxxxxxxx w[ 1]=00000014
+00006 [00000008] 00130313 r[ 6]=00000001 r[xx]=xxxxxxxx w[ 6]=00000002
+00007 [0000000c] 00530463 r[ 6]=00000002 r[ 5]=00000002
+00008 [00000014] 00100073 r[xx]=xxxxxxxx r[xx]=xxxxxxxx"""
+
+LOOP_PROJECT5 = """\
+[00000000] fff00f93 r[ 0]=00000000 r[xx]=xxxxxxxx w[31]=ffffffff
+[00000004] 00200293 r[ 0]=00000000 r[xx]=xxxxxxxx w[ 5]=00000002
+[00000008] 00130313 r[ 6]=00000000 r[xx]=xxxxxxxx w[ 6]=00000001
+[0000000c] 00530463 r[ 6]=00000001 r[ 5]=00000002
+[00000010] ff9ff0ef r[xx]=xxxxxxxx r[xx]=xxxxxxxx w[ 1]=00000014
+[00000008] 00130313 r[ 6]=00000001 r[xx]=xxxxxxxx w[ 6]=00000002
+[0000000c] 00530463 r[ 6]=00000002 r[ 5]=00000002
+[00000014] 00100073 r[xx]=xxxxxxxx r[xx]=xxxxxxxx"""
+
+MEMORY = """
+    addi x1, x0, 0x80
+    addi x2, x0, -2
+    sw x2, 4(x1)
+    lb x3, 5(x1)
+    lhu x4, 6(x1)
+    sb x0, 7(x1)
+    lw x5, 4(x1)
+    ebreak
+"""
+
+MEMORY_PROJECT5 = """\
+[00000000] 08000093 r[ 0]=00000000 r[xx]=xxxxxxxx w[ 1]=00000080
+[00000004] ffe00113 r[ 0]=00000000 r[xx]=xxxxxxxx w[ 2]=fffffffe
+[00000008] 0020a223 r[ 1]=00000080 r[ 2]=fffffffe s[00000084,1111]=fffffffe
+[0000000c] 00508183 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 3]=ffffffff l[00000084,0010]=fffffffe
+[00000010] 0060d203 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 4]=0000ffff l[00000084,1100]=fffffffe
+[00000014] 000083a3 r[ 1]=00000080 r[ 0]=00000000 s[00000084,1000]=00000000
+[00000018] 0040a283 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 5]=00fffffe l[00000084,1111]=00fffffe
+[0000001c] 00100073 r[xx]=xxxxxxxx r[xx]=xxxxxxxx"""
+
+def image(source: str) -> bytes:
+    return b"".join(word.to_bytes(4, "little") for word in rv.assemble_program(source))
+
+def trace(source: str, fmt: str) -> str:
+    return "\n".join(iss.format_retire(r, fmt, cycle) for cycle, r in enumerate(iss.ISS(image(source)).run(), start=1))
+
+def test_backward_jal_project4():
+    assert trace(LOOP, "project4") == LOOP_PROJECT4
+
+def test_backward_jal_project5():
+    assert trace(LOOP, "project5") == LOOP_PROJECT5
+
+def test_loads_and_stores():
+    assert trace(MEMORY, "project5") == MEMORY_PROJECT5
+
+def test_halt_and_resume():
+    model = iss.ISS(image(LOOP))
+    first = model.run(3)
+    assert len(first) == 3 and not model.halted
+    rest = model.run()
+    assert model.halted and iss.Retire(*rest[-1]).halt and len(first) + len(rest) == 8
+    assert model.x[1] == 0x14 and model.x[6] == 2
+
+def test_misaligned_jump_traps():
+    # jalr to an odd halfword: the target's bit 1 is set.
+    last = iss.Retire(*iss.ISS(image("addi x1, x0, 6\njalr x0, 0(x1)\n")).run()[-1])
+    assert last.trap and last.pc == 4
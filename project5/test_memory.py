@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import corpus
+import iss
+import memory
+import rv
+
+@pytest.mark.parametrize("mask, word", [
+    (0b1111, 0xAABBCCDD),
+    (0b0001, 0x112233DD),
+    (0b0010, 0x1122CC44),
+    (0b0100, 0x11BB3344),
+    (0b1000, 0xAA223344),
+    (0b0011, 0x1122CCDD),
+    (0b1100, 0xAABB3344),
+    (0b0000, 0x11223344),
+])
+def test_write_word_mask(mask, word):
+    mem = memory.SparseMemory()
+    mem.write_word(0x1000, 0x11223344, 0b1111)
+    # The low two address bits are ignored, as in the harness's arrays.
+    mem.write_word(0x1003, 0xAABBCCDD, mask)
+    assert mem.read_word(0x1000) == word
+    assert mem.read_word(0x1002) == word
+
+def test_unwritten_memory_is_zero():
+    mem = memory.SparseMemory()
+    assert mem.read_word(0xFFFFFFFC) == 0
+    assert mem.read(0x12345, 10) == bytes(10)
+    assert not mem.pages
+
+def test_cross_page():
+    mem = memory.SparseMemory()
+    data = bytes(range(256)) * 40
+    addr = memory.PAGE_SIZE - 6
+    mem.write(addr, data)
+    assert sorted(mem.pages) == [0, 1, 2, 3]
+    assert mem.read(addr, len(data)) == data
+    assert mem.read(addr - 2, 4) == b"\0\0" + data[:2]
+    assert mem.read_word(memory.PAGE_SIZE) == int.from_bytes(data[6:10], "little")
+
+def test_write_array():
+    mem = memory.SparseMemory()
+    values = np.arange(3 * memory.PAGE_WORDS, dtype=np.uint32) * 0x01010101
+    mem.write(0x10000, values)
+    assert (mem.words(0x10000, len(values)) == values).all()
+    # Big-endian arrays are stored little-endian too.
+    mem.write(0x20000, values[:4].astype(">u4"))
+    assert mem.read_word(0x20004) == 0x01010101
+
+def test_load_program(tmp_path):
+    source = "addi x1, x0, 5\nsw x1, 0(x0)\nebreak\n"
+    words = rv.assemble_program(source)
+    image = b"".join(word.to_bytes(4, "little") for word in words)
+    (tmp_path / "p.s").write_text(source)
+    (tmp_path / "p.mem").write_text(corpus.to_mem(image))
+    (tmp_path / "p.bin").write_bytes(image)
+    for program in (words, tmp_path / "p.s", tmp_path / "p.mem", tmp_path / "p.bin"):
+        mem = memory.SparseMemory()
+        mem.load_program(program, 0x400)
+        assert mem.words(0x400, 3).tolist() == words, program
+
+def test_snapshot_diff():
+    model = iss.ISS(b"".join(word.to_bytes(4, "little") for word in rv.assemble_program("""
+        lui x1, 0x12345
+        addi x2, x0, -1
+        sw x2, 8(x1)
+        sb x2, 0x7ff(x1)
+        ebreak
+    """)))
+    model.run()
+    expected = memory.snapshot_words(model.dmem.words)
+    assert sorted(expected) == [0x12345000]
+
+    mem = memory.SparseMemory()
+    mem.write_word(0x12345008, 0xFFFFFFFF, 0b1111)
+    mem.write_word(0x123457FF, 0xFFFFFFFF, 0b1000)
+    assert memory.diff(mem.snapshot(), expected) == (0, [])
+
+    # A wrong byte, and a stray write to a page the ISS never touched.
+    mem.write_word(0x12345008, 0, 0b0001)
+    mem.write_word(0x40, 7, 0b1111)
+    count, first = memory.diff(mem.snapshot(), expected)
+    assert count == 2
+    assert first == [(0x40, 7, 0), (0x12345008, 0xFFFFFF00, 0xFFFFFFFF)]
+    assert memory.diff(mem.snapshot(), expected, limit=1) == (2, [(0x40, 7, 0)])
+
+def test_snapshot_words_empty():
+    assert memory.snapshot_words({}) == {}
+    assert memory.diff({}, {}) == (0, [])
@@ -0,0 +1,82 @@
+import pathlib
+
+import pytest
+
+import corpus
+import regress
+import rv
+
+# Programs with backward jals, and their traces as project4's tb.v prints
+# them (hand-computed): jal is shown with r[inst[19:15]], which is 31 for
+# any short backward offset. (jalr matches tb.v's inst[3:0] == 4'b0111
+# test for lui/auipc, so it shows no registers.)
+PROGRAMS = {
+    "loop": ("""
+    addi x31, x0, -1
+    addi x5, x0, 2
+loop:
+    addi x6, x6, 1
+    beq x6, x5, done
+    jal x1, loop
+done:
+    ebreak
+""", """\
+00001 [00000000] fff00f93 r[ 0]=00000000 r[xx]=xxxxxxxx w[31]=ffffffff
+00002 [00000004] 00200293 r[ 0]=00000000 r[xx]=xxxxxxxx w[ 5]=00000002
+00003 [00000008] 00130313 r[ 6]=00000000 r[xx]=xxxxxxxx w[ 6]=00000001
+00004 [0000000c] 00530463 r[ 6]=00000001 r[ 5]=00000002
+00005 [00000010] ff9ff0ef r[31]=ffffffff r[xx]=xxxxxxxx w[ 1]=00000014
+00006 [00000008] 00130313 r[ 6]=00000001 r[xx]=xxxxxxxx w[ 6]=00000002
+00007 [0000000c] 00530463 r[ 6]=00000002 r[ 5]=00000002
+00008 [00000014] 00100073 r[xx]=xxxxxxxx r[xx]=xxxxxxxx
+"""),
+    "call": ("""
+    j main
+func:
+    addi a0, a0, 1
+    ret
+main:
+    addi x31, x0, 0x123
+    jal ra, func
+    ebreak
+""", """\
+00001 [00000000] 00c0006f r[ 0]=00000000 r[xx]=xxxxxxxx
+00002 [0000000c] 12300f93 r[ 0]=00000000 r[xx]=xxxxxxxx w[31]=00000123
+00003 [00000010] ff5ff0ef r[31]=00000123 r[xx]=xxxxxxxx w[ 1]=00000014
+00004 [00000004] 00150513 r[10]=00000000 r[xx]=xxxxxxxx w[10]=00000001
+00005 [00000008] 00008067 r[xx]=xxxxxxxx r[xx]=xxxxxxxx
+00006 [00000014] 00100073 r[xx]=xxxxxxxx r[xx]=xxxxxxxx
+"""),
+}
+
+def simulator(tmp_path: pathlib.Path, trace: str) -> pathlib.Path:
+    """A stand-in for a hart_sim build that prints `trace` like tb.v."""
+    (tmp_path / "expected.trace").write_text(trace + f"Program halted after {trace.count(chr(10))} cycles.\n")
+    sim = tmp_path / "sim" / "hart_sim"
+    sim.parent.mkdir()
+    sim.write_text(f"#!/bin/sh\ncat {tmp_path / 'expected.trace'}\n")
+    sim.chmod(0o755)
+    return sim
+
+def program(tmp_path: pathlib.Path, source: str) -> pathlib.Path:
+    image = b"".join(word.to_bytes(4, "little") for word in rv.assemble_program(source))
+    mem = tmp_path / "program.mem"
+    mem.write_text(corpus.to_mem(image))
+    return mem
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_project4_backward_jal(tmp_path, name):
+    source, trace = PROGRAMS[name]
+    result = regress.run_program(program(tmp_path, source), simulator(tmp_path, trace), tmp_path / "work",
+                                 "project4", None, 10)
+    assert result["status"] == "pass", result["detail"]
+    assert result["instructions"] == trace.count("\n")
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_project4_jal_rs1_is_checked(tmp_path, name):
+    source, trace = PROGRAMS[name]
+    trace = trace.replace("ff0ef r[31]", "ff0ef r[ 0]")
+    result = regress.run_program(program(tmp_path, source), simulator(tmp_path, trace), tmp_path / "work",
+                                 "project4", None, 10)
+    assert result["status"] == "mismatch"
+    assert ": rs1\n" in result["detail"]
@@ -0,0 +1,30 @@
+import retire_trace
+
+def parse(line: str) -> retire_trace.TraceLine:
+    return retire_trace.parse_line(line)
+
+def test_parse_line():
+    t = parse("00012 [00000010] 00508183 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 3]=ffffffff l[00000084,0010]=fffffffe")
+    assert (t.cycle, t.pc, t.inst) == (12, 0x10, 0x00508183)
+    assert (t.rs1, t.rs2, t.rd) == ((1, 0x80), None, (3, 0xFFFFFFFF))
+    assert (t.load, t.store, t.trap) == ((0x84, 0b0010, 0xFFFFFFFE), None, False)
+    assert parse("Program halted after 8 cycles.") is None
+
+def test_x_reads_as_zero():
+    # icarus prints uninitialized state as x; Verilator prints it as 0.
+    icarus = parse("[00000008] 0040a283 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 5]=xxxxxxxx l[00000084,1111]=xxxxxxxx")
+    verilator = parse("[00000008] 0040a283 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 5]=00000000 l[00000084,1111]=00000000")
+    assert icarus.rd == (5, 0) and icarus.load == (0x84, 0b1111, 0)
+    assert retire_trace.diff(verilator, icarus) is None
+    partial = parse("[00000008] 0040a283 r[ x]=0000x080 r[xx]=xxxxxxxx w[ 5]=000000zz l[00000084,11x1]=00000000")
+    assert (partial.rs1, partial.rd, partial.load[1]) == ((0, 0x80), (5, 0), 0b1101)
+
+def test_x_against_nonzero_golden():
+    golden = parse("[00000008] 0040a283 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 5]=00fffffe l[00000084,1111]=00fffffe")
+    icarus = parse("[00000008] 0040a283 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 5]=xxxxxxxx l[00000084,1111]=xxxxxxxx")
+    assert retire_trace.diff(golden, icarus) == ("rd write", (5, 0x00FFFFFE), (5, 0))
+
+def test_masked_lanes():
+    golden = parse("[00000008] 00508183 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 3]=ffffffff l[00000084,0010]=0000ff00")
+    actual = parse("[00000008] 00508183 r[ 1]=00000080 r[xx]=xxxxxxxx w[ 3]=ffffffff l[00000084,0010]=xxxxffxx")
+    assert retire_trace.diff(golden, actual) is None
@@ -0,0 +1,38 @@
+import pytest
+
+import iss
+import rv
+import rvgen
+
+SEEDS = range(40)
+
+def run(seed: int, length: int) -> tuple[list[int], iss.ISS, list[iss.Retire]]:
+    words = rv.assemble_program(rvgen.generate(seed, length))
+    model = iss.ISS(b"".join(word.to_bytes(4, "little") for word in words))
+    return words, model, [iss.Retire(*r) for r in model.run(100 * length)]
+
+@pytest.mark.parametrize("length", [200, 2000])
+def test_programs_halt(length):
+    for seed in SEEDS:
+        words, model, records = run(seed, length)
+        assert len(words) <= rvgen.IMEM_WORDS, seed
+        assert model.halted and not model.trapped, seed
+        assert records[-1].halt and not any(r.trap for r in records), seed
+        # Loops make up the target count; taken forward branches skip some.
+        assert length // 2 <= len(records) <= 2 * length, seed
+
+def test_memory_stays_in_buffer():
+    for seed in SEEDS:
+        _, _, records = run(seed, 1000)
+        for r in records:
+            if r.dmem_ren or r.dmem_wen:
+                assert rvgen.DATA_BASE <= r.dmem_addr < rvgen.DATA_BASE + 4 * rvgen.DATA_WORDS, (seed, hex(r.pc))
+
+def test_base_register_reserved():
+    for seed in SEEDS:
+        _, _, records = run(seed, 1000)
+        assert [r.pc for r in records if r.rd_waddr == rvgen.BASE] == [0], seed
+
+def test_reproducible():
+    assert rvgen.generate(7, 500) == rvgen.generate(7, 500)
+    assert rvgen.generate(7, 500) != rvgen.generate(8, 500)
@@ -0,0 +1,118 @@
+import pytest
+
+import vcdq
+
+# A 10-unit clock, an 8-bit bus that starts x and is written with dropped
+# leading digits, and a 1-bit trap.
+VCD = """\
+$timescale 1ns $end
+$scope module hart_tb $end
+$var wire 1 ! clk $end
+$var wire 8 " bus [7:0] $end
+$var wire 1 # trap $end
+$scope module dut $end
+$var wire 1 $ clk $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+$dumpvars
+0!
+bx "
+0#
+0$
+$end
+#5
+1!
+1$
+#10
+0!
+0$
+b101 "
+#15
+1!
+1$
+#20
+0!
+0$
+bx1 "
+1#
+#25
+1!
+1$
+#30
+0!
+0$
+b00001111 "
+#35
+1!
+1$
+"""
+
+def test_parse():
+    events = list(vcdq.parse(VCD.splitlines(keepends=True)))
+    assert events[:4] == [
+        ("var", "hart_tb.clk", "!", 1),
+        ("var", "hart_tb.bus", '"', 8),
+        ("var", "hart_tb.trap", "#", 1),
+        ("var", "hart_tb.dut.clk", "$", 1),
+    ]
+    bus = [value for kind, _, code, value in events[4:] if code == '"']
+    assert bus == ["xxxxxxxx", "101", "xxxxxxx1", "1111"]
+
+@pytest.mark.parametrize("bits, value", [
+    ("0", "0"), ("00101", "101"), ("x", "xxxxxxxx"), ("z0", "zzzzzzz0"), ("1x", "0000001x"), ("0x", "0000000x"),
+])
+def test_normalize(bits, value):
+    assert vcdq.normalize(bits, 8) == value
+
+@pytest.mark.parametrize("query, value", [
+    ("x", "xxxxxxxx"), ("X", "xxxxxxxx"), ("z", "zzzzzzzz"), ("5", "101"), ("0x0f", "1111"), ("0b0101", "101"),
+    ("0bx1", "xxxxxxx1"), ("-1", "11111111"),
+])
+def test_parse_value(query, value):
+    assert vcdq.parse_value(query, 8) == value
+
+def test_parse_value_one_bit():
+    assert [vcdq.parse_value(v, 1) for v in ("0", "1", "x", "Z")] == ["0", "1", "x", "z"]
+
+@pytest.fixture
+def db(tmp_path):
+    dump = tmp_path / "hart.vcd"
+    dump.write_text(VCD)
+    db = vcdq.open_index(dump)
+    yield db
+    db.close()
+
+def test_index(db):
+    [(path, code, width)] = vcdq.match(db, ["*.bus"])
+    assert (path, width) == ("hart_tb.bus", 8)
+    assert [p for p, _, _ in vcdq.match(db, ["*clk"])] == ["hart_tb.clk", "hart_tb.dut.clk"]
+    with pytest.raises(KeyError):
+        vcdq.match(db, ["*.pc"])
+
+    # The top-level clk rises at 5, 15, 25 and 35.
+    assert [vcdq.cycle_time(db, c) for c in (1, 2, 3, 4)] == [5, 15, 25, 35]
+    assert (vcdq.time_cycle(db, 4), vcdq.time_cycle(db, 15), vcdq.time_cycle(db, 100)) == (0, 2, 4)
+
+    assert vcdq.format_value(vcdq.value_at(db, code, 4), width) == "xxxxxxxx"
+    assert vcdq.format_value(vcdq.value_at(db, code, 14), width) == "05"
+    assert vcdq.format_value(vcdq.value_at(db, code, 34), width) == "0f"
+
+def test_first_x(db):
+    [(_, code, width)] = vcdq.match(db, ["hart_tb.bus"])
+    # The x the bus starts with, queried as a plain "x".
+    assert vcdq.first(db, code, vcdq.parse_value("x", width)) == 0
+    assert vcdq.first(db, code, vcdq.parse_value("x", width), after=1) is None
+    assert vcdq.first(db, code, vcdq.parse_value("0bx1", width)) == 20
+    assert vcdq.first(db, code, vcdq.parse_value("15", width)) == 30
+    [(_, trap, _)] = vcdq.match(db, ["hart_tb.trap"])
+    assert vcdq.first(db, trap, "1") == 20
+
+def test_stale_index(tmp_path, db):
+    dump = tmp_path / "hart.vcd"
+    dump.write_text(VCD.replace("b101", "b1101"))
+    db = vcdq.open_index(dump)
+    [(_, code, _)] = vcdq.match(db, ["hart_tb.bus"])
+    assert vcdq.value_at(db, code, 14) == "1101"
+    db.close()
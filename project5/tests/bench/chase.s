@@ -0,0 +1,56 @@
+# Pointer chasing: four laps around a 64-node linked list whose links
+# follow the permutation i -> (5i + 3) mod 64. Every load's address comes
+# from the load just before it.
+# Result (a1): a rotate-add checksum of the node values in visit order.
+.text
+main:
+  addi s0, x0, 0x100          # node[i] = {next, value} at 0x100 + 8i
+  addi t0, x0, 0
+  addi t6, x0, 64
+  lui  t2, 0x7f4a8
+  addi t2, t2, 0x7c1
+build:
+  slli t1, t0, 2
+  add  t1, t1, t0
+  addi t1, t1, 3
+  andi t1, t1, 63
+  slli t1, t1, 3
+  add  t1, t1, s0             # &node[(5i + 3) mod 64]
+  slli t5, t0, 3
+  add  t5, t5, s0             # &node[i]
+  sw   t1, 0(t5)
+  slli t3, t2, 13             # xorshift32
+  xor  t2, t2, t3
+  srli t3, t2, 17
+  xor  t2, t2, t3
+  slli t3, t2, 5
+  xor  t2, t2, t3
+  sw   t2, 4(t5)
+  addi t0, t0, 1
+  bne  t0, t6, build
+
+  mv   t0, s0
+  addi t5, x0, 256
+  addi a1, x0, 0
+chase:
+  lw   t0, 0(t0)
+  lw   t2, 4(t0)
+  slli t3, a1, 1              # checksum = rotl(checksum, 1) + word
+  srli t4, a1, 31
+  or   a1, t3, t4
+  add  a1, a1, t2
+  addi t5, t5, -1
+  bne  t5, x0, chase
+  j    check
+
+check:
+  lui  t6, 0x1b681
+  addi t6, t6, 1920
+  bne  a1, t6, fail
+pass:
+  addi a0, x0, 1
+  ebreak
+fail:
+  lui  a0, 0xe
+  addi a0, a0, -339          # 0xdead
+  ebreak
@@ -0,0 +1,85 @@
+# Dot product of two 32-element vectors with project1's algorithm: dot()
+# walks both arrays and calls umul() for every pair, so most of the time
+# goes to the short, branchy shift-and-add loop and its calls and returns.
+# Result (a1): the dot product.
+.text
+main:
+  addi s0, x0, 0x100          # A
+  addi s1, x0, 0x200          # B
+  addi t0, x0, 0              # byte offset
+  addi t1, x0, 1              # A[i] = 3i + 1
+  lui  t2, 0x2545f            # xorshift state
+  addi t2, t2, 0x491
+  addi t5, x0, 128
+init:
+  slli t3, t2, 13             # xorshift32
+  xor  t2, t2, t3
+  srli t3, t2, 17
+  xor  t2, t2, t3
+  slli t3, t2, 5
+  xor  t2, t2, t3
+  slli t4, t2, 16             # B[i] = low 16 bits of the state
+  srli t4, t4, 16
+  add  t3, s0, t0
+  sw   t1, 0(t3)
+  add  t3, s1, t0
+  sw   t4, 0(t3)
+  addi t1, t1, 3
+  addi t0, t0, 4
+  bne  t0, t5, init
+
+  mv   a0, s0
+  mv   a1, s1
+  addi a2, x0, 32
+  jal  ra, dot
+  mv   a1, a0
+  j    check
+
+# a0 = sum of A[i] * B[i] for i < a2, where A = a0 and B = a1.
+dot:
+  mv   s2, a0
+  mv   s3, a1
+  mv   s4, a2
+  mv   s5, ra
+  addi s6, x0, 0
+dot_loop:
+  beq  s4, x0, dot_done
+  lw   a0, 0(s2)
+  lw   a1, 0(s3)
+  jal  ra, umul
+  add  s6, s6, a0
+  addi s2, s2, 4
+  addi s3, s3, 4
+  addi s4, s4, -1
+  j    dot_loop
+dot_done:
+  mv   a0, s6
+  mv   ra, s5
+  ret
+
+# project1's umul: a0 = a0 * a1 (low 32 bits), by shift and add. Clobbers
+# t0 and t1.
+umul:
+  mv   t0, a0
+  addi a0, x0, 0
+umul_loop:
+  andi t1, a1, 1
+  beq  t1, x0, umul_skip
+  add  a0, a0, t0
+umul_skip:
+  slli t0, t0, 1
+  srli a1, a1, 1
+  bne  a1, x0, umul_loop
+  ret
+
+check:
+  lui  t6, 0x2b86
+  addi t6, t6, -1610
+  bne  a1, t6, fail
+pass:
+  addi a0, x0, 1
+  ebreak
+fail:
+  lui  a0, 0xe
+  addi a0, a0, -339          # 0xdead
+  ebreak
@@ -0,0 +1,73 @@
+# A branchy state machine: counts the (overlapping) occurrences of the
+# bit pattern 1101 in 1024 random bits, dispatching on the state with a
+# chain of branches. Nearly every branch depends on the data.
+# Result (a1): count << 2 | final state.
+.text
+main:
+  lui  t2, 0x3c6ef
+  addi t2, t2, 0x372
+  addi s2, x0, 0              # state: 0, 1, 11, 110
+  addi s3, x0, 0              # matches
+  addi s4, x0, 32             # words left
+word:
+  slli t3, t2, 13             # xorshift32
+  xor  t2, t2, t3
+  srli t3, t2, 17
+  xor  t2, t2, t3
+  slli t3, t2, 5
+  xor  t2, t2, t3
+  mv   t6, t2
+  addi t5, x0, 32             # bits left
+bit:
+  andi t0, t6, 1
+  srli t6, t6, 1
+  beq  s2, x0, seen_none
+  addi t1, x0, 1
+  beq  s2, t1, seen_1
+  addi t1, x0, 2
+  beq  s2, t1, seen_11
+seen_110:
+  beq  t0, x0, to_none
+  addi s3, s3, 1
+  j    to_1
+seen_none:
+  bne  t0, x0, to_1
+  j    to_none
+seen_1:
+  bne  t0, x0, to_11
+  j    to_none
+seen_11:
+  beq  t0, x0, to_110
+  j    to_11
+to_none:
+  addi s2, x0, 0
+  j    next
+to_1:
+  addi s2, x0, 1
+  j    next
+to_11:
+  addi s2, x0, 2
+  j    next
+to_110:
+  addi s2, x0, 3
+next:
+  addi t5, t5, -1
+  bne  t5, x0, bit
+  addi s4, s4, -1
+  bne  s4, x0, word
+
+  slli a1, s3, 2
+  or   a1, a1, s2
+  j    check
+
+check:
+  lui  t6, 0x0
+  addi t6, t6, 236
+  bne  a1, t6, fail
+pass:
+  addi a0, x0, 1
+  ebreak
+fail:
+  lui  a0, 0xe
+  addi a0, a0, -339          # 0xdead
+  ebreak
@@ -0,0 +1,94 @@
+# 6x6 matrix multiply, C = A * B, with umul() for the products: a triple
+# loop with strided column accesses and a call in the inner loop.
+# Result (a1): a rotate-xor checksum of C.
+.text
+main:
+  addi s0, x0, 0x100          # A, row-major
+  addi s1, x0, 0x200          # B, row-major
+  addi t0, x0, 0
+  addi t1, x0, 144            # 36 words
+  lui  t2, 0x12345
+  addi t2, t2, 0x678
+init:
+  slli t3, t2, 13             # xorshift32
+  xor  t2, t2, t3
+  srli t3, t2, 17
+  xor  t2, t2, t3
+  slli t3, t2, 5
+  xor  t2, t2, t3
+  srli t4, t0, 2              # A[n] = n + 1
+  addi t4, t4, 1
+  add  t5, s0, t0
+  sw   t4, 0(t5)
+  andi t4, t2, 255            # B[n] = random byte
+  add  t5, s1, t0
+  sw   t4, 0(t5)
+  addi t0, t0, 4
+  bne  t0, t1, init
+
+  addi s5, x0, 0x300          # &C[i][j]
+  addi s2, x0, 0              # row offset of i
+row:
+  addi s3, x0, 0              # column offset of j
+col:
+  addi s6, x0, 0
+  add  s7, s0, s2             # &A[i][k]
+  add  s8, s1, s3             # &B[k][j]
+  addi s4, x0, 6
+inner:
+  lw   a0, 0(s7)
+  lw   a1, 0(s8)
+  jal  ra, umul
+  add  s6, s6, a0
+  addi s7, s7, 4
+  addi s8, s8, 24
+  addi s4, s4, -1
+  bne  s4, x0, inner
+  sw   s6, 0(s5)
+  addi s5, s5, 4
+  addi s3, s3, 4
+  addi t0, x0, 24
+  bne  s3, t0, col
+  addi s2, s2, 24
+  addi t0, x0, 144
+  bne  s2, t0, row
+
+  addi t0, x0, 0x300
+  addi t1, x0, 0x390
+  addi a1, x0, 0
+sum:
+  lw   t2, 0(t0)
+  slli t3, a1, 1              # checksum = rotl(checksum, 1) ^ word
+  srli t4, a1, 31
+  or   a1, t3, t4
+  xor  a1, a1, t2
+  addi t0, t0, 4
+  bne  t0, t1, sum
+  j    check
+
+# project1's umul: a0 = a0 * a1 (low 32 bits), by shift and add. Clobbers
+# t0 and t1.
+umul:
+  mv   t0, a0
+  addi a0, x0, 0
+umul_loop:
+  andi t1, a1, 1
+  beq  t1, x0, umul_skip
+  add  a0, a0, t0
+umul_skip:
+  slli t0, t0, 1
+  srli a1, a1, 1
+  bne  a1, x0, umul_loop
+  ret
+
+check:
+  lui  t6, 0xc124f
+  addi t6, t6, -927
+  bne  a1, t6, fail
+pass:
+  addi a0, x0, 1
+  ebreak
+fail:
+  lui  a0, 0xe
+  addi a0, a0, -339          # 0xdead
+  ebreak
@@ -0,0 +1,103 @@
+# memcpy() of an aligned 256-byte block (four words per iteration, loads
+# ahead of stores) and of an unaligned 61-byte block (byte by byte).
+# Result (a1): a rotate-xor checksum of both copies.
+.text
+main:
+  addi t0, x0, 0              # source: 64 random words at 0x000
+  addi t1, x0, 256
+  lui  t2, 0x9e378
+  addi t2, t2, -0x647
+init:
+  slli t3, t2, 13             # xorshift32
+  xor  t2, t2, t3
+  srli t3, t2, 17
+  xor  t2, t2, t3
+  slli t3, t2, 5
+  xor  t2, t2, t3
+  sw   t2, 0(t0)
+  addi t0, t0, 4
+  bne  t0, t1, init
+
+  addi a0, x0, 0x100
+  addi a1, x0, 0x000
+  addi a2, x0, 256
+  jal  ra, memcpy
+  addi a0, x0, 0x201
+  addi a1, x0, 0x003
+  addi a2, x0, 61
+  jal  ra, memcpy
+
+  addi t0, x0, 0x100
+  addi t1, x0, 0x200
+  addi a1, x0, 0
+sum_words:
+  lw   t2, 0(t0)
+  slli t3, a1, 1              # checksum = rotl(checksum, 1) ^ word
+  srli t4, a1, 31
+  or   a1, t3, t4
+  xor  a1, a1, t2
+  addi t0, t0, 4
+  bne  t0, t1, sum_words
+  addi t0, x0, 0x201
+  addi t1, x0, 0x23e
+sum_bytes:
+  lbu  t2, 0(t0)
+  slli t3, a1, 1              # checksum = rotl(checksum, 1) ^ word
+  srli t4, a1, 31
+  or   a1, t3, t4
+  xor  a1, a1, t2
+  addi t0, t0, 1
+  bne  t0, t1, sum_bytes
+  j    check
+
+# Copy a2 bytes from a1 to a0: by words when everything is word aligned,
+# otherwise by bytes.
+memcpy:
+  add  a3, a1, a2             # end of the source
+  or   t0, a0, a1
+  or   t0, t0, a2
+  andi t0, t0, 3
+  bne  t0, x0, memcpy_bytes
+  andi t0, a2, 15
+  sub  a4, a3, t0             # end of the 16-byte blocks
+  beq  a1, a4, memcpy_words
+memcpy_blocks:
+  lw   t0, 0(a1)
+  lw   t1, 4(a1)
+  lw   t2, 8(a1)
+  lw   t3, 12(a1)
+  sw   t0, 0(a0)
+  sw   t1, 4(a0)
+  sw   t2, 8(a0)
+  sw   t3, 12(a0)
+  addi a1, a1, 16
+  addi a0, a0, 16
+  bne  a1, a4, memcpy_blocks
+memcpy_words:
+  beq  a1, a3, memcpy_done
+  lw   t0, 0(a1)
+  sw   t0, 0(a0)
+  addi a1, a1, 4
+  addi a0, a0, 4
+  j    memcpy_words
+memcpy_bytes:
+  beq  a1, a3, memcpy_done
+  lbu  t0, 0(a1)
+  sb   t0, 0(a0)
+  addi a1, a1, 1
+  addi a0, a0, 1
+  j    memcpy_bytes
+memcpy_done:
+  ret
+
+check:
+  lui  t6, 0xa5b4
+  addi t6, t6, -397
+  bne  a1, t6, fail
+pass:
+  addi a0, x0, 1
+  ebreak
+fail:
+  lui  a0, 0xe
+  addi a0, a0, -339          # 0xdead
+  ebreak
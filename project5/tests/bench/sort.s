@@ -0,0 +1,68 @@
+# Insertion sort of 64 random signed words: an inner loop of load, compare
+# and store that exits on a data-dependent branch.
+# Result (a1): a rotate-xor checksum of the sorted array, which is also
+# checked to be in order.
+.text
+main:
+  addi s0, x0, 0x100          # a[64]
+  addi s1, x0, 256            # its size in bytes
+  addi t0, x0, 0
+  lui  t2, 0x6c078
+  addi t2, t2, 0x265
+init:
+  slli t3, t2, 13             # xorshift32
+  xor  t2, t2, t3
+  srli t3, t2, 17
+  xor  t2, t2, t3
+  slli t3, t2, 5
+  xor  t2, t2, t3
+  add  t1, s0, t0
+  sw   t2, 0(t1)
+  addi t0, t0, 4
+  bne  t0, s1, init
+
+  addi t0, x0, 4              # offset of a[i]
+outer:
+  add  t1, s0, t0
+  lw   t2, 0(t1)              # key = a[i]
+  mv   t3, t1                 # the hole
+shift:
+  beq  t3, s0, place
+  lw   t4, -4(t3)
+  bge  t2, t4, place
+  sw   t4, 0(t3)
+  addi t3, t3, -4
+  j    shift
+place:
+  sw   t2, 0(t3)
+  addi t0, t0, 4
+  bne  t0, s1, outer
+
+  mv   t0, s0
+  add  t1, s0, s1
+  addi t5, x0, -2048          # a lower bound of a[0] for the order check
+  slli t5, t5, 20
+  addi a1, x0, 0
+sum:
+  lw   t2, 0(t0)
+  blt  t2, t5, fail
+  mv   t5, t2
+  slli t3, a1, 1              # checksum = rotl(checksum, 1) ^ word
+  srli t4, a1, 31
+  or   a1, t3, t4
+  xor  a1, a1, t2
+  addi t0, t0, 4
+  bne  t0, t1, sum
+  j    check
+
+check:
+  lui  t6, 0xa1a62
+  addi t6, t6, -560
+  bne  a1, t6, fail
+pass:
+  addi a0, x0, 1
+  ebreak
+fail:
+  lui  a0, 0xe
+  addi a0, a0, -339          # 0xdead
+  ebreak
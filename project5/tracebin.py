@@ -0,0 +1,264 @@
+"""
+Compact binary retire traces.
+
+A trace file is a 16-byte header followed by one fixed-width 44-byte record
+per retired instruction, all little-endian 32-bit words:
+
+    header: magic "RVTR", version, words per record, trace format (4 or 5)
+    record: cycle, pc, inst, next_pc, rs1_rdata, rs2_rdata, rd_wdata,
+            dmem_addr, dmem_rdata, dmem_wdata, flags
+
+where `flags` packs the narrow fields (see FLAGS). `tb/tb.v` writes this
+format with `+trace_bin=<file>`. Files are read through a memory map as a
+NumPy structured array, so comparisons and queries over a whole trace are
+vectorized:
+
+    trace = tracebin.read("out.rvtr")
+    stores = trace[tracebin.unpack(trace, "wen") == 1]
+    print(len(trace), "retired,", len(stores), "stores")
+
+    python tracebin.py golden tb/program.mem -o traces/program.rvtr
+    python tracebin.py compare tb/out.rvtr traces/program.rvtr
+    python tracebin.py dump tb/out.rvtr
+    python tracebin.py convert traces/program.trace -o traces/program.rvtr
+"""
+
+import argparse
+import pathlib
+import sys
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+import iss
+import retire_trace
+
+MAGIC = 0x52545652  # b"RVTR"
+VERSION = 1
+FORMATS = {"project4": 4, "project5": 5}
+
+HEADER = np.dtype([("magic", "<u4"), ("version", "<u4"), ("words", "<u4"), ("format", "<u4")])
+
+RECORD = np.dtype([
+    ("cycle", "<u4"),
+    ("pc", "<u4"),
+    ("inst", "<u4"),
+    ("next_pc", "<u4"),
+    ("rs1_rdata", "<u4"),
+    ("rs2_rdata", "<u4"),
+    ("rd_wdata", "<u4"),
+    ("dmem_addr", "<u4"),
+    ("dmem_rdata", "<u4"),
+    ("dmem_wdata", "<u4"),
+    ("flags", "<u4"),
+])
+
+# Narrow fields packed into `flags`: name -> (shift, width). Matches the
+# `{9'b0, halt, trap, wen, ren, mask, rd, rs2, rs1}` concatenation in tb.v.
+FLAGS = {
+    "rs1_raddr": (0, 5),
+    "rs2_raddr": (5, 5),
+    "rd_waddr": (10, 5),
+    "dmem_mask": (15, 4),
+    "dmem_ren": (19, 1),
+    "dmem_wen": (20, 1),
+    "trap": (21, 1),
+    "halt": (22, 1),
+}
+
+def unpack(trace: np.ndarray, name: str) -> np.ndarray:
+    """One of the FLAGS fields of every record, as a uint32 array."""
+    shift, width = FLAGS[name]
+    return (trace["flags"] >> np.uint32(shift)) & np.uint32((1 << width) - 1)
+
+def read(path: pathlib.Path) -> np.ndarray:
+    """Memory-map a binary trace as a structured array of RECORD."""
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC:
+        raise ValueError(f"{path}: not a binary retire trace")
+    if header["version"][0] != VERSION or header["words"][0] * 4 != RECORD.itemsize:
+        raise ValueError(f"{path}: unsupported trace version {header['version'][0]}")
+    if pathlib.Path(path).stat().st_size == HEADER.itemsize:
+        return np.zeros(0, dtype=RECORD)
+    return np.memmap(path, dtype=RECORD, mode="r", offset=HEADER.itemsize)
+
+def trace_format(path: pathlib.Path) -> str:
+    fmt = int(np.fromfile(path, dtype=HEADER, count=1)["format"][0])
+    return {v: k for k, v in FORMATS.items()}.get(fmt, "project5")
+
+def write(path: pathlib.Path, trace: np.ndarray, fmt: str = "project5") -> None:
+    header = np.array([(MAGIC, VERSION, RECORD.itemsize // 4, FORMATS[fmt])], dtype=HEADER)
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(np.ascontiguousarray(trace, dtype=RECORD).tobytes())
+
+def from_retire(records: list[tuple], cycles: Iterable[int] | None = None) -> np.ndarray:
+    """Build a trace from iss.Retire tuples (e.g. the output of ISS.run)."""
+    r = np.array(records, dtype=np.uint32).reshape(-1, len(iss.Retire._fields))
+    f = iss.Retire._fields
+    col = {name: r[:, i] for i, name in enumerate(f)}
+
+    trace = np.zeros(len(r), dtype=RECORD)
+    if cycles is None:
+        trace["cycle"] = np.arange(1, len(r) + 1)
+    else:
+        trace["cycle"] = np.fromiter(cycles, dtype=np.uint32, count=len(r))
+    for name in ("pc", "inst", "next_pc", "rs1_rdata", "rs2_rdata", "rd_wdata", "dmem_addr", "dmem_rdata", "dmem_wdata"):
+        trace[name] = col[name]
+    flags = np.zeros(len(r), dtype=np.uint32)
+    for name, (shift, width) in FLAGS.items():
+        flags |= (col[name] & np.uint32((1 << width) - 1)) << np.uint32(shift)
+    trace["flags"] = flags
+    return trace
+
+def to_retire(trace: np.ndarray) -> np.ndarray:
+    """The inverse of from_retire: an (n, 17) array in iss.Retire field order."""
+    columns = []
+    for name in iss.Retire._fields:
+        columns.append(unpack(trace, name) if name in FLAGS else trace[name])
+    return np.stack(columns, axis=1) if len(trace) else np.zeros((0, len(iss.Retire._fields)), dtype=np.uint32)
+
+def from_text(lines: Iterable[str]) -> np.ndarray:
+    """
+    Convert a text trace to binary. Fields that the text format does not
+    print (next_pc, halt, and register reads it shows as xx) are zero.
+    """
+    rows = []
+    cycles = []
+    for count, t in enumerate(retire_trace.read_trace(lines), start=1):
+        rs1 = t.rs1 or (0, 0)
+        rs2 = t.rs2 or (0, 0)
+        rd = t.rd or (0, 0)
+        mem = t.load or t.store or (0, 0, 0)
+        rows.append((
+            t.pc or 0, t.inst or 0, int(t.trap), 0,
+            rs1[0] or 0, rs1[1] or 0, rs2[0] or 0, rs2[1] or 0, rd[0] or 0, rd[1] or 0,
+            mem[0] or 0, int(t.load is not None), int(t.store is not None), mem[1] or 0,
+            (t.load[2] if t.load else 0) or 0, (t.store[2] if t.store else 0) or 0, 0,
+        ))
+        cycles.append(t.cycle if t.cycle is not None else count)
+    return from_retire(rows, cycles)
+
+def to_text(trace: np.ndarray, fmt: str = "project5") -> Iterator[str]:
+    """Format the records like the text lines printed by tb.v."""
+    for cycle, r in zip(trace["cycle"].tolist(), to_retire(trace).tolist()):
+        yield iss.format_retire(r, fmt, cycle)
+
+def visible(trace: np.ndarray, fmt: str = "project5") -> dict[str, np.ndarray]:
+    """
+    Which parts of each record the text trace shows, by the same opcode
+    rules as the `$write` calls in tb.v. Register reads an instruction does
+    not make are don't-care.
+    """
+    inst = trace["inst"]
+    opcode = inst & np.uint32(0x7F)
+    no_rs = (inst & np.uint32(0xF)) == 0b0111
+    rs1_only = np.isin(opcode, (0b0010011, 0b0000011, 0b1100111))
+    if fmt == "project4":
+        no_rs |= opcode == 0b1110011
+        rs1_only |= opcode == 0b1101111
+    else:
+        no_rs |= np.isin(opcode, (0b1110011, 0b1101111))
+    return {"rs1": ~no_rs, "rs2": ~no_rs & ~rs1_only}
+
+def compare(actual: np.ndarray, golden: np.ndarray, fmt: str = "project5") -> retire_trace.Mismatch | None:
+    """
+    Vectorized equivalent of retire_trace.compare: the first record where
+    the traces differ in a field the text trace would show, or None.
+    """
+    n = min(len(actual), len(golden))
+    a, e = actual[:n], golden[:n]
+    show = visible(e, fmt)
+
+    def f(trace, name):
+        return unpack(trace, name) if name in FLAGS else trace[name]
+
+    def differs(name):
+        return f(a, name) != f(e, name)
+
+    lanes = np.array(iss.LANES, dtype=np.uint32)
+    masked = lanes[f(e, "dmem_mask")]
+    e_rd = f(e, "rd_waddr")
+
+    def mem(kind, data):
+        enabled = f(e, kind) == 1
+        mismatch = differs(kind)
+        mismatch |= enabled & (differs("dmem_addr") | differs("dmem_mask"))
+        mismatch |= enabled & ((f(a, data) & masked) != (f(e, data) & masked))
+        return mismatch
+
+    checks = [
+        ("pc", differs("pc")),
+        ("inst", differs("inst")),
+        ("trap", differs("trap")),
+        ("rs1", show["rs1"] & (differs("rs1_raddr") | differs("rs1_rdata"))),
+        ("rs2", show["rs2"] & (differs("rs2_raddr") | differs("rs2_rdata"))),
+        ("rd write", differs("rd_waddr") | ((e_rd != 0) & differs("rd_wdata"))),
+        ("dmem load", mem("dmem_ren", "dmem_rdata")),
+        ("dmem store", mem("dmem_wen", "dmem_wdata")),
+    ]
+    bad = np.zeros(n, dtype=bool)
+    for _, mismatch in checks:
+        bad |= mismatch
+
+    if bad.any():
+        i = int(np.argmax(bad))
+        field = next(name for name, mismatch in checks if mismatch[i])
+        expected, = to_text(golden[i:i + 1], fmt)
+        got, = to_text(actual[i:i + 1], fmt)
+        cycle = int(actual["cycle"][i]) if fmt == "project4" else None
+        return retire_trace.Mismatch(i, cycle, int(actual["pc"][i]), int(actual["inst"][i]), field, expected, got)
+    if len(actual) > n:
+        got, = to_text(actual[n:n + 1], fmt)
+        return retire_trace.Mismatch(n, None, int(actual["pc"][n]), int(actual["inst"][n]),
+                                     "retired after end of golden trace", None, got)
+    if len(golden) > n:
+        expected, = to_text(golden[n:n + 1], fmt)
+        return retire_trace.Mismatch(n, None, int(golden["pc"][n]), int(golden["inst"][n]),
+                                     "trace ended early", expected, None)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Create, inspect and compare binary retire traces.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("golden", help="binary golden trace of a program from the reference ISS")
+    p.add_argument("program", type=pathlib.Path)
+    p.add_argument("-o", "--output", type=pathlib.Path, required=True)
+    p.add_argument("--format", choices=FORMATS, default="project5")
+    p.add_argument("--max-instructions", type=int, default=1_000_000)
+
+    p = commands.add_parser("convert", help="convert a text trace to binary")
+    p.add_argument("trace", type=pathlib.Path)
+    p.add_argument("-o", "--output", type=pathlib.Path, required=True)
+    p.add_argument("--format", choices=FORMATS, default="project5")
+
+    p = commands.add_parser("dump", help="print a binary trace as text")
+    p.add_argument("trace", type=pathlib.Path)
+
+    p = commands.add_parser("compare", help="compare a binary trace against a binary golden trace")
+    p.add_argument("actual", type=pathlib.Path)
+    p.add_argument("golden", type=pathlib.Path)
+
+    args = parser.parse_args()
+
+    if args.command == "golden":
+        model = iss.ISS.from_mem(args.program)
+        write(args.output, from_retire(model.run(args.max_instructions)), args.format)
+    elif args.command == "convert":
+        with open(args.trace) as f:
+            write(args.output, from_text(f), args.format)
+    elif args.command == "dump":
+        for line in to_text(read(args.trace), trace_format(args.trace)):
+            print(line)
+    elif args.command == "compare":
+        mismatch = compare(read(args.actual), read(args.golden), trace_format(args.golden))
+        if mismatch is None:
+            print("Retire trace matches.")
+            return 0
+        print(retire_trace.report(mismatch))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import resource
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import cocotb
+import cocotb.runner
+import pytest
+from cocotb.runner import Simulator
+
+TIMESCALE = ("1ns", "1ps")
+
+# Compiled simulations are cached by the hash of everything that goes into
+# the build, so parametrized tests (and reruns on an unchanged submission)
+# reuse the same build directory instead of recompiling the HDL.
+BUILD_CACHE = pathlib.Path(os.getenv("SIM_BUILD_CACHE", "sim_build"))
+BUILD_STAMP = ".cocotb_build_ok"
+
+# Waveform dumping for cocotb runs: "none" (the default, and what grading
+# uses) or "fst" to write <toplevel>.fst into the build directory. The
+# standalone tb.v testbenches take +waves=... plusargs instead.
+WAVES = os.getenv("WAVES", "none")
+if WAVES not in ("none", "fst"):
+    raise ValueError(f"WAVES={WAVES}: expected none or fst")
+
+# The grading conftest.py points this at a file to collect per-test metrics:
+# every build and simulator run appends a JSON line to it.
+METRICS_FILE = "GRADER_METRICS_FILE"
+# Clock period of the testbenches, to turn simulated time into cycles.
+CLOCK_PERIOD_NS = 10
+
+def record_metrics(**values) -> None:
+    path = os.getenv(METRICS_FILE)
+    if path is not None:
+        with open(path, "a") as f:
+            f.write(json.dumps(values) + "\n")
+
+class PeakRSS:
+    """
+    Track the peak resident set size (in KiB) of this process's children,
+    i.e. the simulator, while a run is in progress: a thread samples their
+    high-water marks from /proc, and the kernel's own maximum over waited
+    children covers anything that ends between samples.
+    """
+
+    INTERVAL = 0.05
+
+    def __init__(self):
+        self.peak = 0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    def _sample(self) -> None:
+        try:
+            with open(f"/proc/{os.getpid()}/task/{threading.main_thread().native_id}/children") as f:
+                children = f.read().split()
+        except OSError:
+            return
+        for child in children:
+            try:
+                with open(f"/proc/{child}/status") as f:
+                    for line in f:
+                        if line.startswith("VmHWM:"):
+                            self.peak = max(self.peak, int(line.split()[1]))
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        while not self._done.wait(self.INTERVAL):
+            self._sample()
+
+    def __enter__(self) -> "PeakRSS":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._done.set()
+        self._thread.join()
+        after = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if after > self._before:
+            self.peak = max(self.peak, after)
+
+def sim_time_ns(results_xml) -> float | None:
+    """Total simulated time of the testcases in a cocotb results.xml."""
+    if results_xml is None or not pathlib.Path(results_xml).is_file():
+        return None
+    return sum(float(tc.get("sim_time_ns", 0)) for tc in ET.parse(results_xml).iter("testcase"))
+
+def timed(runner: Simulator) -> None:
+    """Make runner.test record its wall time, peak RSS and simulated time."""
+    test = runner.test
+
+    @functools.wraps(test)
+    def run(*args, **kwargs):
+        rss = PeakRSS()
+        start = time.perf_counter()
+        try:
+            with rss:
+                return test(*args, **kwargs)
+        finally:
+            # Under pytest, failures raise out of the runner before it
+            # returns the results file, so take it from its environment.
+            sim_time = sim_time_ns(runner.env.get("COCOTB_RESULTS_FILE"))
+            record_metrics(
+                phase="sim", seconds=time.perf_counter() - start, peak_rss_kb=rss.peak, sim_time_ns=sim_time,
+                cycles=None if sim_time is None else sim_time / CLOCK_PERIOD_NS,
+            )
+
+    runner.test = run
+
+def build_hash(sources: list[str], toplevel: str, sim: str, timescale: tuple[str, str], waves: bool = False) -> str:
+    h = hashlib.sha256()
+    for key in (sim, toplevel, *timescale, str(waves), cocotb.__version__):
+        h.update(key.encode())
+        h.update(b"\0")
+    for source in sorted(sources, key=lambda s: pathlib.Path(s).name):
+        h.update(pathlib.Path(source).name.encode())
+        h.update(b"\0")
+        h.update(pathlib.Path(source).read_bytes())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def get_runner(proj_path: pathlib.Path, toplevel: str, extra_sources: list[pathlib.Path] | None = None,
+               design: list[pathlib.Path] | None = None) -> Simulator:
+    """
+    Build `toplevel` from every .v in proj_path (or just the `design`
+    files, if given) plus `extra_sources`, reusing a cached build.
+    """
+    sim = os.getenv("SIM", "icarus")
+    if design is None:
+        design = [f for f in proj_path.glob("*.v") if f.is_file()]
+    sources = [str(f) for f in design]
+    sources += [str(f) for f in extra_sources or []]
+
+    waves = WAVES != "none"
+    digest = build_hash(sources, toplevel, sim, TIMESCALE, waves)
+    build_dir = (BUILD_CACHE / f"{toplevel}-{digest[:16]}").resolve()
+    build_dir.mkdir(parents=True, exist_ok=True)
+    stamp = build_dir / BUILD_STAMP
+
+    start = time.perf_counter()
+    runner = cocotb.runner.get_runner(sim)
+
+    # Hold an exclusive lock while checking and building so that concurrent
+    # pytest workers grading the same submission build it exactly once; the
+    # others block here and then pick up the finished build.
+    with open(build_dir / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        cached = stamp.exists()
+        if cached:
+            # The runners decide whether to recompile by comparing mtimes,
+            # so mark the cached outputs as newer than the sources.
+            for f in build_dir.iterdir():
+                os.utime(f)
+
+        runner.build(
+            verilog_sources=sources,
+            vhdl_sources=[],
+            hdl_toplevel=toplevel,
+            always=not cached,
+            build_dir=build_dir,
+            timescale=TIMESCALE,
+            waves=waves,
+        )
+        stamp.touch()
+    record_metrics(phase="build", seconds=time.perf_counter() - start, cached=cached)
+
+    # A waves build only dumps if the run asks for it too.
+    if waves:
+        runner.test = functools.partial(runner.test, waves=True)
+    timed(runner)
+    return runner
+
+def record_failure(testcase: str, exc: BaseException) -> None:
+    # Called from inside the simulator: cocotb's results.xml only records
+    # that a testcase failed, so keep the assertion message on the side
+    # for run_testcases() to report.
+    path = os.getenv("COCOTB_FAILURES_FILE")
+    if path is not None:
+        with open(path, "a") as f:
+            f.write(json.dumps({"testcase": testcase, "message": str(exc)}) + "\n")
+
+def run_testcases(runner: Simulator, hdl_toplevel: str, test_module: str, testcases: list[str], **kwargs) -> dict[str, str | None]:
+    """
+    Run several cocotb testcases in a single simulator launch. Returns the
+    failure message for each testcase, or None if it passed.
+    """
+    test_dir = pathlib.Path(runner.build_dir)
+    results_xml = test_dir / f"{test_module}.{os.getpid()}.results.xml"
+    failures_file = results_xml.with_suffix(".failures")
+    failures_file.unlink(missing_ok=True)
+
+    extra_env = dict(kwargs.pop("extra_env", {}))
+    extra_env["COCOTB_FAILURES_FILE"] = str(failures_file)
+
+    # The runner checks results itself (and raises on the first failure)
+    # when it sees it is running under pytest; we want every result.
+    with pytest.MonkeyPatch.context() as mp:
+        mp.delenv("PYTEST_CURRENT_TEST", raising=False)
+        try:
+            runner.test(
+                hdl_toplevel=hdl_toplevel,
+                test_module=test_module,
+                testcase=testcases,
+                results_xml=str(results_xml),
+                extra_env=extra_env,
+                **kwargs,
+            )
+        except SystemExit as e:
+            return {testcase: str(e) for testcase in testcases}
+
+    messages = {}
+    if failures_file.exists():
+        for line in failures_file.read_text().splitlines():
+            failure = json.loads(line)
+            messages[failure["testcase"]] = failure["message"]
+
+    results = {testcase: "simulation ended before the test ran" for testcase in testcases}
+    if results_xml.is_file():
+        for tc in ET.parse(results_xml).iter("testcase"):
+            name = tc.get("name")
+            if tc.find("failure") is None:
+                results[name] = None
+            else:
+                results[name] = messages.get(name, "test failed")
+    return results
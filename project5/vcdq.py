@@ -0,0 +1,291 @@
+"""
+Query hart waveforms without opening them in GTKWave.
+
+The first query on a dump streams it once and writes an on-disk SQLite
+index next to it (`hart.vcd.vcdq`): every value change per signal, and the
+time of every rising clock edge. Later queries are index lookups and do
+not read the dump again until it changes. FST dumps are streamed through
+`fst2vcd`, which comes with GTKWave.
+
+    python vcdq.py signals tb/hart.vcd '*retire*'
+    python vcdq.py at tb/hart.vcd --cycle 120 hart_tb.pc 'hart_tb.dut.ID_EX.*'
+    python vcdq.py first tb/hart.vcd hart_tb.trap=1 --after-cycle 50
+
+Cycle N is the Nth rising edge of the clock since time 0, and the value
+"at" a cycle is the value just before that edge, which is what the edge
+samples (and what tb.v prints). Note tb.v's own cycle counter starts after
+reset; `first hart_tb.cycles=<n>` finds its cycles directly.
+"""
+
+import argparse
+import os
+import pathlib
+import sqlite3
+import subprocess
+import sys
+from collections.abc import Iterator
+
+BATCH = 100_000
+# Bumped when the stored form of values changes, so old indexes are rebuilt.
+INDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE signals (path TEXT PRIMARY KEY, code TEXT, width INTEGER);
+CREATE TABLE changes (code TEXT, time INTEGER, value TEXT);
+CREATE TABLE edges (cycle INTEGER PRIMARY KEY, time INTEGER);
+"""
+
+def _lines(path: pathlib.Path) -> Iterator[str]:
+    if path.suffix == ".fst":
+        with subprocess.Popen(["fst2vcd", str(path)], stdout=subprocess.PIPE, text=True) as proc:
+            yield from proc.stdout
+        if proc.returncode:
+            raise RuntimeError(f"fst2vcd exited with status {proc.returncode}")
+    else:
+        with open(path) as f:
+            yield from f
+
+def parse(lines) -> Iterator[tuple]:
+    """
+    Stream a VCD. Yields ("var", path, code, width) for each declaration,
+    then ("change", time, code, value) for each value change. Vector values
+    are binary strings, as normalize() stores them.
+    """
+    widths = {}
+    scope = []
+    time = 0
+    header = True
+    tokens = iter(())
+    for line in lines:
+        if header:
+            words = line.split()
+            if not words:
+                continue
+            if words[0] == "$scope":
+                scope.append(words[2])
+            elif words[0] == "$upscope":
+                scope.pop()
+            elif words[0] == "$var":
+                # $var <type> <width> <code> <name> [<range>] $end
+                name = words[4]
+                if len(words) > 6 and words[5].startswith("[") and not name.endswith("]"):
+                    # Part selects on the same net get their own path.
+                    name += words[5] if words[5] != f"[{int(words[2]) - 1}:0]" else ""
+                widths[words[3]] = int(words[2])
+                yield ("var", ".".join(scope + [name]), words[3], int(words[2]))
+            elif words[0] == "$enddefinitions":
+                header = False
+            continue
+
+        tokens = iter(line.split())
+        for token in tokens:
+            c = token[0]
+            if c == "#":
+                time = int(token[1:])
+            elif c in "01xXzZ":
+                yield ("change", time, token[1:], c.lower())
+            elif c in "bB":
+                code = next(tokens)
+                yield ("change", time, code, normalize(token[1:].lower(), widths.get(code, 1)))
+            elif c in "rR":
+                yield ("change", time, next(tokens), token[1:])
+            # $dumpvars/$dumpon/$dumpoff/$end and comments carry no changes
+            # of their own.
+
+def normalize(bits: str, width: int) -> str:
+    """
+    A vector value as it is stored. Writers may drop leading digits, which
+    VCD extends with 0 (after a 0 or 1) or with the leading x or z. Values
+    of 0s and 1s are stored without leading zeros, and values with x or z
+    digits are extended to the full width, so each value has one spelling.
+    """
+    if not set(bits) & set("xz"):
+        return bits.lstrip("0") or "0"
+    return bits.rjust(width, bits[0] if bits[0] in "xz" else "0")
+
+def _clock(signals: dict[str, tuple[str, int]], clock: str | None) -> str | None:
+    if clock is not None:
+        return signals[clock][0]
+    # The shallowest one-bit signal called clk or i_clk.
+    candidates = [(path.count("."), path) for path, (_, width) in signals.items()
+                  if width == 1 and path.rsplit(".", 1)[-1] in ("clk", "i_clk")]
+    return signals[min(candidates)[1]][0] if candidates else None
+
+def build_index(dump: pathlib.Path, index: pathlib.Path, clock: str | None = None) -> None:
+    tmp = index.with_suffix(index.suffix + ".tmp")
+    tmp.unlink(missing_ok=True)
+    db = sqlite3.connect(tmp)
+    db.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA)
+
+    signals = {}
+    changes = []
+    edges = []
+    clock_code = None
+    last_clock = "x"
+    for event in parse(_lines(dump)):
+        if event[0] == "var":
+            _, path, code, width = event
+            signals[path] = (code, width)
+            continue
+
+        if clock_code is None:
+            clock_code = _clock(signals, clock)
+        _, time, code, value = event
+        changes.append((code, time, value))
+        if code == clock_code:
+            if value == "1" and last_clock != "1":
+                edges.append((len(edges) + 1, time))
+            last_clock = value
+        if len(changes) >= BATCH:
+            db.executemany("INSERT INTO changes VALUES (?, ?, ?)", changes)
+            changes.clear()
+
+    db.executemany("INSERT INTO changes VALUES (?, ?, ?)", changes)
+    db.executemany("INSERT OR REPLACE INTO signals VALUES (?, ?, ?)",
+                   [(path, code, width) for path, (code, width) in signals.items()])
+    db.executemany("INSERT INTO edges VALUES (?, ?)", edges)
+    # Built after loading; much faster than maintaining it per insert.
+    db.execute("CREATE INDEX changes_by_signal ON changes (code, time)")
+    stat = dump.stat()
+    db.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ("size", str(stat.st_size)), ("mtime", str(stat.st_mtime_ns)), ("version", str(INDEX_VERSION)),
+    ])
+    db.commit()
+    db.close()
+    os.replace(tmp, index)
+
+def open_index(dump: pathlib.Path, clock: str | None = None) -> sqlite3.Connection:
+    """Open the index for a dump, (re)building it if it is missing or stale."""
+    index = dump.with_name(dump.name + ".vcdq")
+    stat = dump.stat()
+    if index.exists():
+        db = sqlite3.connect(index)
+        meta = dict(db.execute("SELECT key, value FROM meta"))
+        if (meta.get("size") == str(stat.st_size) and meta.get("mtime") == str(stat.st_mtime_ns)
+                and meta.get("version") == str(INDEX_VERSION)):
+            return db
+        db.close()
+    build_index(dump, index, clock)
+    return sqlite3.connect(index)
+
+def match(db: sqlite3.Connection, patterns: list[str]) -> list[tuple[str, str, int]]:
+    """(path, code, width) of the signals matching any of the glob patterns."""
+    found = {}
+    for pattern in patterns:
+        rows = db.execute("SELECT path, code, width FROM signals WHERE path GLOB ? ORDER BY path", (pattern,)).fetchall()
+        if not rows:
+            raise KeyError(f"no signal matches {pattern!r}")
+        for row in rows:
+            found.setdefault(row[0], row)
+    return list(found.values())
+
+def cycle_time(db: sqlite3.Connection, cycle: int) -> int:
+    row = db.execute("SELECT time FROM edges WHERE cycle = ?", (cycle,)).fetchone()
+    if row is None:
+        raise KeyError(f"no clock edge for cycle {cycle}")
+    return row[0]
+
+def time_cycle(db: sqlite3.Connection, time: int) -> int:
+    """The last cycle whose edge is at or before `time` (0 before the first edge)."""
+    row = db.execute("SELECT MAX(cycle) FROM edges WHERE time <= ?", (time,)).fetchone()
+    return row[0] or 0
+
+def value_at(db: sqlite3.Connection, code: str, time: int) -> str | None:
+    row = db.execute(
+        "SELECT value FROM changes WHERE code = ? AND time <= ? ORDER BY time DESC, rowid DESC LIMIT 1",
+        (code, time),
+    ).fetchone()
+    return None if row is None else row[0]
+
+def first(db: sqlite3.Connection, code: str, value: str, after: int = 0) -> int | None:
+    """Time of the first change of a signal to `value` at or after `after`."""
+    row = db.execute(
+        "SELECT time FROM changes WHERE code = ? AND time >= ? AND value = ? ORDER BY time LIMIT 1",
+        (code, after, value),
+    ).fetchone()
+    return None if row is None else row[0]
+
+def format_value(value: str | None, width: int) -> str:
+    if value is None:
+        return "-"
+    if width == 1 or any(c in value for c in "xz") or "." in value:
+        return value
+    return f"{int(value, 2):0{(width + 3) // 4}x}"
+
+def parse_value(value: str, width: int) -> str:
+    """A query value (decimal, 0x/0b prefixed, or x/z) as it is stored."""
+    value = value.lower()
+    if width == 1 and value in ("0", "1", "x", "z"):
+        return value
+    if value.startswith("0b"):
+        return normalize(value[2:], width)
+    if set(value) <= set("xz"):
+        return normalize(value, width)
+    return format(int(value, 0) & ((1 << width) - 1), "b")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query VCD/FST waveforms through an on-disk index.")
+    parser.add_argument("--clock", help="clock signal path for cycle numbers (default: the top-level clk)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("index", help="build (or rebuild) the index")
+    p.add_argument("dump", type=pathlib.Path)
+
+    p = commands.add_parser("signals", help="list signals")
+    p.add_argument("dump", type=pathlib.Path)
+    p.add_argument("pattern", nargs="?", default="*")
+
+    p = commands.add_parser("at", help="values of signals at a cycle or time")
+    p.add_argument("dump", type=pathlib.Path)
+    when = p.add_mutually_exclusive_group(required=True)
+    when.add_argument("--cycle", type=int)
+    when.add_argument("--time", type=int)
+    p.add_argument("signals", nargs="+", help="signal paths or glob patterns")
+
+    p = commands.add_parser("first", help="first cycle at which a signal takes a value")
+    p.add_argument("dump", type=pathlib.Path)
+    p.add_argument("condition", help="<signal>=<value>, e.g. hart_tb.trap=1 or hart_tb.pc=0x40")
+    p.add_argument("--after-cycle", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "index":
+        index = args.dump.with_name(args.dump.name + ".vcdq")
+        build_index(args.dump, index, args.clock)
+        return 0
+
+    db = open_index(args.dump, args.clock)
+    if args.command == "signals":
+        for path, _, width in match(db, [args.pattern]):
+            print(f"{path} [{width}]")
+    elif args.command == "at":
+        # Just before the edge: the values that the edge samples.
+        time = cycle_time(db, args.cycle) - 1 if args.cycle is not None else args.time
+        print(f"time {time} (cycle {args.cycle if args.cycle is not None else time_cycle(db, time)})")
+        for path, code, width in match(db, args.signals):
+            print(f"  {path} = {format_value(value_at(db, code, time), width)}")
+    elif args.command == "first":
+        name, _, value = args.condition.partition("=")
+        signals = match(db, [name])
+        if len(signals) > 1:
+            raise SystemExit(f"{name!r} matches {len(signals)} signals; pick one:\n"
+                             + "\n".join(f"  {path}" for path, _, _ in signals))
+        [(path, code, width)] = signals
+        target = parse_value(value, width)
+        after = cycle_time(db, args.after_cycle) if args.after_cycle else 0
+        # Already there when the search starts: the value that the edge of
+        # --after-cycle samples, as `at --cycle` reads it.
+        if args.after_cycle and value_at(db, code, after - 1) == target:
+            print(f"{path} = {value} already (sampled at cycle {args.after_cycle})")
+            return 0
+        time = first(db, code, target, after)
+        if time is None:
+            print(f"{path} never becomes {value}")
+            return 1
+        # A change at time t is first seen by the next rising edge.
+        row = db.execute("SELECT MIN(cycle) FROM edges WHERE time > ?", (time,)).fetchone()
+        print(f"{path} = {value} at time {time} (sampled at cycle {row[0] if row[0] else '-'})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())